@@ -0,0 +1,66 @@
+#-*- coding: utf-8 -*-
+
+"""
+对比标准库 json 与 orjson 编解码类群丰度接口返回值的耗时。orjson 默认使用标准库
+json 序列化以保证输出一致,orjson(exact=False) 为使用 orjson 序列化的耗时。
+
+benchmarks/payloads/taxon_abundance.json 为一页(50 条)类群丰度接口返回值样例,
+测试时将其中的数据重复扩展为较大的返回值。
+
+    $ PYTHONPATH=. python benchmarks/bench_codec.py
+"""
+
+from bgesdk import codec
+from bgesdk.models import Model, ModelEncoder
+
+import json
+import os
+import timeit
+
+
+PAYLOAD = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    'payloads',
+    'taxon_abundance.json'
+)
+
+
+def load_payload(repeat):
+    with open(PAYLOAD, 'rb') as fp:
+        payload = json.loads(fp.read().decode('utf-8'))
+    payload['data'] = payload['data'] * repeat
+    return json.dumps(payload, ensure_ascii=False).encode('utf-8')
+
+
+def bench(name, func, number):
+    seconds = min(timeit.repeat(func, number=number, repeat=3)) / number
+    print('  %-28s %8.2f ms' % (name, seconds * 1000))
+
+
+def main():
+    for repeat in (1, 400):
+        content = load_payload(repeat)
+        print('payload: %d records, %.1f KB' % (
+            repeat * 50, len(content) / 1024.0))
+        number = 200 if repeat == 1 else 3
+        for name in ('json', 'orjson', 'orjson(exact=False)'):
+            try:
+                if name == 'orjson(exact=False)':
+                    codec.set_codec(codec.OrjsonCodec(exact=False))
+                else:
+                    codec.set_codec(name)
+            except Exception as e:
+                print('  %s: %s' % (name, e))
+                continue
+            current = codec.get_codec()
+            data = current.loads(content)
+            model = Model({'result': data['data']})
+            print(' %s' % name)
+            bench('loads', lambda: current.loads(content), number)
+            bench('Model.dumps()', lambda: model.dumps(), number)
+            bench('output_json (indent=4)', lambda: codec.dumps(
+                model, indent=4, sort_keys=True, cls=ModelEncoder), number)
+
+
+if __name__ == '__main__':
+    main()
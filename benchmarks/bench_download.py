@@ -0,0 +1,100 @@
+#-*- coding: utf-8 -*-
+
+"""
+对比单连接顺序下载与 HTTP Range 并发下载的耗时。
+
+本地桩服务器对每个连接限速,模拟对象存储单连接带宽受限的场景。
+
+    $ PYTHONPATH=. python benchmarks/bench_download.py
+"""
+
+from bgesdk.client import API
+from six.moves.BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from six.moves.socketserver import ThreadingMixIn
+
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+
+
+SIZE = 32 * 1024 * 1024
+# 单连接带宽 16MB/s
+RATE = 16 * 1024 * 1024
+CONTENT = os.urandom(SIZE)
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class Handler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        self.rfile.read(length)
+        host, port = self.server.server_address
+        content = json.dumps({'code': 0, 'msg': 'success', 'data': {
+            'url': 'http://%s:%s/data.bin' % (host, port)
+        }}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def do_GET(self):
+        value = self.headers.get('Range')
+        first, last = 0, SIZE - 1
+        if value is None:
+            self.send_response(200)
+        else:
+            first, last = [int(v) for v in re.match(
+                r'bytes=(\d+)-(\d+)', value).groups()]
+            self.send_response(206)
+            self.send_header(
+                'Content-Range', 'bytes %d-%d/%d' % (first, last, SIZE))
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('Content-Length', str(last - first + 1))
+        self.end_headers()
+        chunk = 256 * 1024
+        try:
+            for offset in range(first, last + 1, chunk):
+                end = min(offset + chunk, last + 1)
+                self.wfile.write(CONTENT[offset:end])
+                time.sleep((end - offset) / float(RATE))
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def main():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever)
+    thread.daemon = True
+    thread.start()
+    endpoint = 'http://127.0.0.1:%d' % httpd.server_port
+    api = API('demo', endpoint=endpoint)
+    print('object size: %d MB, per-connection rate: %d MB/s' % (
+        SIZE // 1024 // 1024, RATE // 1024 // 1024))
+    for workers in (1, 4, 8):
+        with tempfile.TemporaryFile() as fp:
+            start = time.time()
+            api.download(
+                'data.bin', fp, workers=workers, part_size=4 * 1024 * 1024)
+            elapsed = time.time() - start
+            fp.seek(0)
+            assert fp.read() == CONTENT
+        print('workers=%d: %.2fs' % (workers, elapsed))
+    httpd.shutdown()
+
+
+if __name__ == '__main__':
+    main()
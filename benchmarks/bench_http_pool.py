@@ -0,0 +1,89 @@
+#-*- coding: utf-8 -*-
+
+"""
+连接池基准测试。
+
+在本地启动一个桩服务器，对比每次调用新建 HTTPRequest（旧实现）与 API 实例共享
+连接池两种方式的耗时及建立的 TCP 连接数。
+
+使用示例:
+
+    $ python benchmarks/bench_http_pool.py -n 2000
+"""
+
+import argparse
+import json
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from bgesdk.client import API
+from bgesdk.http import HTTPRequest
+
+
+BODY = json.dumps({
+    'code': 0,
+    'msg': 'success',
+    'data': {'biosample_id': 'E-B00000000000'}
+}).encode('utf-8')
+
+
+class Handler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    connections = 0
+
+    def setup(self):
+        BaseHTTPRequestHandler.setup(self)
+        Handler.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+
+def per_call(endpoint, number):
+    for _ in range(number):
+        request = HTTPRequest(endpoint)
+        request.set_authorization('Bearer', 'demo')
+        request.get('/samples/E-B00000000000')
+        request.close()
+
+
+def pooled(endpoint, number):
+    api = API('demo', endpoint=endpoint)
+    for _ in range(number):
+        api.get_sample('E-B00000000000')
+    api.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='连接池基准测试')
+    parser.add_argument('-n', '--number', type=int, default=1000)
+    args = parser.parse_args()
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    httpd.daemon_threads = True
+    thread = threading.Thread(target=httpd.serve_forever)
+    thread.daemon = True
+    thread.start()
+    endpoint = 'http://127.0.0.1:{}'.format(httpd.server_port)
+    for name, func in (('per-call', per_call), ('pooled', pooled)):
+        Handler.connections = 0
+        start = time.perf_counter()
+        func(endpoint, args.number)
+        elapsed = time.perf_counter() - start
+        print('{:<10} {:>8.3f}s {:>8.1f} req/s {:>6} connections'.format(
+            name, elapsed, args.number / elapsed, Handler.connections))
+    httpd.shutdown()
+
+
+if __name__ == '__main__':
+    main()
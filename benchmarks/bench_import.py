@@ -0,0 +1,66 @@
+#-*- coding: utf-8 -*-
+
+"""
+导入耗时基准测试。
+
+在新的解释器进程中多次执行导入语句,输出耗时的中位数与最小值,并检查上传相关的
+依赖(oss2、aliyunsdkcore、requests_toolbelt)是否被提前导入。可通过 --max 指定耗
+时上限,超出上限或提前导入了上传依赖时以非零状态退出,用于在 CI 中防止导入耗时
+回退。
+
+使用示例:
+
+    $ PYTHONPATH=. python benchmarks/bench_import.py
+    $ PYTHONPATH=. python benchmarks/bench_import.py -s 'import bgesdk.aio'
+    $ PYTHONPATH=. python benchmarks/bench_import.py --max 300
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+
+HEAVY_MODULES = ['oss2', 'aliyunsdkcore', 'requests_toolbelt']
+
+SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+exec(sys.argv[1])
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    'elapsed': elapsed,
+    'modules': sorted(m for m in sys.modules if m.split('.')[0] in %r),
+}))
+""" % (HEAVY_MODULES,)
+
+
+def measure(statement):
+    output = subprocess.check_output(
+        [sys.executable, '-c', SCRIPT, statement])
+    return json.loads(output.decode('utf-8'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='导入耗时基准测试')
+    parser.add_argument('-s', '--statement', default='from bgesdk import API')
+    parser.add_argument('-n', '--number', type=int, default=10)
+    parser.add_argument(
+        '--max', type=float, default=None, help='耗时中位数上限(毫秒)')
+    args = parser.parse_args()
+    results = [measure(args.statement) for _ in range(args.number)]
+    timings = [result['elapsed'] * 1000 for result in results]
+    median = statistics.median(timings)
+    print('{!r}: median {:.1f} ms, min {:.1f} ms ({} runs)'.format(
+        args.statement, median, min(timings), args.number))
+    heavy = sorted(set(
+        name.split('.')[0] for result in results for name in result['modules']))
+    if heavy:
+        print('eagerly imported: {}'.format(', '.join(heavy)))
+    if heavy or (args.max is not None and median > args.max):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
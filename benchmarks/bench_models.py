@@ -0,0 +1,48 @@
+#-*- coding: utf-8 -*-
+
+"""
+对比 Model 与 LazyModel 封装大体积接口返回值的耗时。
+
+    $ PYTHONPATH=. python benchmarks/bench_models.py
+"""
+
+from bgesdk.models import LazyModel, Model
+
+import json
+import time
+
+
+def make_response(count):
+    return {
+        'count': count,
+        'next_page': None,
+        'result': [{
+            'taxon_id': 'taxon_%d' % i,
+            'abundance': i / 3.0,
+            'lineage': {'kingdom': 'k', 'phylum': 'p', 'genus': 'g'},
+            'tags': ['a', 'b', 'c']
+        } for i in range(count)]
+    }
+
+
+def bench(name, cls, content):
+    start = time.time()
+    model = cls(json.loads(content))
+    wrapped = time.time() - start
+    first = model['result'][0]['taxon_id']
+    start = time.time()
+    model.json()
+    dumped = time.time() - start
+    print('%-10s wrap %.3fs  json() %.3fs  (%s)' % (
+        name, wrapped, dumped, first))
+
+
+def main():
+    content = json.dumps(make_response(200000))
+    print('response size: %.1f MB' % (len(content) / 1024.0 / 1024))
+    bench('Model', Model, content)
+    bench('LazyModel', LazyModel, content)
+
+
+if __name__ == '__main__':
+    main()
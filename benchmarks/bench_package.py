@@ -0,0 +1,105 @@
+#-*- coding: utf-8 -*-
+
+"""
+模型打包基准测试。
+
+生成包含大量 Python 模块的模型目录,对比逐个混淆压缩、多进程并行以及使用打包缓存
+(全部命中)时的打包耗时,并检查各方式生成的压缩包完全一致。
+
+使用示例:
+
+    $ PYTHONPATH=. python benchmarks/bench_package.py -n 300 -j 4
+"""
+
+from bgesdk.management.build_cache import BuildCache, cpu_count
+from bgesdk.management.commands.model import Command
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+
+
+MODULE = '''
+import os
+
+
+class Handler{0}(object):
+    """示例模块 {0}"""
+
+    def __init__(self, name, values=None):
+        self.name = name
+        self.values = list(values or [])
+
+    def total(self):
+        result = 0
+        for value in self.values:
+            if value % 2 == 0:
+                result += value * {0}
+            else:
+                result -= value
+        return result
+
+    def describe(self):
+        return '{{}}: {{}}'.format(self.name, os.path.basename(self.name))
+'''
+
+
+def generate(home, number):
+    os.makedirs(os.path.join(home, 'lib'))
+    with open(os.path.join(home, '.bgeignore'), 'w') as fp:
+        fp.write('.bge/*\n')
+    with open(os.path.join(home, '.bgeminify'), 'w') as fp:
+        fp.write('lib/*.py\n')
+    for i in range(number):
+        path = os.path.join(home, 'lib', 'module_{}.py'.format(i))
+        with open(path, 'w') as fp:
+            fp.write(MODULE.format(i) * 20)
+
+
+def package(home, name, workers, cache=None):
+    command = Command.__new__(Command)
+    zip_path = os.path.join(os.path.dirname(home), name)
+    start = time.perf_counter()
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        command._zip_codedir(home, zf, cache=cache, workers=workers)
+    if cache is not None:
+        cache.save()
+    elapsed = time.perf_counter() - start
+    with open(zip_path, 'rb') as fp:
+        return elapsed, fp.read()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='模型打包基准测试')
+    parser.add_argument('-n', '--number', type=int, default=200)
+    parser.add_argument('-j', '--jobs', type=int, default=cpu_count())
+    args = parser.parse_args()
+    tmpdir = tempfile.mkdtemp()
+    try:
+        home = os.path.join(tmpdir, 'model')
+        generate(home, args.number)
+        cache_dir = os.path.join(home, '.bge', 'build_cache')
+        runs = [
+            ('serial', lambda: package(home, 'serial.zip', 1)),
+            ('parallel', lambda: package(home, 'parallel.zip', args.jobs)),
+            ('cold cache', lambda: package(
+                home, 'cold.zip', args.jobs, BuildCache(cache_dir))),
+            ('warm cache', lambda: package(
+                home, 'warm.zip', args.jobs, BuildCache(cache_dir))),
+        ]
+        expected = None
+        for name, run in runs:
+            elapsed, content = run()
+            if expected is None:
+                expected = content
+            print('{:<12} {:>8.3f}s  identical={}'.format(
+                name, elapsed, content == expected))
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    main()
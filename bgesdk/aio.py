@@ -0,0 +1,458 @@
+#-*- coding: utf-8 -*-
+
+"""
+BGE 开放平台 SDK 异步客户端模块。
+
+当前模块提供了 AsyncOAuth2 和 AsyncAPI 两个类,接口方法与 OAuth2 和 API 相同,但全部
+为基于 aiohttp 的协程,便于在单个进程中同时发起大量接口请求。接口返回值的解析方式
+(code、msg、data、pagination 以及 APIError)与同步客户端保持一致。
+
+使用前需安装 aiohttp:
+
+    $ pip install bge-python-sdk[async]
+
+使用示例:
+
+    >>> async with AsyncAPI(access_token) as api:
+    ...     samples = await asyncio.gather(*[
+    ...         api.get_sample(biosample_id) for biosample_id in biosample_ids
+    ...     ])
+"""
+
+from . import codec
+from . import constants
+from .client import (
+    API, OAuth2, _get_wrap, _merge_variants, _variant_chunks)
+from .error import BGEError
+from .http import unpack_result
+from .pagination import last_page_number
+from .utils import new_logger
+
+from collections import deque
+from functools import partial, wraps
+from six import binary_type, text_type
+from six.moves.urllib.parse import urljoin
+
+import asyncio
+
+
+__all__ = ['AsyncOAuth2', 'AsyncAPI']
+
+
+def _import_aiohttp():
+    try:
+        import aiohttp
+    except ImportError:
+        raise BGEError(
+            'aiohttp is required by the async client, install it with: '
+            'pip install bge-python-sdk[async]'
+        )
+    return aiohttp
+
+
+def _encode_fields(fields):
+    """与 requests 保持一致的参数编码: 忽略值为 None 的参数,其余转换为字符串"""
+    ret = []
+    for key, value in fields.items():
+        if value is None:
+            continue
+        if not isinstance(value, (list, tuple)):
+            value = [value]
+        for item in value:
+            if isinstance(item, binary_type):
+                item = item.decode('utf-8')
+            elif not isinstance(item, text_type):
+                item = str(item)
+            ret.append((key, item))
+    return ret
+
+
+class AsyncHTTPRequest(object):
+    """异步 HTTP 请求类
+
+    与 HTTPRequest 接口一致,请求方法均为协程;aiohttp 会话在首次请求时创建;
+
+    Args:
+        endpoint (str): 平台基本地址，如 https://api.bge.genomics.cn；
+        max_retries (数字, 非必填): 连接失败重试次数，默认值为 None；
+        verbose (布尔, 非必填)：输出测试日志，默认值为 False；
+        pool_connections (数字, 非必填): 兼容 HTTPRequest 参数，异步请求不使用；
+        pool_maxsize (数字, 非必填): 最大并发连接数，默认值为 100；
+        keep_alive (布尔, 非必填): 是否复用 HTTP 长连接，默认值为 True；
+    """
+
+    def __init__(self, endpoint, max_retries=None, verbose=False,
+                 pool_connections=None, pool_maxsize=None, keep_alive=True):
+        self.logger = new_logger(self.__class__.__name__, verbose=verbose)
+        self.endpoint = endpoint
+        self.headers = {}
+        self.max_retries = int(max_retries or 0)
+        if pool_maxsize is None:
+            pool_maxsize = constants.ASYNC_POOL_MAXSIZE
+        self.pool_maxsize = int(pool_maxsize)
+        self.keep_alive = keep_alive
+        self.session = None
+
+    def set_authorization(self, token_type, access_token):
+        """设置 Authorization 头部
+
+        Args:
+            access_token (str): 访问令牌
+        """
+        self.headers['Authorization'] = '{} {}'.format(
+            token_type,
+            access_token
+        )
+
+    def _get_session(self):
+        if self.session is None or self.session.closed:
+            aiohttp = _import_aiohttp()
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_maxsize,
+                force_close=not self.keep_alive
+            )
+            self.session = aiohttp.ClientSession(connector=connector)
+        return self.session
+
+    async def close(self):
+        """关闭连接池中的全部连接"""
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def get(self, path, params=None, headers=None, timeout=None):
+        """GET 接口请求，参数同 HTTPRequest.get"""
+        return await self._request(
+            'GET',
+            path,
+            params=params,
+            headers=headers,
+            timeout=timeout
+        )
+
+    async def post(self, path, params=None, data=None, files=None,
+                   headers=None, timeout=None):
+        """POST 接口请求，参数同 HTTPRequest.post"""
+        return await self._request(
+            'POST',
+            path,
+            params=params,
+            data=data,
+            files=files,
+            headers=headers,
+            timeout=timeout
+        )
+
+    def _build_kwargs(self, aiohttp, params=None, data=None, files=None):
+        kwargs = {}
+        if params is not None:
+            kwargs['params'] = _encode_fields(params)
+        if files:
+            form = aiohttp.FormData(_encode_fields(data or {}))
+            for name, fileobj in files.items():
+                form.add_field(name, fileobj)
+            kwargs['data'] = form
+        elif isinstance(data, dict):
+            kwargs['data'] = aiohttp.FormData(_encode_fields(data))
+        elif data is not None:
+            kwargs['data'] = data
+        return kwargs
+
+    async def _request(self, method, path, timeout=None, headers=None,
+                       params=None, data=None, files=None):
+        """发送 HTTP 请求
+
+        Args:
+            method (str): 请求方法
+            path (str): 请求路径
+
+        Raises:
+            BGEError: SDK 错误
+            APIError: API 错误
+
+        Returns:
+            object: 返回值
+        """
+        aiohttp = _import_aiohttp()
+        if headers is None:
+            headers = self.headers
+        else:
+            headers.update(self.headers)
+        url = urljoin(self.endpoint, path)
+        self.logger.debug(
+            ('Request: \n\tmethod: %s\n\turl: %s\n\theaders: %s\n\ttimeout'
+             ': %s\n\tparams=%s\n\tdata=%s'),
+            method, url, headers, timeout, params, data)
+        session = self._get_session()
+        retries = 0
+        while True:
+            # 表单数据只能发送一次，每次重试需重新构建
+            kwargs = self._build_kwargs(
+                aiohttp, params=params, data=data, files=files)
+            try:
+                async with session.request(
+                        method,
+                        url,
+                        headers=headers,
+                        timeout=aiohttp.ClientTimeout(total=timeout),
+                        **kwargs) as resp:
+                    resp.raise_for_status()
+                    content_type_header = resp.headers.get('Content-Type', '')
+                    charset = resp.charset or 'utf-8'
+                    content = await resp.read()
+                break
+            except aiohttp.ClientResponseError as e:
+                raise BGEError('API request error: %s' % e)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                # 连接失败、超时、连接中断等传输错误均重试,重试后仍失败时与同
+                # 步客户端一样抛出 BGEError
+                if retries < self.max_retries:
+                    retries += 1
+                    continue
+                raise BGEError('Fail to connect: %r' % e)
+        if 'application/json' not in content_type_header:
+            result = content.decode(charset, 'replace')
+            self.logger.debug('Response: \n\t%s', result)
+            return result
+        result = codec.loads(content)
+        self.logger.debug('Response: \n\t%s', result)
+        return unpack_result(result)
+
+
+async def _call(self, method, path, wrap=None, **kwargs):
+    """调用平台接口，参数同 bgesdk.client 中的 _call"""
+    result = await self._http._request(
+        method, path, timeout=self.timeout, **kwargs)
+    if wrap is None:
+        return None
+    return _get_wrap(self, wrap)(result)
+
+
+async def alive(self):
+    """检查服务可用性
+
+    Returns:
+        布尔型: True 代表可用, False 代表不可用
+    """
+    try:
+        await self._http.get('/ping', timeout=self.timeout)
+    except Exception:
+        return False
+    return True
+
+
+async def close(self):
+    """关闭连接池中的全部连接"""
+    await self._http.close()
+
+
+async def __aenter__(self):
+    return self
+
+
+async def __aexit__(self, exc_type, exc_value, traceback):
+    await self.close()
+
+
+async def _aiter_pages(fetch, next_page=None):
+    """异步版本的 bgesdk.pagination.iter_pages"""
+    while True:
+        page = await fetch(next_page)
+        yield page
+        if not page['result']:
+            break
+        if page['next_page'] is None or page['next_page'] == next_page:
+            break
+        next_page = page['next_page']
+
+
+async def _aiter_numbered_pages(fetch, next_page=None, workers=4,
+                                limit=None):
+    """异步版本的 bgesdk.pagination.iter_numbered_pages"""
+    page = next_page or 1
+    first = await fetch(page)
+    yield first
+    last = last_page_number(first, page, limit)
+    if last is None:
+        return
+    # 与 ordered_map 一致,同一时刻最多创建 workers * 2 个任务,每返回一页再创建
+    # 下一页的任务,避免消费较慢时已获取的页面在内存中堆积
+    workers = max(int(workers), 1)
+    semaphore = asyncio.Semaphore(workers)
+    window = deque()
+
+    async def fetch_page(page):
+        async with semaphore:
+            return await fetch(page)
+
+    try:
+        for page in range(page + 1, last + 1):
+            window.append(asyncio.ensure_future(fetch_page(page)))
+            if len(window) < workers * 2:
+                continue
+            ret = await window.popleft()
+            if not ret['result']:
+                return
+            yield ret
+        while window:
+            ret = await window.popleft()
+            if not ret['result']:
+                return
+            yield ret
+    finally:
+        for task in window:
+            task.cancel()
+
+
+async def _aread_ahead(pages, size):
+    """在后台任务中预先读取至多 size 页"""
+    buffer = asyncio.Queue(maxsize=int(size))
+
+    async def produce():
+        try:
+            async for page in pages:
+                await buffer.put((True, page))
+        except Exception as e:
+            await buffer.put((False, e))
+        else:
+            await buffer.put((False, None))
+
+    task = asyncio.ensure_future(produce())
+    try:
+        while True:
+            ok, value = await buffer.get()
+            if not ok:
+                if value is not None:
+                    raise value
+                break
+            yield value
+    finally:
+        task.cancel()
+
+
+def _blocking(name):
+    """将依赖阻塞 SDK(oss2 等)的方法放入线程池中执行"""
+    method = getattr(API, name)
+
+    @wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        loop = asyncio.get_event_loop()
+        func = getattr(self._get_sync_api(), name)
+        return await loop.run_in_executor(None, partial(func, *args, **kwargs))
+    return wrapper
+
+
+class AsyncOAuth2(OAuth2):
+    """OAuth2 授权异步客户端类。
+
+    参数与 OAuth2 相同,接口方法均为协程。
+    """
+
+    alive = alive
+    _call = _call
+    close = close
+    __aenter__ = __aenter__
+    __aexit__ = __aexit__
+    http_class = AsyncHTTPRequest
+
+    def get_api(self, access_token):
+        """获取平台 API 异步调用客户端对象
+
+        Args:
+            access_token (str): 访问令牌;
+
+        Returns:
+            AsyncAPI: AsyncAPI 对象;
+        """
+        return AsyncAPI(
+            access_token,
+            endpoint=self.endpoint,
+            max_retries=self.max_retries,
+            timeout=self.timeout,
+            verbose=self.verbose,
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            keep_alive=self.keep_alive)
+
+
+class AsyncAPI(API):
+    """BGE 开放平台接口异步调用客户端
+
+    参数与 API 相同,接口方法均为协程。文件上传、下载等依赖阻塞 SDK 的方法在线程池
+    中执行。
+    """
+
+    alive = alive
+    _call = _call
+    __aenter__ = __aenter__
+    __aexit__ = __aexit__
+    http_class = AsyncHTTPRequest
+
+    upload = _blocking('upload')
+    batch_upload = _blocking('batch_upload')
+    upload_dir = _blocking('upload_dir')
+    download = _blocking('download')
+    download_file = _blocking('download_file')
+    download_many = _blocking('download_many')
+    upload_model_expfs = _blocking('upload_model_expfs')
+    wait_task = _blocking('wait_task')
+
+    _sync_api = None
+
+    def _get_sync_api(self):
+        if self._sync_api is None:
+            self._sync_api = API(
+                self.access_token,
+                endpoint=self.endpoint,
+                max_retries=self.max_retries,
+                timeout=self.timeout,
+                verbose=self.verbose,
+                pool_connections=self.pool_connections,
+                pool_maxsize=self.pool_maxsize,
+                keep_alive=self.keep_alive,
+                lazy=self.lazy,
+                progress=self.progress)
+        return self._sync_api
+
+    async def close(self):
+        """关闭连接池中的全部连接"""
+        await self._http.close()
+        if self._sync_api is not None:
+            self._sync_api.close()
+
+    async def _iter_pages(self, fetch, next_page=None, read_ahead=0,
+                          workers=None, limit=None):
+        """逐条迭代分页接口数据,参数同 API._iter_pages,返回异步迭代器"""
+        if workers and workers > 1:
+            pages = _aiter_numbered_pages(
+                fetch, next_page=next_page, workers=workers, limit=limit)
+        else:
+            pages = _aiter_pages(fetch, next_page=next_page)
+        if read_ahead:
+            pages = _aread_ahead(pages, read_ahead)
+        async for page in pages:
+            for item in page['result']:
+                yield item
+
+    async def get_variants_bulk(self, biosample_ids, rsids, chunk_size=None,
+                                workers=None):
+        biosample_ids, rsids, chunks = _variant_chunks(
+            biosample_ids, rsids,
+            chunk_size or constants.VARIANTS_RSIDS_LIMIT)
+        semaphore = asyncio.Semaphore(
+            workers or constants.BULK_NUM_THREADS)
+
+        async def fetch(chunk):
+            async with semaphore:
+                return await self.get_variants(*chunk)
+
+        results = await asyncio.gather(*[fetch(chunk) for chunk in chunks])
+        return _merge_variants(biosample_ids, rsids, chunks, results)
+    get_variants_bulk.__doc__ = API.get_variants_bulk.__doc__
+
+    async def improve_sample(self, biosample_id, **kwargs):
+        if not kwargs:
+            # 无更新
+            return
+        await API.improve_sample(self, biosample_id, **kwargs)
+    improve_sample.__doc__ = API.improve_sample.__doc__
@@ -18,23 +18,31 @@ BGE 开放平台 SDK 客户端模块。
 
 from . import constants
 from . import models
-from .error import BGEError
-from .fs import FileItem
+from . import pagination
+from .credentials import STSCredentialsProvider
+from .error import APIError, BGEError
+from .fs import FileItem, iter_files
 from .http import HTTPRequest
-from .utils import new_logger, human_byte
-
-from aliyunsdkcore.auth.credentials import StsTokenCredential
-from aliyunsdkcore.client import AcsClient
-from posixpath import split, join, isdir, isfile
-from requests_toolbelt.multipart import encoder
+from .polling import PENDING_STATES, RETRY_STATUS_CODES, PollPolicy
+from .progress import TextProgress, progress_factory
+from .transfer import (
+    Digest, DownloadCheckpoint, FileWriter, HashManifest, RangeError,
+    TransferLimiter, fetch_range, is_appending, is_seekable, is_stream,
+    remote_matches, split_ranges, stream_upload)
+from .utils import new_logger, ordered_map
+
+from collections import OrderedDict
+from functools import partial
+from posixpath import split, isfile
 from six import text_type
 from six.moves.urllib.parse import urljoin, urlencode
 
 import json
 import os
-import oss2
 import requests
-import sys
+import threading
+import time
+import warnings
 
 
 __all__ = ['OAuth2', 'API', 'endpoints']
@@ -45,13 +53,175 @@ ACCESS_TOKEN_API = '/oauth2/access_token'
 
 
 def progress_callback(bytes_consumed, total_bytes):
-    sys.stdout.write(
-        '\r文件大小: {}, 上传进度: {}%, 已上传 {}'.format(
-            human_byte(total_bytes, 2),
-            '%.2f' % ((bytes_consumed / total_bytes) * 100),
-            human_byte(bytes_consumed, 2)
-    ))
-    sys.stdout.flush()
+    """在终端输出上传进度,已废弃
+
+    请通过 API 的 progress 参数或 bgesdk.progress 中的进度类输出进度。
+    """
+    warnings.warn(
+        'progress_callback is deprecated, use the progress argument of API '
+        'instead', DeprecationWarning, stacklevel=2)
+    TextProgress(total=total_bytes).render(bytes_consumed, total_bytes, False)
+
+
+class _DownloadURL(object):
+    """下载地址,临近过期时或过期后重新获取"""
+
+    def __init__(self, api, object_name, **kwargs):
+        self.api = api
+        self.object_name = object_name
+        self.kwargs = kwargs
+        self.lock = threading.Lock()
+        expiration_time = kwargs.get('expiration_time') or 600
+        self.expiration_time = expiration_time
+        # 剩余有效期不足 margin 秒时,下次使用前重新签名
+        self.margin = min(
+            constants.DOWNLOAD_URL_RESIGN_MARGIN, expiration_time / 5.)
+        self._sign()
+
+    def _sign(self):
+        signed_at = time.time()
+        self._url = self.api.get_download_url(
+            self.object_name, **self.kwargs).url
+        self.expires_at = signed_at + self.expiration_time
+
+    @property
+    def url(self):
+        with self.lock:
+            if time.time() >= self.expires_at - self.margin:
+                self._sign()
+            return self._url
+
+    def refresh(self, expired):
+        """重新获取下载地址,多个线程同时发现 expired 过期时仅重新获取一次"""
+        with self.lock:
+            if self._url == expired:
+                self._sign()
+            return self._url
+
+
+def _local_path(dest_dir, object_name, keep_dirs):
+    """OSS 对象在本地目录中对应的文件路径"""
+    parts = [p for p in object_name.split('/') if p]
+    if not parts or '..' in parts:
+        raise BGEError('invalid object_name: %r' % object_name)
+    if not keep_dirs:
+        parts = parts[-1:]
+    return os.path.join(dest_dir, *parts)
+
+
+def _write_first_part(r, writer, part_size, chunk_size, progress):
+    """从不带 Range 的响应中读取首个区间的数据,返回已写入的字节数"""
+    position = 0
+    for chunk in r.iter_content(chunk_size):
+        writer.write(chunk, position)
+        position += len(chunk)
+        progress.update(len(chunk))
+        if position >= part_size:
+            break
+    r.close()
+    return position
+
+
+def _wrap_taxon_abundance(result, model_class=models.Model):
+    # TODO: upgrade in the future
+    # 暂时特殊处理此接口,统一丰度数据的返回方式
+    result, pagination = result
+    ret = dict()
+    ret['count'] = count = pagination['count']
+    next_page = pagination['page'] + 1
+    if count == 0:
+        next_page = None
+    ret['next_page'] = next_page
+    ret['result'] = result
+    return model_class(ret)
+
+
+# lazy 模式下使用的封装函数,数据不复制,嵌套数据在访问时才封装
+_LAZY_WRAPS = {
+    models.Model: models.LazyModel,
+    models.ListModel: models.LazyListModel,
+    _wrap_taxon_abundance: partial(
+        _wrap_taxon_abundance, model_class=models.LazyModel)
+}
+
+
+def _get_wrap(self, wrap):
+    if getattr(self, 'lazy', False):
+        return _LAZY_WRAPS.get(wrap, wrap)
+    return wrap
+
+
+def _split_ids(ids, upper=False):
+    """拆分逗号分割的编号字符串或编号列表,去除空值与重复值并保持原有顺序"""
+    if isinstance(ids, (str, text_type)):
+        ids = ids.split(',')
+    ret = []
+    seen = set()
+    for value in ids:
+        value = value.strip()
+        if upper:
+            value = value.upper()
+        if not value or value in seen:
+            continue
+        seen.add(value)
+        ret.append(value)
+    return ret
+
+
+def _variant_chunks(biosample_ids, rsids, chunk_size):
+    """按样品与 rs 编号生成 (biosample_id, rsids) 请求参数"""
+    biosample_ids = _split_ids(biosample_ids, upper=True)
+    rsids = _split_ids(rsids)
+    chunk_size = min(
+        max(int(chunk_size), 1), constants.VARIANTS_RSIDS_LIMIT)
+    chunks = []
+    for biosample_id in biosample_ids:
+        for i in range(0, len(rsids), chunk_size):
+            chunks.append((biosample_id, ','.join(rsids[i:i + chunk_size])))
+    return biosample_ids, rsids, chunks
+
+
+def _merge_variants(biosample_ids, rsids, chunks, results):
+    """按 rs 编号合并分块请求结果,顺序与输入 rs 编号一致
+
+    返回的变异位点按 rsid 字段归入对应的 rs 编号,未请求的 rs 编号被忽略。
+    """
+    merged = OrderedDict(
+        (rsid, OrderedDict(
+            (biosample_id, []) for biosample_id in biosample_ids))
+        for rsid in rsids)
+    for (biosample_id, _), result in zip(chunks, results):
+        for variant in result:
+            variants = merged.get(variant.get('rsid'))
+            if variants is not None:
+                variants[biosample_id].append(variant)
+    return models.ListModel([
+        {'rsid': rsid, 'variants': variants}
+        for rsid, variants in merged.items()
+    ])
+
+
+def _fetch_page(method, kwargs, next_page):
+    return method(next_page=next_page, **kwargs)
+
+
+def _call(self, method, path, wrap=None, **kwargs):
+    """调用平台接口
+
+    Args:
+        method (str): 请求方法;
+        path (str): 请求路径;
+        wrap (callable, 非必填): 接口返回数据的封装函数,为 None 时不返回数据;
+        **kwargs: params、data、files、headers 等请求参数;
+
+    Returns:
+        object: 封装后的接口返回数据;
+    """
+    result = self._http._request(
+        method, path, timeout=self.timeout, **kwargs)
+    if wrap is None:
+        return None
+    return _get_wrap(self, wrap)(result)
 
 
 def alive(self):
@@ -61,10 +231,7 @@ def alive(self):
         布尔型: True 代表可用, False 代表不可用
     """
     timeout = self.timeout
-    verbose = self.verbose
-    max_retries = self.max_retries
-    request = HTTPRequest(
-        self.endpoint, max_retries=max_retries, verbose=verbose)
+    request = self._http
     try:
         request.get('/ping', timeout=timeout)
     except Exception:
@@ -85,12 +252,18 @@ class OAuth2(object):
         max_retries (数字, 非必填): 接口请求重试次数,默认值为 3;
         timeout (数字, 非必填): 接口请求默认超时间,默认值为 None;
         verbose (布尔, 非必填): 输出测试日志,默认值为 False;
+        pool_connections (数字, 非必填): 连接池缓存的主机数量,默认值为 10;
+        pool_maxsize (数字, 非必填): 单个主机连接池最大连接数,默认值为 10;
+        keep_alive (布尔, 非必填): 是否复用 HTTP 长连接,默认值为 True;
     """
 
     alive = alive
+    _call = _call
+    http_class = HTTPRequest
 
     def __init__(self, client_id, client_secret, endpoint=None,
-                 max_retries=None, timeout=None, verbose=False):
+                 max_retries=None, timeout=None, verbose=False,
+                 pool_connections=None, pool_maxsize=None, keep_alive=True):
         self.client_id = client_id
         self.client_secret = client_secret
         if endpoint is None:
@@ -103,7 +276,23 @@ class OAuth2(object):
             timeout = int(timeout)
         self.timeout = timeout
         self.verbose = verbose
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.keep_alive = keep_alive
         self.logger = new_logger(self.__class__.__name__, verbose=verbose)
+        # 同一实例的全部接口调用共享连接池,避免每次调用重新建立 TCP/TLS 连接
+        self._http = self.http_class(
+            endpoint,
+            max_retries=max_retries,
+            verbose=verbose,
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            keep_alive=keep_alive
+        )
+
+    def close(self):
+        """关闭连接池中的全部连接"""
+        self._http.close()
 
     def get_authorization_url(self, redirect_uri, state=None, scopes=None):
         """获取用户授权页链接地址。
@@ -147,14 +336,12 @@ class OAuth2(object):
             'redirect_uri': redirect_uri,
             'code': code
         }
-        timeout = self.timeout
-        verbose = self.verbose
-        max_retries = self.max_retries
-        request = HTTPRequest(
-            self.endpoint, max_retries=max_retries, verbose=verbose)
-        result = request.post(
-            ACCESS_TOKEN_API, data=data, timeout=timeout)
-        return models.AuthorizationCodeToken(self, result)
+        return self._call(
+            'POST',
+            ACCESS_TOKEN_API,
+            data=data,
+            wrap=partial(models.AuthorizationCodeToken, self)
+        )
 
     def exchange_refresh_token(self, refresh_token):
         """刷新令牌 access_token
@@ -171,14 +358,12 @@ class OAuth2(object):
             'grant_type': 'refresh_token',
             'refresh_token': refresh_token
         }
-        timeout = self.timeout
-        verbose = self.verbose
-        max_retries = self.max_retries
-        request = HTTPRequest(
-            self.endpoint, max_retries=max_retries, verbose=verbose)
-        result = request.post(
-            ACCESS_TOKEN_API, data=data, timeout=timeout)
-        return models.AuthorizationCodeToken(self, result)
+        return self._call(
+            'POST',
+            ACCESS_TOKEN_API,
+            data=data,
+            wrap=partial(models.AuthorizationCodeToken, self)
+        )
 
     def get_credentials_token(self):
         """客户端授权模式下获取访问令牌
@@ -191,14 +376,12 @@ class OAuth2(object):
             'client_secret': self.client_secret,
             'grant_type': constants.GRANT_TYPE_CREDENTIALS
         }
-        timeout = self.timeout
-        verbose = self.verbose
-        max_retries = self.max_retries
-        request = HTTPRequest(
-            self.endpoint, max_retries=max_retries, verbose=verbose)
-        result = request.post(
-            ACCESS_TOKEN_API, data=data, timeout=timeout)
-        return models.ClientCredentialsToken(self, result)
+        return self._call(
+            'POST',
+            ACCESS_TOKEN_API,
+            data=data,
+            wrap=partial(models.ClientCredentialsToken, self)
+        )
 
     def get_api(self, access_token):
         """获取平台 API 调用客户端对象
@@ -214,7 +397,10 @@ class OAuth2(object):
             endpoint=self.endpoint,
             max_retries=self.max_retries,
             timeout=self.timeout,
-            verbose=self.verbose)
+            verbose=self.verbose,
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            keep_alive=self.keep_alive)
 
 
 class API(object):
@@ -226,13 +412,25 @@ class API(object):
         max_retries (数字, 非必填): 接口请求重试次数,默认值为 3;
         timeout (数字, 非必填): 接口请求默认超时间,默认值为 18;
         verbose (布尔, 非必填): 输出测试日志,默认值为 False;
+        pool_connections (数字, 非必填): 连接池缓存的主机数量,默认值为 10;
+        pool_maxsize (数字, 非必填): 单个主机连接池最大连接数,默认值为 10;
+        keep_alive (布尔, 非必填): 是否复用 HTTP 长连接,默认值为 True;
+        lazy (布尔, 非必填): 接口返回值使用 LazyModel 延迟封装,不复制数据,
+                             适用于数据量较大的接口,默认值为 False;
+        progress (非必填): 文件上传、下载进度的输出方式,可以是 'text'、'rich'、
+                           回调函数 callback(description, done, total) 等,详见
+                           progress.progress_factory,默认值为 None,即不输出;
     """
 
     alive = alive
+    _call = _call
+    http_class = HTTPRequest
     token_type = 'Bearer'
 
     def __init__(self, access_token, endpoint=None, max_retries=None,
-                 timeout=None, verbose=False):
+                 timeout=None, verbose=False, pool_connections=None,
+                 pool_maxsize=None, keep_alive=True, lazy=False,
+                 progress=None):
         self.access_token = access_token
         if endpoint is None:
             endpoint = constants.DEFAULT_ENDPOINT
@@ -244,7 +442,53 @@ class API(object):
             timeout = int(timeout)
         self.timeout = timeout
         self.verbose = verbose
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.keep_alive = keep_alive
+        self.lazy = lazy
+        self.progress = progress
+        self._new_progress = progress_factory(progress)
         self.logger = new_logger(self.__class__.__name__, verbose=verbose)
+        self._cache_lock = threading.Lock()
+        self._token_meta_cache = None
+        self._bucket_cache = OrderedDict()
+        # 同一实例的全部接口调用共享连接池,避免每次调用重新建立 TCP/TLS 连接
+        self._http = self.http_class(
+            endpoint,
+            max_retries=max_retries,
+            verbose=verbose,
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            keep_alive=keep_alive
+        )
+        self._http.set_authorization(self.token_type, access_token)
+
+    def close(self):
+        """关闭连接池中的全部连接"""
+        self._http.close()
+
+    def _iter_pages(self, fetch, next_page=None, read_ahead=0, workers=None,
+                    limit=None):
+        """逐条迭代分页接口数据
+
+        Args:
+            fetch (callable): 获取单页数据的函数,参数为 next_page;
+            next_page (非必填): 起始页参数;
+            read_ahead (int, 非必填): 后台预先读取的页数;
+            workers (int, 非必填): 以页码分页的接口并发获取页面的线程数;
+            limit (int, 非必填): 并发获取页面时请求的每页数量;
+
+        Returns:
+            iterator: 数据迭代器;
+        """
+        if workers and workers > 1:
+            pages = pagination.iter_numbered_pages(
+                fetch, next_page=next_page, workers=workers, limit=limit)
+        else:
+            pages = pagination.iter_pages(fetch, next_page=next_page)
+        if read_ahead:
+            pages = pagination.read_ahead(pages, read_ahead)
+        return pagination.iter_items(pages)
 
     def introspect(self):
         """验证当前使用的 access_token 有效性
@@ -252,16 +496,12 @@ class API(object):
         Returns:
             Model: Token 元数据;
         """
-        timeout = self.timeout
-        verbose = self.verbose
-        max_retries = self.max_retries
-        request = HTTPRequest(
-            self.endpoint, max_retries=max_retries, verbose=verbose)
-        request.set_authorization(self.token_type, self.access_token)
-        result = request.get('/oauth2/introspect', params={
-            'token': self.access_token
-        }, timeout=timeout)
-        return models.Model(result)
+        return self._call(
+            'GET',
+            '/oauth2/introspect',
+            params={'token': self.access_token},
+            wrap=models.Model
+        )
 
     def get_user(self, **params):
         """获取用户信息
@@ -269,14 +509,7 @@ class API(object):
         Returns:
             Model: 用户数据;
         """
-        timeout = self.timeout
-        verbose = self.verbose
-        max_retries = self.max_retries
-        request = HTTPRequest(
-            self.endpoint, max_retries=max_retries, verbose=verbose)
-        request.set_authorization(self.token_type, self.access_token)
-        result = request.get('/profile', params=params, timeout=timeout)
-        return models.Model(result)
+        return self._call('GET', '/profile', params=params, wrap=models.Model)
 
     def get_overview(
             self,
@@ -336,14 +569,8 @@ class API(object):
             'project_id': project_id,
             'external_sample_id': external_sample_id,
         })
-        timeout = self.timeout
-        verbose = self.verbose
-        max_retries = self.max_retries
-        request = HTTPRequest(
-            self.endpoint, max_retries=max_retries, verbose=verbose)
-        request.set_authorization(self.token_type, self.access_token)
-        result = request.post('/user/overview', data=data, timeout=timeout)
-        return models.Model(result)
+        return self._call(
+            'POST', '/user/overview', data=data, wrap=models.Model)
 
     def get_variants(self, biosample_id, rsids, **params):
         """根据rsid查询变异位点信息
@@ -362,14 +589,38 @@ class API(object):
             'rsids': rsids.strip(),
             'biosample_id': biosample_id
         })
-        timeout = self.timeout
-        verbose = self.verbose
-        max_retries = self.max_retries
-        request = HTTPRequest(
-            self.endpoint, max_retries=max_retries, verbose=verbose)
-        request.set_authorization(self.token_type, self.access_token)
-        result = request.get('/variants', params=params, timeout=timeout)
-        return models.ListModel(result)
+        return self._call(
+            'GET', '/variants', params=params, wrap=models.ListModel)
+
+    def get_variants_bulk(self, biosample_ids, rsids, chunk_size=None,
+                          workers=None):
+        """批量查询多个样品的变异位点信息
+
+        rs 编号与生物样品编号去重后,按接口数量限制拆分为多次请求,通过连接池并发发
+        送,结果按 rs 编号合并,任一请求失败时抛出对应的 APIError。
+
+        Args:
+            biosample_ids (str|list): 生物样品编号,逗号分割多个或编号列表;
+            rsids (str|list): rs 编号,逗号分割多个或编号列表,数量不限;
+            chunk_size (int, 非必填): 单次请求的 rs 编号数量,默认值及最大值为
+                                      100;
+            workers (int, 非必填): 并发请求数,默认值为 4;
+
+        Returns:
+            ListModel: 按输入 rs 编号顺序排列,每个 rs 编号一项,包含 rsid 与
+                       variants;variants 以生物样品编号为键,值为该样品在此位
+                       点的变异位点列表(无数据时为空列表),如:
+                       [{'rsid': 'rs1', 'variants': {'E-B1': [{...}]}}];
+        """
+        biosample_ids, rsids, chunks = _variant_chunks(
+            biosample_ids, rsids,
+            chunk_size or constants.VARIANTS_RSIDS_LIMIT)
+        results = list(ordered_map(
+            lambda chunk: self.get_variants(*chunk),
+            chunks,
+            workers or constants.BULK_NUM_THREADS
+        ))
+        return _merge_variants(biosample_ids, rsids, chunks, results)
 
     def professional_variant(self, biosample_id, only_variant_site=True,
                              regions=None, bed_file=None):
@@ -384,9 +635,6 @@ class API(object):
             bed_file(str): 需要抽取区域的 bed 文件路径,文件须为 zip 压缩文件
                            且内容不得超过 100w 行
         """
-        timeout = self.timeout
-        verbose = self.verbose
-        max_retries = self.max_retries
         if regions is not None and bed_file is not None:
             raise BGEError(
                 'Regions and bed_file needs to provided one of them.')
@@ -408,12 +656,13 @@ class API(object):
             files = {
                 'bed_file': open(str(bed_file), 'rb')
             }
-        request = HTTPRequest(
-            self.endpoint, max_retries=max_retries, verbose=verbose)
-        request.set_authorization(self.token_type, self.access_token)
-        result = request.post(
-            '/professional/variant', data=data, files=files, timeout=timeout)
-        return models.Model(result)
+        return self._call(
+            'POST',
+            '/professional/variant',
+            data=data,
+            files=files,
+            wrap=models.Model
+        )
 
     def get_samples(self, biosample_ids=None, biosample_sites=None,
                     omics=None, project_ids=None, organisms=None,
@@ -459,14 +708,29 @@ class API(object):
             'limit': limit,
             'require_files': require_files
         })
-        timeout = self.timeout
-        verbose = self.verbose
-        max_retries = self.max_retries
-        request = HTTPRequest(
-            self.endpoint, max_retries=max_retries, verbose=verbose)
-        request.set_authorization(self.token_type, self.access_token)
-        result = request.get('/samples', params=params, timeout=timeout)
-        return models.Model(result)
+        return self._call('GET', '/samples', params=params, wrap=models.Model)
+
+    def iter_samples(self, read_ahead=0, workers=None, **kwargs):
+        """逐条迭代全部样品
+
+        Args:
+            read_ahead (int, 非必填): 后台预先读取的页数,默认值为 0,即不预读;
+            workers (int, 非必填): 并发获取页面的线程数,大于 1 时根据首页返回的
+                                   count 并发获取其余页面,结果仍按页码顺序返回;
+            **kwargs: 其他参数同 get_samples,next_page 为起始页码;
+
+        Returns:
+            iterator: 样品迭代器;
+        """
+        next_page = kwargs.pop('next_page', None)
+        kwargs.setdefault('limit', 50)
+        return self._iter_pages(
+            partial(_fetch_page, self.get_samples, kwargs),
+            next_page=next_page,
+            read_ahead=read_ahead,
+            workers=workers,
+            limit=kwargs['limit']
+        )
 
     def get_sample(self, biosample_id, require_files=None):
         """获取样品
@@ -485,14 +749,7 @@ class API(object):
         url = '/samples/{}'.format(biosample_id)
         params = {}
         params['require_files'] = require_files
-        timeout = self.timeout
-        verbose = self.verbose
-        max_retries = self.max_retries
-        request = HTTPRequest(
-            self.endpoint, max_retries=max_retries, verbose=verbose)
-        request.set_authorization(self.token_type, self.access_token)
-        result = request.get(url, params=params, timeout=timeout)
-        return models.Model(result)
+        return self._call('GET', url, params=params, wrap=models.Model)
 
     def externals(self, project_id, biosample_site, external_ids):
         """获取样品外部编号对应的 BGE 平台套件编号
@@ -510,14 +767,7 @@ class API(object):
         params['external_ids'] = external_ids
         params['biosample_site'] = biosample_site
         params['project_id'] = project_id
-        timeout = self.timeout
-        verbose = self.verbose
-        max_retries = self.max_retries
-        request = HTTPRequest(
-            self.endpoint, max_retries=max_retries, verbose=verbose)
-        request.set_authorization(self.token_type, self.access_token)
-        result = request.get(url, params=params, timeout=timeout)
-        return models.ListModel(result)
+        return self._call('GET', url, params=params, wrap=models.ListModel)
 
     def register_sample(self, external_sample_id, biosample_site,
                         project_id, **kwargs):
@@ -539,15 +789,8 @@ class API(object):
             'biosample_site': int(biosample_site),
             'project_id': project_id
         })
-        timeout = self.timeout
-        verbose = self.verbose
-        max_retries = self.max_retries
-        request = HTTPRequest(
-            self.endpoint, max_retries=max_retries, verbose=verbose)
-        request.set_authorization(self.token_type, self.access_token)
-        result = request.post(
-            '/samples/register', data=data, timeout=timeout)
-        return models.Model(result)
+        return self._call(
+            'POST', '/samples/register', data=data, wrap=models.Model)
 
     def improve_sample(self, biosample_id, **kwargs):
         """补充样品中未被赋值的信息
@@ -566,14 +809,7 @@ class API(object):
         data = {}
         data.update(kwargs)
         data['biosample_id'] = biosample_id
-        timeout = self.timeout
-        verbose = self.verbose
-        max_retries = self.max_retries
-        request = HTTPRequest(
-            self.endpoint, max_retries=max_retries, verbose=verbose)
-        request.set_authorization(self.token_type, self.access_token)
-        request.post(
-            '/samples/improve', data=data, timeout=timeout)
+        return self._call('POST', '/samples/improve', data=data, wrap=None)
 
     def get_taxon_abundance(self, biosample_id, taxon_ids=None,
                             next_page=None, limit=50, **params):
@@ -599,24 +835,37 @@ class API(object):
         if next_page is not None:
             page = next_page
         params['page'] = page
-        timeout = self.timeout
-        verbose = self.verbose
-        max_retries = self.max_retries
-        request = HTTPRequest(
-            self.endpoint, max_retries=max_retries, verbose=verbose)
-        request.set_authorization(self.token_type, self.access_token)
-        result, pagination = request.get(
-            '/microbiome/taxon_abundance', params=params, timeout=timeout)
-        # TODO: upgrade in the future
-        # 暂时特殊处理此接口,统一丰度数据的返回方式
-        ret = dict()
-        ret['count'] = count = pagination['count']
-        next_page = pagination['page'] + 1
-        if count == 0:
-            next_page = None
-        ret['next_page'] = next_page
-        ret['result'] = result
-        return models.Model(ret)
+        return self._call(
+            'GET',
+            '/microbiome/taxon_abundance',
+            params=params,
+            wrap=_wrap_taxon_abundance
+        )
+
+    def iter_taxon_abundance(self, biosample_id, read_ahead=0,
+                             workers=None, **kwargs):
+        """逐条迭代全部类群丰度
+
+        Args:
+            biosample_id (str): 生物样品编号;
+            read_ahead (int, 非必填): 后台预先读取的页数,默认值为 0,即不预读;
+            workers (int, 非必填): 并发获取页面的线程数,大于 1 时根据首页返回的
+                                   count 并发获取其余页面,结果仍按页码顺序返回;
+            **kwargs: 其他参数同 get_taxon_abundance,next_page 为起始页码;
+
+        Returns:
+            iterator: 类群丰度迭代器;
+        """
+        next_page = kwargs.pop('next_page', None)
+        kwargs['biosample_id'] = biosample_id
+        kwargs.setdefault('limit', 50)
+        return self._iter_pages(
+            partial(_fetch_page, self.get_taxon_abundance, kwargs),
+            next_page=next_page,
+            read_ahead=read_ahead,
+            workers=workers,
+            limit=kwargs['limit']
+        )
 
     def get_func_abundance(self, biosample_id, catalog, ids=None, limit=50,
                            next_page=None, **params):
@@ -642,15 +891,33 @@ class API(object):
             'next_page': next_page,
             'limit': limit
         })
-        timeout = self.timeout
-        verbose = self.verbose
-        max_retries = self.max_retries
-        request = HTTPRequest(
-            self.endpoint, max_retries=max_retries, verbose=verbose)
-        request.set_authorization(self.token_type, self.access_token)
-        result = request.get(
-            '/microbiome/func_abundance', params=params, timeout=timeout)
-        return models.Model(result)
+        return self._call(
+            'GET',
+            '/microbiome/func_abundance',
+            params=params,
+            wrap=models.Model
+        )
+
+    def iter_func_abundance(self, biosample_id, catalog, read_ahead=0,
+                            **kwargs):
+        """逐条迭代全部功能丰度
+
+        Args:
+            biosample_id (str): 生物样品编号;
+            catalog (str): 目录标签,同 get_func_abundance;
+            read_ahead (int, 非必填): 后台预先读取的页数,默认值为 0,即不预读;
+            **kwargs: 其他参数同 get_func_abundance;
+
+        Returns:
+            iterator: 功能丰度迭代器;
+        """
+        next_page = kwargs.pop('next_page', None)
+        kwargs.update(biosample_id=biosample_id, catalog=catalog)
+        return self._iter_pages(
+            partial(_fetch_page, self.get_func_abundance, kwargs),
+            next_page=next_page,
+            read_ahead=read_ahead
+        )
 
     def get_gene_abundance(self, biosample_id, catalog, data_type, ids=None,
                            limit=None, next_page=None, **params):
@@ -678,15 +945,34 @@ class API(object):
             'next_page': next_page,
             'limit': limit
         })
-        timeout = self.timeout
-        verbose = self.verbose
-        max_retries = self.max_retries
-        request = HTTPRequest(
-            self.endpoint, max_retries=max_retries, verbose=verbose)
-        request.set_authorization(self.token_type, self.access_token)
-        result = request.get(
-            '/microbiome/gene_abundance', params=params, timeout=timeout)
-        return models.Model(result)
+        return self._call(
+            'GET',
+            '/microbiome/gene_abundance',
+            params=params,
+            wrap=models.Model
+        )
+
+    def iter_gene_abundance(self, biosample_id, catalog, read_ahead=0,
+                            **kwargs):
+        """逐条迭代全部基因丰度(data_type 为 list)
+
+        Args:
+            biosample_id (str): 生物样品编号;
+            catalog (str): 分类标签,同 get_gene_abundance;
+            read_ahead (int, 非必填): 后台预先读取的页数,默认值为 0,即不预读;
+            **kwargs: 其他参数同 get_gene_abundance;
+
+        Returns:
+            iterator: 基因丰度迭代器;
+        """
+        next_page = kwargs.pop('next_page', None)
+        kwargs.update(
+            biosample_id=biosample_id, catalog=catalog, data_type='list')
+        return self._iter_pages(
+            partial(_fetch_page, self.get_gene_abundance, kwargs),
+            next_page=next_page,
+            read_ahead=read_ahead
+        )
 
     def get_upload_token(self, region_id=None, internal=False, **kwargs):
         """获取文件上传授权
@@ -696,29 +982,28 @@ class API(object):
         Returns:
             Model: 授权数据;
         """
-        timeout = self.timeout
-        verbose = self.verbose
-        max_retries = self.max_retries
         data = {}
         data.update(kwargs)
         data.update({
             'region_id': region_id,
             'internal': internal,
         })
-        request = HTTPRequest(
-            self.endpoint, max_retries=max_retries, verbose=verbose)
-        request.set_authorization(self.token_type, self.access_token)
-        result = request.post('/sts/token', data=data, timeout=timeout)
-        return models.Model(result)
+        return self._call('POST', '/sts/token', data=data, wrap=models.Model)
 
     def upload(self, filename, file_or_string, part_size=None,
                multipart_threshold=None, multipart_num_threads=None,
                cmk_id=None, region_id=None, internal=False):
         """上传文件
 
+        file_or_string 为文件路径时使用 oss2 断点续传上传;为管道等不支持 seek 的
+        文件对象、bytes 迭代器(如生成器),或剩余长度不小于 multipart_threshold
+        的文件对象时,边读取边切分为 part_size 大小的分片并发上传,内存中最多同时
+        保留 multipart_num_threads 个分片;其他数据使用单个请求上传。
+
         Args:
             filename (str): 要上传到服务器的文件名;
-            file_or_string (file-like-object or str): 文件内容或类文件对象;
+            file_or_string (file-like-object or str or iterable): 文件路径、文件
+                内容、类文件对象或 bytes 迭代器;
             part_size(num): 单个分片大小, 默认 50MB;
             multipart_threshold(num): 上传数据大于或等于该值时分片上传, 默认 100M;
             multipart_num_threads: 分片上传缺省线程数, 默认 4;
@@ -746,9 +1031,21 @@ class API(object):
 
     def batch_upload(self, files, part_size=None,
                      multipart_threshold=None, multipart_num_threads=None,
-                     cmk_id=None, region_id=None, internal=False):
+                     cmk_id=None, region_id=None, internal=False,
+                     workers=None, max_in_flight=None, sync=False,
+                     manifest=None, return_results=False):
         """批量上传文件
 
+        多个文件在线程池中并发上传,文件级线程与分片上传线程共享同一并发限制,同时进
+        行中的上传请求数不超过 max_in_flight。任一文件上传失败时按文件顺序抛出首个
+        异常并取消尚未开始的上传;return_results 为 True 时单个文件上传失败不会中
+        断其他文件的上传,失败原因记录在返回结果中。未提供 cmk_id 时,STS 临时凭证在过期前于后
+        台自动刷新,上传时间不受凭证有效期限制。
+
+        sync 为 True 时增量上传:在上传线程中分块计算文件的 CRC64 与 MD5,与通过
+        HEAD 请求获取的远端对象 CRC64(或 ETag)一致时跳过上传。文件摘要缓存在
+        manifest 中,文件大小与修改时间未变化时不会重新计算。
+
         Args:
             files (FileItem object list): 要上传到服务器的文件列表;
             part_size(num): 单个分片大小, 默认 50MB;
@@ -757,45 +1054,55 @@ class API(object):
             cmk_id (str): 阿里云 KMS 服务用户主密钥 ID,加密上传时提供 CMK ID 即可;
             region_id(str): 阿里云 OSS 区域编号，默认 oss-cn-shenzhen；
             internal(bool): 是否使用内部 VPN 域名，默认 False；
+            workers (int, 非必填): 同时上传的文件数, 默认 4;
+            max_in_flight (int, 非必填): 同时进行中的上传请求(含分片)数上限,
+                                         默认 8;
+            sync (bool, 非必填): 是否跳过内容未变化的文件, 默认 False;
+            manifest (str|HashManifest, 非必填): 增量上传时的文件摘要缓存路径,
+                默认 ~/.bge/upload_manifest.json;
+            return_results (bool, 非必填): 是否返回逐个文件的上传结果, 默认
+                                           False;
 
         Returns:
-            object_name: 文件的 OSS 对象名;
+            ListModel: 与 files 顺序一致的文件 OSS 对象名列表;return_results
+                       为 True 时为上传结果列表,每项包含 filename、
+                       object_name(失败时为 None)、skipped(是否因内容未变化
+                       跳过上传)与 error(成功时为 None);
         """
         if not files:
             raise BGEError('files is required')
-        object_names = []
-        if isinstance(files, (list, tuple)):
+        if isinstance(files, FileItem):
             files = [files]
-        token = self.get_upload_token(
+        items = [
+            (f.filename, f.file_or_string)
+            for f in files if isinstance(f, FileItem)
+        ]
+        return self._upload_files(
+            items,
+            part_size=part_size,
+            multipart_threshold=multipart_threshold,
+            multipart_num_threads=multipart_num_threads,
+            cmk_id=cmk_id,
             region_id=region_id,
-            internal=internal
+            internal=internal,
+            workers=workers,
+            max_in_flight=max_in_flight,
+            sync=sync,
+            manifest=manifest,
+            return_results=return_results
         )
-        for file_obj in files:
-            if not isinstance(file_obj, FileItem):
-                continue
-            filename = file_obj.filename
-            file_or_string = file_obj.file_or_string
-            sys.stdout.write('开始上传: {}\n'.format(filename))
-            object_name = self._upload(
-                token,
-                filename,
-                file_or_string,
-                part_size=part_size,
-                multipart_threshold=multipart_threshold,
-                multipart_num_threads=multipart_num_threads,
-                cmk_id=cmk_id
-            )
-            sys.stdout.write('\n\n')
-            sys.stdout.flush()
-            object_names.append(object_name)
-        return models.ListModel(object_names)
 
     def upload_dir(self, dirpath, part_size=None,
                    multipart_threshold=None, multipart_num_threads=None,
-                   cmk_id=None, region_id=None, internal=False):
-        """上传目录下的文件(不递归上传子文件夹中文件)
+                   cmk_id=None, region_id=None, internal=False,
+                   recursive=False, include=None, exclude=None,
+                   workers=None, max_in_flight=None, sync=False,
+                   manifest=None, return_results=False):
+        """上传目录下的文件
 
-        仅上传目录中的文件,软链接、符号链接、文件夹均不会上传至平台。
+        仅上传目录中的文件,软链接、符号链接均不会上传至平台。recursive 为 True 时
+        递归上传子目录中的文件,并在 STS 授权的 destination 下保留文件的相对路径。
+        目录在上传过程中逐步遍历,文件在线程池中并发上传。
 
         Args:
             dirpath (str): 要上传到服务器的文件夹;
@@ -803,51 +1110,221 @@ class API(object):
             multipart_threshold(num): 上传数据大于或等于该值时分片上传, 默认 100M;
             multipart_num_threads: 分片上传缺省线程数, 默认 4;
             cmk_id (str): 阿里云 KMS 服务用户主密钥 ID,加密上传时提供 CMK ID 即可;
+            region_id(str): 阿里云 OSS 区域编号，默认 oss-cn-shenzhen；
+            internal(bool): 是否使用内部 VPN 域名，默认 False；
+            recursive (bool, 非必填): 是否递归上传子目录中的文件, 默认 False;
+            include (list, 非必填): glob 规则列表,提供时仅上传匹配的文件,
+                                    如 ['*.fastq.gz'];
+            exclude (list, 非必填): glob 规则列表,忽略匹配的文件与子目录;
+            workers (int, 非必填): 同时上传的文件数, 默认 4;
+            max_in_flight (int, 非必填): 同时进行中的上传请求(含分片)数上限,
+                                         默认 8;
+            sync (bool, 非必填): 是否跳过内容未变化的文件, 默认 False;
+            manifest (str|HashManifest, 非必填): 增量上传时的文件摘要缓存路径,
+                默认 ~/.bge/upload_manifest.json;
+            return_results (bool, 非必填): 是否返回逐个文件的上传结果, 默认
+                                           False;
 
         Returns:
-            object_names: 上传的文件 OSS 对象名列表;
+            ListModel: 上传的文件 OSS 对象名列表,return_results 为 True 时为
+                       上传结果列表,格式同 batch_upload;
+        """
+        items = iter_files(
+            dirpath, recursive=recursive, include=include, exclude=exclude)
+        return self._upload_files(
+            items,
+            part_size=part_size,
+            multipart_threshold=multipart_threshold,
+            multipart_num_threads=multipart_num_threads,
+            cmk_id=cmk_id,
+            region_id=region_id,
+            internal=internal,
+            workers=workers,
+            max_in_flight=max_in_flight,
+            sync=sync,
+            manifest=manifest,
+            return_results=return_results
+        )
+
+    def _upload_files(self, items, part_size=None, multipart_threshold=None,
+                      multipart_num_threads=None, cmk_id=None,
+                      region_id=None, internal=False, workers=None,
+                      max_in_flight=None, sync=False, manifest=None,
+                      return_results=False):
+        """并发上传 (filename, file_or_string) 序列
+
+        return_results 为 False 时返回对象名列表,任一文件失败时抛出异常;否则返
+        回逐个文件的上传结果。
         """
+        if workers is None:
+            workers = constants.BATCH_UPLOAD_NUM_THREADS
+        if max_in_flight is None:
+            max_in_flight = constants.UPLOAD_MAX_IN_FLIGHT
         token = self.get_upload_token(
             region_id=region_id,
             internal=internal
         )
-        object_names = []
-        for filename in os.listdir(dirpath):
-            filepath = join(dirpath, filename)
-            if isdir(filepath):
-                continue
-            sys.stdout.write('开始上传: {}\n'.format(filepath))
+        client_id = self._get_client_id()
+        limiter = TransferLimiter(max_in_flight)
+        if cmk_id is None:
+            # 批量上传可能持续数小时,STS 凭证在过期前自动刷新
+            provider = STSCredentialsProvider(
+                partial(
+                    self.get_upload_token,
+                    region_id=region_id,
+                    internal=internal
+                ),
+                token=token
+            )
+            bucket = self._new_bucket(token, credentials_provider=provider)
+        else:
+            bucket = self._get_bucket(token, cmk_id=cmk_id)
+        bucket = limiter.limit_bucket(bucket)
+        if sync and not isinstance(manifest, HashManifest):
+            if manifest is None:
+                manifest = os.path.join(
+                    os.path.expanduser('~'), '.bge', 'upload_manifest.json')
+            manifest = HashManifest(manifest)
+
+        def upload(item):
+            filename, file_or_string = item
+            if sync:
+                object_name = '%s/%s' % (token.destination, filename)
+                if self._unchanged(
+                        bucket, object_name, file_or_string, manifest):
+                    return models.Model({
+                        'filename': filename,
+                        'object_name': object_name,
+                        'skipped': True,
+                        'error': None
+                    })
             object_name = self._upload(
                 token,
                 filename,
-                filepath,
+                file_or_string,
                 part_size=part_size,
                 multipart_threshold=multipart_threshold,
                 multipart_num_threads=multipart_num_threads,
-                cmk_id=cmk_id
+                cmk_id=cmk_id,
+                bucket=bucket,
+                client_id=client_id
             )
-            sys.stdout.write('\n\n')
-            sys.stdout.flush()
-            object_names.append(object_name)
-        return models.ListModel(object_names)
+            return models.Model({
+                'filename': filename,
+                'object_name': object_name,
+                'skipped': False,
+                'error': None
+            })
+
+        def report(item):
+            try:
+                return upload(item)
+            except Exception as e:
+                return models.Model({
+                    'filename': item[0],
+                    'object_name': None,
+                    'skipped': False,
+                    'error': '%s: %s' % (e.__class__.__name__, e)
+                })
 
-    def _upload(self, token, filename, file_or_string, part_size=None,
-                multipart_threshold=None, multipart_num_threads=None,
-                cmk_id=None):
-        if part_size is None:
-            part_size = constants.PART_SIZE
-        if multipart_threshold is None:
-            multipart_threshold = constants.MULTIPART_THRESHOLD
-        if multipart_num_threads is None:
-            multipart_num_threads = constants.MULTIPART_NUM_THREADS
+        try:
+            if return_results:
+                results = list(ordered_map(report, items, workers))
+            else:
+                # 首个失败的文件抛出异常,迭代器关闭时取消尚未开始的上传
+                results = [
+                    result.object_name
+                    for result in ordered_map(upload, items, workers)
+                ]
+        finally:
+            if sync:
+                manifest.save()
+        return models.ListModel(results)
+
+    def _unchanged(self, bucket, object_name, file_or_string, manifest):
+        """增量上传时判断远端对象的内容是否与本地数据一致
+
+        仅比较文件路径、bytes 与 str,文件对象与迭代器总是重新上传。
+        """
+        if isinstance(file_or_string, str) and isfile(file_or_string):
+            crc64, md5 = manifest.digest(file_or_string)
+        elif isinstance(file_or_string, (bytes, bytearray, str)):
+            if isinstance(file_or_string, str):
+                file_or_string = file_or_string.encode('utf-8')
+            digest = Digest()
+            digest.update(file_or_string)
+            crc64, md5 = digest.crc64, digest.md5
+        else:
+            return False
+        from oss2.exceptions import OssError
+        try:
+            result = bucket.head_object(object_name)
+        except OssError:
+            return False
+        return remote_matches(result, crc64, md5)
+
+    def _get_token_meta(self):
+        """获取 access_token 元数据,结果缓存至令牌过期
+
+        令牌元数据包含 exp(过期时间戳)或 expires_in 时缓存至过期前,否则缓存
+        INTROSPECT_CACHE_TTL 秒;令牌无效时不缓存。
+        """
+        with self._cache_lock:
+            cached = self._token_meta_cache
+            if cached is not None and cached[1] > time.time():
+                return cached[0]
         token_meta = self.introspect()
         if token_meta['active'] == False:
             raise BGEError('access_token has expired')
-        client_id = token_meta['client_id']
+        now = time.time()
+        expires_at = now + constants.INTROSPECT_CACHE_TTL
+        if token_meta.get('exp'):
+            expires_at = min(expires_at, float(token_meta['exp']))
+        elif token_meta.get('expires_in'):
+            expires_at = min(
+                expires_at, now + float(token_meta['expires_in']))
+        with self._cache_lock:
+            self._token_meta_cache = (token_meta, expires_at)
+        return token_meta
+
+    def _get_client_id(self):
+        return self._get_token_meta()['client_id']
+
+    def _get_bucket(self, token, cmk_id=None):
+        """获取 STS 授权对应的 OSS 存储空间对象
+
+        同一 STS 临时凭证与 cmk_id 对应的存储空间对象会被缓存复用,避免批量上传时
+        为每个文件重新创建认证对象与 KMS 客户端。
+        """
+        credentials = token.credentials
+        key = (
+            credentials['access_key_id'],
+            credentials['security_token'],
+            token.endpoint,
+            token.bucket,
+            cmk_id
+        )
+        with self._cache_lock:
+            bucket = self._bucket_cache.get(key)
+            if bucket is not None:
+                return bucket
+        bucket = self._new_bucket(token, cmk_id=cmk_id)
+        with self._cache_lock:
+            self._bucket_cache[key] = bucket
+            while len(self._bucket_cache) > constants.BUCKET_CACHE_SIZE:
+                self._bucket_cache.popitem(last=False)
+        return bucket
+
+    def _new_bucket(self, token, cmk_id=None, credentials_provider=None):
+        # oss2 与 KMS 依赖仅在上传时导入,减少导入 SDK 的耗时
+        import oss2
         credentials = token.credentials
-        destination = token.destination
         bucket_name = token.bucket
         endpoint = token.endpoint
+        if credentials_provider is not None:
+            # KMS 加密上传不支持刷新凭证
+            auth = oss2.ProviderAuth(credentials_provider)
+            return oss2.Bucket(auth, endpoint, bucket_name)
         access_key_id = credentials['access_key_id']
         access_key_secret = credentials['access_key_secret']
         security_token = credentials['security_token']
@@ -857,39 +1334,68 @@ class API(object):
             region_id = token.region_id
             kms_provider = oss2.AliKMSProvider(
                 access_key_id, access_key_secret, region_id, cmk_id)
+            from aliyunsdkcore.auth.credentials import StsTokenCredential
+            from aliyunsdkcore.client import AcsClient
             # NOTE 官方 oss2 处理 STS 加密上传存在 bug,等待其修复,此处做代码动态修改
             sts_token_credential = StsTokenCredential(
                 access_key_id, access_key_secret, security_token)
             kms_provider.kms_client = AcsClient(
                 region_id=region_id, credential=sts_token_credential)
-            bucket = oss2.CryptoBucket(
+            return oss2.CryptoBucket(
                 auth, endpoint, bucket_name, crypto_provider=kms_provider)
-        else:
-            bucket = oss2.Bucket(auth, endpoint, bucket_name)
+        return oss2.Bucket(auth, endpoint, bucket_name)
+
+    def _upload(self, token, filename, file_or_string, part_size=None,
+                multipart_threshold=None, multipart_num_threads=None,
+                cmk_id=None, bucket=None, client_id=None):
+        if part_size is None:
+            part_size = constants.PART_SIZE
+        if multipart_threshold is None:
+            multipart_threshold = constants.MULTIPART_THRESHOLD
+        if multipart_num_threads is None:
+            multipart_num_threads = constants.MULTIPART_NUM_THREADS
+        if client_id is None:
+            client_id = self._get_client_id()
+        if bucket is None:
+            bucket = self._get_bucket(token, cmk_id=cmk_id)
+        destination = token.destination
         object_name = '%s/%s' % (destination, filename)
         bge_open_client_id_header = 'x-oss-meta-bge-open-client-id'
         custom_headers = { bge_open_client_id_header: client_id }
-        if isinstance(file_or_string, str) and isfile(file_or_string):
-            # 分片上传仅支持文件路径，不支持文件对象
-            oss2.resumable_upload(
-                bucket,
-                object_name,
-                file_or_string,
-                progress_callback=progress_callback,
-                headers=custom_headers,
-                part_size=part_size,
-                num_threads=multipart_num_threads,
-                multipart_threshold=multipart_threshold
-            )
-        else:
-            bucket.put_object(
-                object_name,
-                file_or_string,
-                headers=custom_headers,
-                progress_callback=progress_callback
-            )
-        sys.stdout.write('\n')
-        sys.stdout.flush()
+        with self._new_progress(filename, None) as progress:
+            if isinstance(file_or_string, str) and isfile(file_or_string):
+                # 分片上传仅支持文件路径，不支持文件对象
+                from oss2 import resumable_upload
+                resumable_upload(
+                    bucket,
+                    object_name,
+                    file_or_string,
+                    progress_callback=progress.set,
+                    headers=custom_headers,
+                    part_size=part_size,
+                    num_threads=multipart_num_threads,
+                    multipart_threshold=multipart_threshold
+                )
+            elif cmk_id is None and is_stream(
+                    file_or_string, multipart_threshold):
+                # 管道与迭代器边读取边分片上传,内存中最多保留
+                # multipart_num_threads 个分片
+                stream_upload(
+                    bucket,
+                    object_name,
+                    file_or_string,
+                    part_size,
+                    num_threads=multipart_num_threads,
+                    headers=custom_headers,
+                    callback=progress.update
+                )
+            else:
+                bucket.put_object(
+                    object_name,
+                    file_or_string,
+                    headers=custom_headers,
+                    progress_callback=progress.set
+                )
         return object_name
 
     def get_download_url(self, object_name, region=None,
@@ -912,72 +1418,313 @@ class API(object):
             'region': region,
             'expiration_time': expiration_time
         })
-        timeout = self.timeout
-        verbose = self.verbose
-        max_retries = self.max_retries
-        request = HTTPRequest(
-            self.endpoint, max_retries=max_retries, verbose=verbose)
-        request.set_authorization(self.token_type, self.access_token)
-        result = request.post('/oss/sign_url', data=data, timeout=timeout)
-        return models.Model(result)
+        return self._call(
+            'POST', '/oss/sign_url', data=data, wrap=models.Model)
 
     def download(self, object_name, fp, region=None,
-                 expiration_time=600, chunk_size=8192, **kwargs):
+                 expiration_time=600, chunk_size=None, workers=None,
+                 part_size=None, **kwargs):
         """下载存储在阿里云OSS(对象存储)中的文件
 
+        fp 支持 seek、不是追加模式且服务端返回 Accept-Ranges 时,大于 part_size 的文件按区间
+        拆分,通过多个 HTTP Range 请求并发下载并写入对应位置(支持时使用
+        os.pwrite);否则使用单个连接顺序下载。需要断点续传时请使用
+        download_file。
+
         Args:
             object_name (str): OSS对象;
             fp(file like object): 可写的类文件对象;
             region (str, 非必填): 区域(domestic、international),默认值为
                                  domestic;
-            chunk_size(int): 下载块大小
+            chunk_size(int): 下载块大小,默认 1MB;
             expiration_time (int, 非必填): 下载地址过期时间,默认值 600s;
+            workers (int, 非必填): 并发下载的连接数,默认 4,为 1 时顺序下载;
+            part_size (int, 非必填): 单个下载区间大小,默认 16MB;
         Returns:
             None
         """
-        inst = self.get_download_url(
-            object_name, region=None, expiration_time=expiration_time,
-            **kwargs)
-        size = 0
-        prog_size = 61  # 单行输出的进度条固定为 80 个字符长度
-        url = inst.url
+        if chunk_size is None:
+            chunk_size = constants.DOWNLOAD_CHUNK_SIZE
+        if workers is None:
+            workers = constants.DOWNLOAD_NUM_THREADS
+        if part_size is None:
+            part_size = constants.DOWNLOAD_PART_SIZE
         chunk_size = int(chunk_size)
-        sys.stdout.write('\nStart downloading: %s' % object_name)
-        sys.stdout.write('\n\n')
+        url = _DownloadURL(
+            self, object_name, region=region,
+            expiration_time=expiration_time, **kwargs)
         timeout = self.timeout
         try:
-            with requests.get(url, stream=True, timeout=timeout) as r:
+            with self._new_download_session(workers) as session, \
+                    session.get(url.url, stream=True, timeout=timeout) as r:
+                r.raise_for_status()
                 total = r.headers.get('content-length')
                 if total is not None:
                     total = int(total)
-                    for chunk in r.iter_content(chunk_size):
-                        size += len(chunk)
-                        eq_size = int(size * prog_size / total)
-                        equal_s = '=' * eq_size
-                        blank_s = ' ' * (prog_size - eq_size)
-                        progress = '>'.join((equal_s, blank_s))
-                        percent = '%.2f%%' % float(size / total * 100)
-                        sys.stdout.write(
-                            '\r\t%s [%s]' % (percent.rjust(7), progress)
-                        )
-                        sys.stdout.flush()
-                        fp.write(chunk)
-                else:
-                    for chunk in r.iter_content(chunk_size):
-                        size += len(chunk)
-                        sys.stdout.write(
-                            '\r\t已下载文件：%s' % human_byte(size).ljust(7)
-                        )
-                        sys.stdout.flush()
-                        fp.write(chunk)
-                sys.stdout.write('\n')
+                accept_ranges = r.headers.get('Accept-Ranges', '').lower()
+                with self._new_progress(object_name, total) as progress:
+                    # 追加模式的文件无法按位置写入,只能顺序下载
+                    if (workers > 1 and is_seekable(fp)
+                            and not is_appending(fp)
+                            and total is not None and total > part_size
+                            and accept_ranges == 'bytes'):
+                        fp.flush()
+                        base = fp.tell()
+                        fp.truncate(base + total)
+                        writer = FileWriter(fp, base=base)
+                        position = _write_first_part(
+                            r, writer, part_size, chunk_size, progress)
+                        ranges = split_ranges(position, total, part_size)
+                        self._fetch_ranges(
+                            session, url, writer, ranges, chunk_size,
+                            workers, progress)
+                        fp.seek(base + total)
+                    else:
+                        for chunk in r.iter_content(chunk_size):
+                            fp.write(chunk)
+                            progress.update(len(chunk))
                 flush_func = getattr(fp, 'flush', None)
                 if flush_func:
                     flush_func()
-        except requests.exceptions.HTTPError:
-            raise BGEError('download request error')
-        except Exception as e:
-            raise BGEError(e)
+        except requests.exceptions.HTTPError as e:
+            raise BGEError('fail to download %s: %s' % (object_name, e))
+        except requests.exceptions.RequestException as e:
+            raise BGEError('fail to download %s: %s' % (object_name, e))
+
+    def download_file(self, object_name, filepath, region=None,
+                      expiration_time=600, chunk_size=None, workers=None,
+                      part_size=None, resume=True, **kwargs):
+        """下载文件至本地路径,支持断点续传
+
+        下载过程中已完成的区间记录在目标文件旁的 <filepath>.bgedownload 中,数据写
+        入 <filepath>.bgepart,全部完成后替换为目标文件。下载中断后再次调用时会重新
+        获取下载地址,仅下载尚未完成的区间;下载地址在下载过程中过期时自动重新获取。
+        服务端不支持 HTTP Range 时顺序下载且不支持断点续传。
+
+        Args:
+            object_name (str): OSS对象;
+            filepath (str): 本地文件路径;
+            region (str, 非必填): 区域(domestic、international),默认值为
+                                 domestic;
+            expiration_time (int, 非必填): 下载地址过期时间,默认值 600s;
+            chunk_size(int): 下载块大小,默认 1MB;
+            workers (int, 非必填): 并发下载的连接数,默认 4;
+            part_size (int, 非必填): 单个下载区间大小,默认 16MB;
+            resume (bool, 非必填): 存在下载记录时是否继续下载,默认 True;
+
+        Raises:
+            BGEError: 下载失败,已完成的区间会被保留,再次调用即可继续下载;
+
+        Returns:
+            str: 本地文件路径;
+        """
+        url = _DownloadURL(
+            self, object_name, region=region,
+            expiration_time=expiration_time, **kwargs)
+        self._download_file(
+            url, filepath, chunk_size=chunk_size, workers=workers,
+            part_size=part_size, resume=resume)
+        return filepath
+
+    def download_many(self, object_names, dest_dir, region=None,
+                      expiration_time=600, chunk_size=None, workers=None,
+                      part_workers=None, part_size=None, sign_ahead=None,
+                      keep_dirs=False, resume=True, **kwargs):
+        """批量下载文件至本地目录
+
+        按顺序获取下载地址,除正在下载的 workers 个文件外最多提前获取 sign_ahead
+        个文件的下载地址,文件在线程池中并发下载,地址临近过期时在使用前重新获取。单个文件下载失败不会中断其他文件的下
+        载,失败原因记录在返回结果中;各文件均支持断点续传,再次调用即可继续下载失
+        败的文件。
+
+        Args:
+            object_names (list): OSS对象列表;
+            dest_dir (str): 本地目录,不存在时自动创建;
+            region (str, 非必填): 区域(domestic、international),默认值为
+                                 domestic;
+            expiration_time (int, 非必填): 下载地址过期时间,默认值 600s;
+            chunk_size(int): 下载块大小,默认 1MB;
+            workers (int, 非必填): 同时下载的文件数,默认 4;
+            part_workers (int, 非必填): 单个文件并发下载的连接数,默认 1;
+            part_size (int, 非必填): 单个下载区间大小,默认 16MB;
+            sign_ahead (int, 非必填): 提前获取下载地址的文件数,默认同 workers;
+            keep_dirs (bool, 非必填): 是否在 dest_dir 下保留对象的目录结构,默认
+                                      False,即仅使用文件名;
+            resume (bool, 非必填): 存在下载记录时是否继续下载,默认 True;
+
+        Returns:
+            ListModel: 与 object_names 顺序一致的下载结果,每项包含
+                       object_name、filepath、size(本次下载的字节数)、
+                       elapsed(耗时秒数)、speed(字节/秒)与 error(成功时为
+                       None);
+        """
+        if workers is None:
+            workers = constants.DOWNLOAD_MANY_NUM_THREADS
+        if part_workers is None:
+            part_workers = 1
+        if sign_ahead is None:
+            sign_ahead = workers
+        object_names = list(object_names)
+        targets = OrderedDict()
+        for object_name in object_names:
+            filepath = _local_path(dest_dir, object_name, keep_dirs)
+            if filepath in targets:
+                raise BGEError(
+                    '%s and %s are both downloaded to %s' % (
+                        targets[filepath], object_name, filepath))
+            targets[filepath] = object_name
+
+        def sign(item):
+            filepath, object_name = item
+            try:
+                url = _DownloadURL(
+                    self, object_name, region=region,
+                    expiration_time=expiration_time, **kwargs)
+            except Exception as e:
+                return object_name, filepath, None, e
+            return object_name, filepath, url, None
+
+        def download(item):
+            object_name, filepath, url, error = item
+            started = time.time()
+            size = 0
+            if error is None:
+                try:
+                    dirname = os.path.dirname(filepath)
+                    if dirname:
+                        os.makedirs(dirname, exist_ok=True)
+                    size = self._download_file(
+                        url, filepath, chunk_size=chunk_size,
+                        workers=part_workers, part_size=part_size,
+                        resume=resume)
+                except Exception as e:
+                    error = e
+            elapsed = time.time() - started
+            return models.Model({
+                'object_name': object_name,
+                'filepath': None if error else filepath,
+                'size': size,
+                'elapsed': elapsed,
+                'speed': size / elapsed if elapsed else 0,
+                'error': '%s: %s' % (
+                    error.__class__.__name__, error) if error else None
+            })
+
+        # 在提交下载任务前才获取下载地址,正在下载的文件之外最多提前获取
+        # sign_ahead 个文件的地址,避免地址在使用前过期
+        signed = (sign(item) for item in targets.items())
+        window = workers + max(int(sign_ahead), 0)
+        return models.ListModel(
+            list(ordered_map(download, signed, workers, window=window)))
+
+    def _download_file(self, url, filepath, chunk_size=None, workers=None,
+                       part_size=None, resume=True):
+        """下载 url 对应的对象至 filepath,返回本次下载的字节数"""
+        object_name = url.object_name
+        if chunk_size is None:
+            chunk_size = constants.DOWNLOAD_CHUNK_SIZE
+        if workers is None:
+            workers = constants.DOWNLOAD_NUM_THREADS
+        if part_size is None:
+            part_size = constants.DOWNLOAD_PART_SIZE
+        chunk_size = int(chunk_size)
+        part_size = int(part_size)
+        timeout = self.timeout
+        try:
+            with self._new_download_session(workers) as session:
+                # 请求首个字节,获取对象大小并确认服务端是否支持 HTTP Range
+                with session.get(
+                        url.url, headers={'Range': 'bytes=0-0'},
+                        stream=True, timeout=timeout) as r:
+                    if r.status_code == 416:
+                        total = 0
+                    elif r.status_code == 206:
+                        total = int(
+                            r.headers['Content-Range'].rsplit('/', 1)[1])
+                    else:
+                        r.raise_for_status()
+                        return self._download_stream(
+                            r, filepath, chunk_size, object_name)
+                    identity = {
+                        'object_name': object_name,
+                        'size': total,
+                        'etag': r.headers.get('ETag'),
+                        'last_modified': r.headers.get('Last-Modified'),
+                        'part_size': part_size
+                    }
+                checkpoint = DownloadCheckpoint(filepath, identity)
+                if not (resume and checkpoint.load()):
+                    with open(checkpoint.part_path, 'wb') as fp:
+                        fp.truncate(total)
+                    checkpoint.save()
+                all_ranges = split_ranges(0, total, part_size)
+                ranges = [r for r in all_ranges if r not in checkpoint.done]
+                done = total - sum(l - f + 1 for f, l in ranges)
+                progress = self._new_progress(object_name, total)
+                progress.set(done)
+                with open(checkpoint.part_path, 'r+b') as fp, progress:
+                    writer = FileWriter(fp)
+                    try:
+                        self._fetch_ranges(
+                            session, url, writer, ranges, chunk_size,
+                            workers, progress, on_done=checkpoint.add)
+                    except (BGEError, requests.exceptions.RequestException,
+                            OSError) as e:
+                        raise BGEError(
+                            'download of %s interrupted, %d/%d parts '
+                            'completed, call again to resume: %s' % (
+                                object_name, len(checkpoint.done),
+                                len(all_ranges), e))
+                checkpoint.finish()
+        except requests.exceptions.HTTPError as e:
+            raise BGEError('fail to download %s: %s' % (object_name, e))
+        except requests.exceptions.RequestException as e:
+            raise BGEError('fail to download %s: %s' % (object_name, e))
+        return progress.done - done
+
+    def _new_download_session(self, workers):
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=1, pool_maxsize=max(int(workers), 1))
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def _fetch_ranges(self, session, url, writer, ranges, chunk_size,
+                      workers, progress, on_done=None):
+        """并发下载各区间,下载地址过期(HTTP 403)时重新获取后重试"""
+        def fetch(rng):
+            current = url.url
+            try:
+                fetch_range(
+                    session, current, writer, rng[0], rng[1],
+                    chunk_size=chunk_size, timeout=self.timeout,
+                    callback=progress.update)
+            except RangeError as e:
+                if e.status_code != 403:
+                    raise
+                fetch_range(
+                    session, url.refresh(current), writer, rng[0], rng[1],
+                    chunk_size=chunk_size, timeout=self.timeout,
+                    callback=progress.update)
+            if on_done is not None:
+                on_done(rng)
+
+        for _ in ordered_map(fetch, ranges, workers):
+            pass
+
+    def _download_stream(self, r, filepath, chunk_size, object_name):
+        """服务端不支持 HTTP Range 时顺序下载整个文件,返回下载的字节数"""
+        part_path = filepath + DownloadCheckpoint.part_suffix
+        total = r.headers.get('content-length')
+        progress = self._new_progress(
+            object_name, int(total) if total else None)
+        with open(part_path, 'wb') as fp, progress:
+            for chunk in r.iter_content(chunk_size):
+                fp.write(chunk)
+                progress.update(len(chunk))
+        os.replace(part_path, filepath)
+        return progress.done
 
     def ferry_to_oss(self, account, password, project_no, biosample_cnt,
                      included_filename_exts=None, sample_names=None,
@@ -1015,15 +1762,8 @@ class API(object):
             'sample_names': sample_names,
             'action': action
         })
-        timeout = self.timeout
-        verbose = self.verbose
-        max_retries = self.max_retries
-        request = HTTPRequest(
-            self.endpoint, max_retries=max_retries, verbose=verbose)
-        request.set_authorization(self.token_type, self.access_token)
-        result = request.post(
-            '/ferry/download_to_oss', data=data, timeout=timeout)
-        return models.Model(result)
+        return self._call(
+            'POST', '/ferry/download_to_oss', data=data, wrap=models.Model)
 
     def aggregate_omics_data(self, data_element_id, time_dimension, start_time,
                              end_time=None, biosample_id=None,
@@ -1056,15 +1796,8 @@ class API(object):
             'interval': interval,
             'periods': periods
         })
-        timeout = self.timeout
-        verbose = self.verbose
-        max_retries = self.max_retries
-        request = HTTPRequest(
-            self.endpoint, max_retries=max_retries, verbose=verbose)
-        request.set_authorization(self.token_type, self.access_token)
-        result = request.get(
-            '/omics_data/aggregate', params=params, timeout=timeout)
-        return models.Model(result)
+        return self._call(
+            'GET', '/omics_data/aggregate', params=params, wrap=models.Model)
 
     def get_range_stream(self, data_element_id, biosample_id=None,
                          start_time=None, end_time=None,
@@ -1096,15 +1829,27 @@ class API(object):
             'limit': limit,
             'next_page': next_page
         })
-        timeout = self.timeout
-        verbose = self.verbose
-        max_retries = self.max_retries
-        request = HTTPRequest(
-            self.endpoint, max_retries=max_retries, verbose=verbose)
-        request.set_authorization(self.token_type, self.access_token)
-        result = request.get(
-            '/stream/range', params=params, timeout=timeout)
-        return models.Model(result)
+        return self._call(
+            'GET', '/stream/range', params=params, wrap=models.Model)
+
+    def iter_range_stream(self, data_element_id, read_ahead=0, **kwargs):
+        """逐条迭代全部数据流
+
+        Args:
+            data_element_id (str): 数据元编号;
+            read_ahead (int, 非必填): 后台预先读取的页数,默认值为 0,即不预读;
+            **kwargs: 其他参数同 get_range_stream;
+
+        Returns:
+            iterator: 数据流迭代器;
+        """
+        next_page = kwargs.pop('next_page', None)
+        kwargs['data_element_id'] = data_element_id
+        return self._iter_pages(
+            partial(_fetch_page, self.get_range_stream, kwargs),
+            next_page=next_page,
+            read_ahead=read_ahead
+        )
 
     def write_phenotype(self, biosample_id, data_element_id,
                         stream_generate_time, stream_data,
@@ -1133,15 +1878,8 @@ class API(object):
             'stream_data': stream_data,
             'duplicate_enabled': duplicate_enabled,
         })
-        timeout = self.timeout
-        verbose = self.verbose
-        max_retries = self.max_retries
-        request = HTTPRequest(
-            self.endpoint, max_retries=max_retries, verbose=verbose)
-        request.set_authorization(self.token_type, self.access_token)
-        result = request.post(
-            '/datamall/phenotype/write', data=data, timeout=timeout)
-        return models.Model(result)
+        return self._call(
+            'POST', '/datamall/phenotype/write', data=data, wrap=models.Model)
 
     def get_data_items(self, namespace, biosample_id,
                        collection_id=None, data_element_ids=None,
@@ -1170,15 +1908,33 @@ class API(object):
             'namespace': namespace,
             'next_page': next_page
         })
-        timeout = self.timeout
-        verbose = self.verbose
-        max_retries = self.max_retries
-        request = HTTPRequest(
-            self.endpoint, max_retries=max_retries, verbose=verbose)
-        request.set_authorization(self.token_type, self.access_token)
-        result = request.get(
-            '/data_item/batch_retrieve', params=params, timeout=timeout)
-        return models.Model(result)
+        return self._call(
+            'GET',
+            '/data_item/batch_retrieve',
+            params=params,
+            wrap=models.Model
+        )
+
+    def iter_data_items(self, namespace, biosample_id, read_ahead=0,
+                        **kwargs):
+        """逐条迭代全部数据项
+
+        Args:
+            namespace(str): 命名空间
+            biosample_id (str): 生物样品编号;
+            read_ahead (int, 非必填): 后台预先读取的页数,默认值为 0,即不预读;
+            **kwargs: 其他参数同 get_data_items;
+
+        Returns:
+            iterator: 数据项迭代器;
+        """
+        next_page = kwargs.pop('next_page', None)
+        kwargs.update(namespace=namespace, biosample_id=biosample_id)
+        return self._iter_pages(
+            partial(_fetch_page, self.get_data_items, kwargs),
+            next_page=next_page,
+            read_ahead=read_ahead
+        )
 
     def invoke_model(self, model_id, headers=None, **kwargs):
         """模型调用
@@ -1192,20 +1948,14 @@ class API(object):
         """
         params = {}
         params.update(kwargs)
-        timeout = self.timeout
-        verbose = self.verbose
-        max_retries = self.max_retries
-        request = HTTPRequest(
-            self.endpoint, max_retries=max_retries, verbose=verbose)
-        request.set_authorization(self.token_type, self.access_token)
         model_url = '/model/{}'.format(model_id)
-        result = request.get(
+        return self._call(
+            'GET',
             model_url,
             params=params,
             headers=headers,
-            timeout=timeout
+            wrap=models.Model
         )
-        return models.Model(result)
 
     def invoke_draft_model(self, model_id, headers=None, **kwargs):
         """调用灰度部署版本模型
@@ -1219,20 +1969,14 @@ class API(object):
         """
         params = {}
         params.update(kwargs)
-        timeout = self.timeout
-        verbose = self.verbose
-        max_retries = self.max_retries
-        request = HTTPRequest(
-            self.endpoint, max_retries=max_retries, verbose=verbose)
-        request.set_authorization(self.token_type, self.access_token)
         model_url = '/model/{}/draft'.format(model_id)
-        result = request.get(
+        return self._call(
+            'GET',
             model_url,
             params=params,
             headers=headers,
-            timeout=timeout
+            wrap=models.Model
         )
-        return models.Model(result)
 
     def deploy_model(self, model_id, object_name=None, runtime=None,
                      memory_size=None, cpu=None, disk_size=None,
@@ -1262,15 +2006,8 @@ class API(object):
             'timeout': timeout,
             'object_name': object_name
         })
-        timeout = self.timeout
-        verbose = self.verbose
-        max_retries = self.max_retries
-        request = HTTPRequest(
-            self.endpoint, max_retries=max_retries, verbose=verbose)
-        request.set_authorization(self.token_type, self.access_token)
-        result = request.post(
-            '/model/deploy', data=data, timeout=timeout)
-        return models.Model(result)
+        return self._call(
+            'POST', '/model/deploy', data=data, wrap=models.Model)
 
     def publish_model(self, model_id, message, **kwargs):
         """发布模型稳定版
@@ -1289,15 +2026,8 @@ class API(object):
             'model_id': model_id,
             'message': message
         })
-        timeout = self.timeout
-        verbose = self.verbose
-        max_retries = self.max_retries
-        request = HTTPRequest(
-            self.endpoint, max_retries=max_retries, verbose=verbose)
-        request.set_authorization(self.token_type, self.access_token)
-        result = request.post(
-            '/model/publish', data=data, timeout=timeout)
-        return models.Model(result)
+        return self._call(
+            'POST', '/model/publish', data=data, wrap=models.Model)
 
     def rollback_model(self, model_id, version, **kwargs):
         """回滚模型
@@ -1315,15 +2045,8 @@ class API(object):
             'model_id': model_id,
             'version': version
         })
-        timeout = self.timeout
-        verbose = self.verbose
-        max_retries = self.max_retries
-        request = HTTPRequest(
-            self.endpoint, max_retries=max_retries, verbose=verbose)
-        request.set_authorization(self.token_type, self.access_token)
-        result = request.post(
-            '/model/rollback', data=data, timeout=timeout)
-        return models.Model(result)
+        return self._call(
+            'POST', '/model/rollback', data=data, wrap=models.Model)
 
     def model_versions(self, model_id, limit=10, next_page=None, **kwargs):
         """模型历史版本列表
@@ -1340,15 +2063,27 @@ class API(object):
         params.update(kwargs)
         params['limit'] = limit
         params['next_page'] = next_page
-        timeout = self.timeout
-        verbose = self.verbose
-        max_retries = self.max_retries
-        request = HTTPRequest(
-            self.endpoint, max_retries=max_retries, verbose=verbose)
-        request.set_authorization(self.token_type, self.access_token)
         model_url = '/model/{}/versions'.format(model_id)
-        result = request.get(model_url, params=params, timeout=timeout)
-        return models.Model(result)
+        return self._call('GET', model_url, params=params, wrap=models.Model)
+
+    def iter_model_versions(self, model_id, read_ahead=0, **kwargs):
+        """逐条迭代模型全部历史版本
+
+        Args:
+            model_id (str): 模型编号。
+            read_ahead (int, 非必填): 后台预先读取的页数,默认值为 0,即不预读;
+            **kwargs: 其他参数同 model_versions;
+
+        Returns:
+            iterator: 模型历史版本迭代器
+        """
+        next_page = kwargs.pop('next_page', None)
+        kwargs['model_id'] = model_id
+        return self._iter_pages(
+            partial(_fetch_page, self.model_versions, kwargs),
+            next_page=next_page,
+            read_ahead=read_ahead
+        )
 
     def upload_model_expfs(self, model_id, expfs, **kwargs):
         """上传模型扩展文件集
@@ -1364,35 +2099,23 @@ class API(object):
             filename = split(expfs)[1]
         else:
             filename = expfs.name
-        def upload_callback(monitor):
-            total_bytes = monitor.len
-            bytes_consumed = monitor.bytes_read
-            sys.stdout.write(
-                '\r文件大小: {}, 上传进度: {}%, 已上传 {}'.format(
-                    human_byte(total_bytes, 2),
-                    '%.2f' % ((bytes_consumed / total_bytes) * 100),
-                    human_byte(bytes_consumed, 2)
-                )
-            )
-            sys.stdout.flush()
+        from requests_toolbelt.multipart import encoder
         e = encoder.MultipartEncoder(
             fields={
                 'model_id': model_id,
                 'expfs': (filename, open(expfs, 'rb'), 'application/zip')
             }
         )
-        m = encoder.MultipartEncoderMonitor(e, upload_callback)
         timeout = self.timeout
-        verbose = self.verbose
-        max_retries = self.max_retries
-        request = HTTPRequest(
-            self.endpoint, max_retries=max_retries, verbose=verbose)
-        request.set_authorization(self.token_type, self.access_token)
+        request = self._http
         model_url = '/model/expfs/upload'
-        result = request.post(model_url, data=m, timeout=timeout, headers={
-            'Content-Type': m.content_type
-        })
-        sys.stdout.write('')
+        with self._new_progress(filename, e.len) as progress:
+            def upload_callback(monitor):
+                progress.set(monitor.bytes_read)
+            m = encoder.MultipartEncoderMonitor(e, upload_callback)
+            result = request.post(model_url, data=m, timeout=timeout, headers={
+                'Content-Type': m.content_type
+            })
         return models.Model(result)
 
     def model_license(self, model_id, expires=60, params=None):
@@ -1411,15 +2134,8 @@ class API(object):
         if params:
             params = json.dumps(params)
         data['params'] = params
-        timeout = self.timeout
-        verbose = self.verbose
-        max_retries = self.max_retries
-        request = HTTPRequest(
-            self.endpoint, max_retries=max_retries, verbose=verbose)
-        request.set_authorization(self.token_type, self.access_token)
         model_url = '/model/license'
-        result = request.post(model_url, data=data, timeout=timeout)
-        return models.Model(result)
+        return self._call('POST', model_url, data=data, wrap=models.Model)
 
     def task(self, task_id):
         """获取任务结果
@@ -1430,15 +2146,75 @@ class API(object):
         Returns:
             Model: 任务id、时间、状态和返回值;
         """
-        timeout = self.timeout
-        verbose = self.verbose
-        max_retries = self.max_retries
-        request = HTTPRequest(
-            self.endpoint, max_retries=max_retries, verbose=verbose)
-        request.set_authorization(self.token_type, self.access_token)
         model_url = '/task/{}'.format(task_id)
-        result = request.get(model_url, timeout=timeout)
-        return models.Model(result)
+        return self._call('GET', model_url, wrap=models.Model)
+
+    def wait_task(self, task_id, timeout=None, poll_policy=None,
+                  callback=None):
+        """轮询任务结果直至任务结束
+
+        按 poll_policy 指数退避轮询 task 接口,任务状态不再是 PENDING、
+        RECEIVED、RETRY、STARTED 时返回任务结果。接口返回 429、503 时按
+        Retry-After 头部(没有时按退避时间)等待后继续轮询。
+
+        Args:
+            task_id (str): 任务编号;
+            timeout (float, 非必填): 最长等待秒数,默认一直等待;
+            poll_policy (PollPolicy, 非必填): 轮询策略,默认 PollPolicy();
+            callback (callable, 非必填): 每次轮询后以 (任务结果, 已等待秒数) 为
+                                         参数调用;
+
+        Raises:
+            BGEError: 超过 timeout 秒任务仍未结束;
+
+        Returns:
+            Model: 任务id、时间、状态和返回值;
+        """
+        if poll_policy is None:
+            poll_policy = PollPolicy()
+        model_url = '/task/{}'.format(task_id)
+        start = time.monotonic()
+        attempt = 0
+        while True:
+            response_headers = requests.structures.CaseInsensitiveDict()
+            response_status = []
+
+            def capture(resp, *args, **kwargs):
+                response_status.append(resp.status_code)
+                response_headers.update(resp.headers)
+
+            try:
+                result = self._http._request(
+                    'GET',
+                    model_url,
+                    timeout=poll_policy.request_timeout(self.timeout),
+                    headers=poll_policy.request_headers(),
+                    hooks={'response': capture}
+                )
+            except APIError:
+                raise
+            except BGEError:
+                # 限流或服务暂时不可用时按 Retry-After 或退避时间等待后继续轮询
+                if not response_status or \
+                        response_status[-1] not in RETRY_STATUS_CODES:
+                    raise
+                result = None
+            elapsed = time.monotonic() - start
+            if result is not None:
+                result = _get_wrap(self, models.Model)(result)
+                if callback is not None:
+                    callback(result, elapsed)
+                if result.progress not in PENDING_STATES:
+                    return result
+            delay = poll_policy.delay(attempt, response_headers)
+            attempt += 1
+            if timeout is not None:
+                remaining = timeout - elapsed
+                if remaining <= 0:
+                    raise BGEError(
+                        'task %s is not finished in %ss' % (task_id, timeout))
+                delay = min(delay, remaining)
+            time.sleep(delay)
 
     def upload_model_doc(self, doc_tab, model_id, doc_content):
         """上传模型文档
@@ -1456,15 +2232,8 @@ class API(object):
         data['model_id'] = model_id
         data['doc_content'] = doc_content
         doc = json.dumps(data)
-        timeout = self.timeout
-        verbose = self.verbose
-        max_retries = self.max_retries
-        request = HTTPRequest(
-            self.endpoint, max_retries=max_retries, verbose=verbose)
-        request.set_authorization(self.token_type, self.access_token)
-        result = request.post(
-            '/model/doc_upload', data=doc, timeout=timeout)
-        return models.Model(result)
+        return self._call(
+            'POST', '/model/doc_upload', data=doc, wrap=models.Model)
 
     def send_sms(self, template, mobiles, **kwargs):
         """发送短信
@@ -1494,13 +2263,7 @@ class API(object):
             'template': template,
             'mobiles': mobiles,
         })
-        timeout = self.timeout
-        verbose = self.verbose
-        max_retries = self.max_retries
-        request = HTTPRequest(
-            self.endpoint, max_retries=max_retries, verbose=verbose)
-        request.set_authorization(self.token_type, self.access_token)
-        request.post('/sms/send', data=data, timeout=timeout)
+        return self._call('POST', '/sms/send', data=data, wrap=None)
 
     def applet_url(self, code, path=None, query=None, **kwargs):
         """小程序链接
@@ -1522,15 +2285,8 @@ class API(object):
             'path': path,
             'query': query,
         })
-        timeout = self.timeout
-        verbose = self.verbose
-        max_retries = self.max_retries
-        request = HTTPRequest(
-            self.endpoint, max_retries=max_retries, verbose=verbose)
-        request.set_authorization(self.token_type, self.access_token)
-        result = request.post(
-            '/service/wechat/applet/url', data=data, timeout=timeout)
-        return models.Model(result)
+        return self._call(
+            'POST', '/service/wechat/applet/url', data=data, wrap=models.Model)
 
     def verify_id_meta(self, idcard, realname, phone=None, **kwargs):
         """身份要素核验
@@ -1554,12 +2310,5 @@ class API(object):
             'realname': realname,
             'phone': phone,
         })
-        timeout = self.timeout
-        verbose = self.verbose
-        max_retries = self.max_retries
-        request = HTTPRequest(
-            self.endpoint, max_retries=max_retries, verbose=verbose)
-        request.set_authorization(self.token_type, self.access_token)
-        result = request.post(
-            '/service/verify/id_meta', data=data, timeout=timeout)
-        return models.Model(result)
+        return self._call(
+            'POST', '/service/verify/id_meta', data=data, wrap=models.Model)
@@ -0,0 +1,203 @@
+#-*- coding: utf-8 -*-
+
+"""
+JSON 编解码模块。
+
+SDK 内部统一通过本模块解析接口返回的 JSON 数据以及序列化 Model 对象。安装了
+orjson 时默认使用 orjson 解析,否则使用标准库 json;序列化结果默认与标准库 json
+完全一致。也可通过 set_codec 指定其他实现了 loads 与 dumps 方法的编解码器,如
+set_codec(OrjsonCodec(exact=False)) 使用 orjson 序列化。
+
+使用示例:
+
+    >>> from bgesdk import codec
+    >>> codec.get_codec().name
+    'orjson'
+    >>> codec.set_codec('json')
+    >>> codec.loads(b'{"a": 1}')
+    {'a': 1}
+"""
+
+from .error import BGEError
+
+import json
+import os
+
+
+__all__ = [
+    'StdlibCodec', 'OrjsonCodec', 'get_codec', 'set_codec', 'loads', 'dumps'
+]
+
+
+class StdlibCodec(object):
+    """基于标准库 json 的编解码器"""
+
+    name = 'json'
+
+    def loads(self, content):
+        """解析 JSON 数据
+
+        Args:
+            content (bytes|str): JSON 数据;
+
+        Returns:
+            object: 解析后的对象;
+        """
+        if isinstance(content, (bytes, bytearray)):
+            content = content.decode('utf-8')
+        return json.loads(content)
+
+    def dumps(self, obj, indent=None, sort_keys=False, ensure_ascii=None,
+              cls=None, default=None, **kwargs):
+        """序列化为 JSON 字符串,参数同 json.dumps"""
+        return json.dumps(
+            obj,
+            indent=indent,
+            sort_keys=sort_keys,
+            ensure_ascii=ensure_ascii,
+            cls=cls,
+            default=default,
+            **kwargs
+        )
+
+
+class OrjsonCodec(StdlibCodec):
+    """基于 orjson 的编解码器
+
+    orjson 无法解析的数据(超出 64 位的整数、NaN 等)回退到标准库 json 解析。
+
+    orjson 序列化的结果与标准库 json 不完全一致:不缩进时输出不含空格的紧凑格
+    式,浮点数格式不同(如 1e16 与 1e+16),NaN 与 Infinity 输出为 null。因此默认
+    使用标准库 json 序列化,保证输出不因是否安装 orjson 而变化;exact 为 False 时
+    使用 orjson 序列化,orjson 不支持的参数(ensure_ascii、非整数缩进、separators
+    等)以及超出其表示范围的数据仍回退到标准库 json 处理。
+
+    Args:
+        exact (bool, 非必填): 序列化结果是否与标准库 json 完全一致, 默认 True;
+    """
+
+    name = 'orjson'
+
+    def __init__(self, exact=True):
+        import orjson
+        self._orjson = orjson
+        self.exact = exact
+
+    def loads(self, content):
+        if isinstance(content, bytearray):
+            content = bytes(content)
+        try:
+            return self._orjson.loads(content)
+        except self._orjson.JSONDecodeError:
+            return StdlibCodec.loads(self, content)
+
+    def dumps(self, obj, indent=None, sort_keys=False, ensure_ascii=None,
+              cls=None, default=None, **kwargs):
+        if self.exact or kwargs or ensure_ascii or (indent is not None and (
+                isinstance(indent, bool) or not isinstance(indent, int))):
+            return StdlibCodec.dumps(
+                self, obj, indent=indent, sort_keys=sort_keys,
+                ensure_ascii=ensure_ascii, cls=cls, default=default,
+                **kwargs)
+        orjson = self._orjson
+        option = orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        if cls is not None and default is None:
+            default = cls().default
+        try:
+            text = orjson.dumps(obj, default=default, option=option)
+        except (orjson.JSONEncodeError, TypeError):
+            return StdlibCodec.dumps(
+                self, obj, indent=indent, sort_keys=sort_keys,
+                ensure_ascii=ensure_ascii, cls=cls, default=default)
+        text = text.decode('utf-8')
+        if indent and indent != 2:
+            text = _reindent(text, indent)
+        return text
+
+
+def _reindent(text, indent):
+    """将 orjson 输出的 2 空格缩进转换为指定缩进
+
+    字符串中的换行均已被转义,因此每行开头的空格全部为缩进。
+    """
+    lines = text.split('\n')
+    for i, line in enumerate(lines):
+        stripped = line.lstrip(' ')
+        depth = (len(line) - len(stripped)) // 2
+        if depth:
+            lines[i] = ' ' * (depth * indent) + stripped
+    return '\n'.join(lines)
+
+
+_codecs = {
+    'json': StdlibCodec,
+    'orjson': OrjsonCodec,
+}
+
+_codec = None
+
+
+def _new_codec(name):
+    try:
+        codec_class = _codecs[name]
+    except KeyError:
+        raise BGEError('unsupported JSON codec: %s' % name)
+    try:
+        return codec_class()
+    except ImportError:
+        raise BGEError('JSON codec %s is not installed' % name)
+
+
+def set_codec(codec):
+    """设置 SDK 使用的 JSON 编解码器
+
+    Args:
+        codec (str|object): 编解码器名称(json、orjson)或实现了 loads 与 dumps
+                            方法的对象;
+    """
+    global _codec
+    if isinstance(codec, str):
+        codec = _new_codec(codec)
+    _codec = codec
+
+
+def get_codec():
+    """获取 SDK 当前使用的 JSON 编解码器
+
+    首次调用时根据环境变量 BGESDK_JSON_CODEC 选择编解码器,未设置时优先使用
+    orjson,未安装时使用标准库 json。
+    """
+    global _codec
+    if _codec is None:
+        name = os.environ.get('BGESDK_JSON_CODEC')
+        if name:
+            _codec = _new_codec(name)
+        else:
+            try:
+                _codec = OrjsonCodec()
+            except ImportError:
+                _codec = StdlibCodec()
+    return _codec
+
+
+def loads(content):
+    """使用当前编解码器解析 JSON 数据"""
+    return get_codec().loads(content)
+
+
+def dumps(obj, indent=None, sort_keys=False, ensure_ascii=None, cls=None,
+          default=None, **kwargs):
+    """使用当前编解码器序列化为 JSON 字符串,参数同 json.dumps"""
+    return get_codec().dumps(
+        obj,
+        indent=indent,
+        sort_keys=sort_keys,
+        ensure_ascii=ensure_ascii,
+        cls=cls,
+        default=default,
+        **kwargs
+    )
@@ -26,3 +26,63 @@ PART_SIZE = 50 * 1024 * 1024
 
 # 分片上传缺省线程数
 MULTIPART_NUM_THREADS = 4
+
+# HTTP 连接池缓存的主机连接池数量
+POOL_CONNECTIONS = 10
+
+# 单个主机连接池最大连接数
+POOL_MAXSIZE = 10
+
+# 异步客户端连接池最大连接数
+ASYNC_POOL_MAXSIZE = 100
+
+# 变异位点接口单次请求最多支持的 rs 编号数量
+VARIANTS_RSIDS_LIMIT = 100
+
+# 批量请求缺省线程数
+BULK_NUM_THREADS = 4
+
+# 批量上传同时上传的文件数
+BATCH_UPLOAD_NUM_THREADS = 4
+
+# 批量上传同时进行中的上传请求(含分片)数上限
+UPLOAD_MAX_IN_FLIGHT = 8
+
+# 令牌元数据未包含过期时间时的缓存时间(秒)
+INTROSPECT_CACHE_TTL = 300
+
+# 按 STS 临时凭证缓存的 OSS 存储空间对象数量
+BUCKET_CACHE_SIZE = 16
+
+# 下载时单次读取的数据大小 1MB
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+# 并发下载时单个 HTTP Range 区间大小 16MB
+DOWNLOAD_PART_SIZE = 16 * 1024 * 1024
+
+# 并发下载缺省连接数
+DOWNLOAD_NUM_THREADS = 4
+
+# 批量下载同时下载的文件数
+DOWNLOAD_MANY_NUM_THREADS = 4
+
+# 下载地址剩余有效期不足该值(秒)时重新签名
+DOWNLOAD_URL_RESIGN_MARGIN = 60
+
+# STS 临时凭证未返回过期时间时按该有效期(秒)处理
+STS_TOKEN_TTL = 900
+
+# STS 临时凭证过期前提前刷新的秒数
+STS_REFRESH_MARGIN = 300
+
+# 轮询任务结果的首次等待秒数
+TASK_POLL_INITIAL = 1
+
+# 轮询任务结果的最大间隔秒数
+TASK_POLL_MAX_INTERVAL = 30
+
+# 轮询任务结果的间隔增长倍数
+TASK_POLL_MULTIPLIER = 1.5
+
+# 轮询任务结果间隔的随机抖动比例
+TASK_POLL_JITTER = 0.2
@@ -0,0 +1,120 @@
+#-*- coding: utf-8 -*-
+
+"""
+STS 临时凭证。
+
+API.get_upload_token 返回的 STS 临时凭证有效期较短,长时间的批量上传会在凭证过期
+后失败。本模块提供可用于 oss2.ProviderAuth 的凭证提供者,在凭证过期前于后台线程中
+重新获取,上传线程始终使用有效的凭证签名。
+"""
+
+from . import constants
+
+from datetime import datetime
+
+import calendar
+import threading
+import time
+
+
+__all__ = ['STSCredentialsProvider', 'parse_expiration']
+
+
+def parse_expiration(value):
+    """解析 STS 凭证的过期时间
+
+    Args:
+        value (str|int|float): ISO 8601 格式的 UTC 时间(如
+                               2021-04-09T11:52:19Z)或时间戳;
+
+    Returns:
+        float: 过期时间戳,无法解析时为 None;
+    """
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    for fmt in ('%Y-%m-%dT%H:%M:%SZ', '%Y-%m-%dT%H:%M:%S.%fZ'):
+        try:
+            dt = datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+        return calendar.timegm(dt.timetuple()) + dt.microsecond / 1e6
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+class STSCredentialsProvider(object):
+    """自动刷新的 STS 临时凭证提供者
+
+    凭证剩余有效期不足 refresh_margin 秒时,下一次签名会在后台线程中重新获取凭
+    证,签名仍使用当前凭证;凭证已过期时在签名线程中同步获取。实现了 oss2 凭证提供
+    者的 get_credentials 方法,可直接用于 oss2.ProviderAuth。
+
+    Args:
+        fetch (callable): 获取 STS 授权的函数,返回值同 API.get_upload_token;
+        token (Model, 非必填): 已获取的 STS 授权,默认调用 fetch 获取;
+        refresh_margin (int, 非必填): 提前刷新的秒数,默认 300,不超过凭证有效期
+                                      的四分之一;
+    """
+
+    def __init__(self, fetch, token=None, refresh_margin=None):
+        self.fetch = fetch
+        if refresh_margin is None:
+            refresh_margin = constants.STS_REFRESH_MARGIN
+        self.refresh_margin = refresh_margin
+        self._lock = threading.Lock()
+        self._refreshing = None
+        self._set_token(token if token is not None else fetch())
+
+    def _set_token(self, token):
+        from oss2.credentials import Credentials
+        credentials = token.credentials
+        now = time.time()
+        expires_at = parse_expiration(credentials.get('expiration'))
+        if expires_at is None:
+            expires_at = now + constants.STS_TOKEN_TTL
+        margin = min(self.refresh_margin, (expires_at - now) / 4.)
+        self.token = token
+        self.credentials = Credentials(
+            credentials['access_key_id'],
+            credentials['access_key_secret'],
+            credentials['security_token'])
+        self.expires_at = expires_at
+        self.refresh_at = expires_at - max(margin, 0)
+
+    def get_credentials(self):
+        """返回当前有效的凭证,临近过期时触发后台刷新"""
+        now = time.time()
+        if now >= self.expires_at:
+            with self._lock:
+                if time.time() >= self.expires_at:
+                    self._set_token(self.fetch())
+        elif now >= self.refresh_at:
+            self._refresh_in_background()
+        return self.credentials
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing is not None:
+                return
+            thread = threading.Thread(target=self._refresh)
+            thread.daemon = True
+            self._refreshing = thread
+        thread.start()
+
+    def _refresh(self):
+        try:
+            token = self.fetch()
+            with self._lock:
+                self._set_token(token)
+        except Exception:
+            # 后台刷新失败时继续使用当前凭证,稍后重试,过期后由签名线程同步获取
+            with self._lock:
+                remaining = max(self.expires_at - time.time(), 0)
+                self.refresh_at = time.time() + min(10, remaining / 2.)
+        finally:
+            with self._lock:
+                self._refreshing = None
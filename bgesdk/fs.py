@@ -1,6 +1,63 @@
+#-*- coding: utf-8 -*-
+
+from fnmatch import fnmatch
+
+import os
+
 
 class FileItem(object):
 
     def __init__(self, filename, file_or_string):
         self.filename = filename
         self.file_or_string = file_or_string
+
+
+def _match(relpath, patterns):
+    name = relpath.rsplit('/', 1)[-1]
+    for pattern in patterns:
+        if fnmatch(relpath, pattern) or fnmatch(name, pattern):
+            return True
+    return False
+
+
+def iter_files(dirpath, recursive=False, include=None, exclude=None):
+    """使用 os.scandir 逐个遍历目录中的文件
+
+    软链接、符号链接不会被返回;子目录匹配 exclude 时不再遍历其中的文件。
+
+    Args:
+        dirpath (str): 目录路径;
+        recursive (bool, 非必填): 是否遍历子目录,默认值为 False;
+        include (list, 非必填): glob 规则列表,提供时仅返回匹配的文件;
+        exclude (list, 非必填): glob 规则列表,匹配的文件与目录被忽略;
+
+    规则同时与以 / 分割的相对路径和文件名进行匹配,如 *.fastq.gz、
+    reports/*.html。
+
+    Yields:
+        tuple: (相对路径, 文件路径),相对路径以 / 分割;
+    """
+    include = list(include or [])
+    exclude = list(exclude or [])
+    stack = [('', dirpath)]
+    while stack:
+        prefix, path = stack.pop()
+        with os.scandir(path) as it:
+            entries = sorted(it, key=lambda entry: entry.name)
+        subdirs = []
+        for entry in entries:
+            if entry.is_symlink():
+                continue
+            relpath = prefix + entry.name
+            if exclude and _match(relpath, exclude):
+                continue
+            if entry.is_dir():
+                if recursive:
+                    subdirs.append((relpath + '/', entry.path))
+                continue
+            if not entry.is_file():
+                continue
+            if include and not _match(relpath, include):
+                continue
+            yield relpath, entry.path
+        stack.extend(reversed(subdirs))
@@ -5,35 +5,76 @@ import requests
 from requests.adapters import HTTPAdapter
 from six.moves.urllib.parse import urljoin
 
+from . import codec
+from . import constants
 from .error import APIError, BGEError
 from .utils import new_logger
 
 
+def unpack_result(result):
+    """解析平台接口返回的 JSON 数据
+
+    Args:
+        result (dict): 包含 code、msg、data、pagination 的接口返回值
+
+    Raises:
+        APIError: API 错误
+
+    Returns:
+        object: data，分页接口返回 (data, pagination)
+    """
+    data = result.get('data')
+    code = result['code']
+    msg = result['msg']
+    if code != 0:
+        raise APIError(code, msg, data)
+    pagination = result.get('pagination')
+    if pagination:
+        # 相关接口分页返回方式升级后，可去除此处
+        # TODO: upgrade in the future
+        return data, pagination
+    return data
+
+
 class HTTPRequest(object):
     """HTTP 请求类
 
-    处理 SDK 接口的 HTTP 调用；
+    处理 SDK 接口的 HTTP 调用；同一实例内的请求共享连接池，连接池可在多线程间
+    共享使用；
 
     Args:
         endpoint (str): 平台基本地址，如 https://api.bge.genomics.cn；
         max_retries (数字, 非必填): 接口请求重试次数，默认值为 None；
         verbose (布尔, 非必填)：输出测试日志，默认值为 False；
+        pool_connections (数字, 非必填): 连接池缓存的主机数量，默认值为 10；
+        pool_maxsize (数字, 非必填): 单个主机连接池最大连接数，默认值为 10；
+        keep_alive (布尔, 非必填): 是否复用 HTTP 长连接，默认值为 True；
     """
 
-    def __init__(self, endpoint, max_retries=None, verbose=False):
+    def __init__(self, endpoint, max_retries=None, verbose=False,
+                 pool_connections=None, pool_maxsize=None, keep_alive=True):
         self.logger = new_logger(self.__class__.__name__, verbose=verbose)
         self.endpoint = endpoint
         self.headers = {}
-        self.session = requests.Session()
+        if pool_connections is None:
+            pool_connections = constants.POOL_CONNECTIONS
+        if pool_maxsize is None:
+            pool_maxsize = constants.POOL_MAXSIZE
+        adapter_kwargs = {
+            'pool_connections': int(pool_connections),
+            'pool_maxsize': int(pool_maxsize)
+        }
         if max_retries is not None:
-            self.session.mount(
-                'http://',
-                HTTPAdapter(max_retries=max_retries)
-            )
-            self.session.mount(
-                'https://',
-                HTTPAdapter(max_retries=max_retries)
-            )
+            adapter_kwargs['max_retries'] = max_retries
+        self.session = requests.Session()
+        self.session.mount('http://', HTTPAdapter(**adapter_kwargs))
+        self.session.mount('https://', HTTPAdapter(**adapter_kwargs))
+        if not keep_alive:
+            self.session.headers['Connection'] = 'close'
+
+    def close(self):
+        """关闭连接池中的全部连接"""
+        self.session.close()
 
     def set_authorization(self, token_type, access_token):
         """设置 Authorization 头部
@@ -131,16 +172,6 @@ class HTTPRequest(object):
             result = resp.text
             self.logger.debug('Response: \n\t%s', result)
             return result
-        result = resp.json()
+        result = codec.loads(resp.content)
         self.logger.debug('Response: \n\t%s', result)
-        data = result.get('data')
-        code = result['code']
-        msg = result['msg']
-        if code != 0:
-            raise APIError(code, msg, data)
-        pagination = result.get('pagination')
-        if pagination:
-            # 相关接口分页返回方式升级后，可去除此处
-            # TODO: upgrade in the future
-            return data, pagination
-        return data
+        return unpack_result(result)
@@ -0,0 +1,452 @@
+#-*- coding: utf-8 -*-
+
+"""
+模型打包缓存。
+
+打包模型源码时以文件内容的 SHA-256 摘要为键缓存压缩后的数据与混淆后的源码,未变化
+的文件直接将缓存的压缩数据写入新的压缩包,只有发生变化的文件才重新压缩、混淆。缓存
+位于模型目录的 .bge/build_cache 中,每次打包后删除本次未使用的缓存数据。
+
+文件大小与修改时间均未变化时直接使用记录的摘要,不再读取文件内容。需要重新压缩、
+混淆的文件在进程池中并行处理,结果写入缓存目录,再由当前进程按文件顺序依次写入压缩
+包,因此压缩包内容与逐个处理时完全一致。
+
+zipfile 没有写入已压缩数据的公开接口,默认解压缓存的数据后通过 ZipFile.open(...,
+'w') 写入;仅在 RAW_COPY_VERSIONS 列出的 CPython 版本中直接复制缓存的压缩数据。
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from uuid import uuid4
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+import zipfile
+import zlib
+
+
+__all__ = ['BuildCache', 'build_archive', 'file_sha256']
+
+# 读取文件与复制缓存数据的块大小 1MB
+CHUNK_SIZE = 1024 * 1024
+
+# 缓存格式版本,格式变化时丢弃旧缓存
+CACHE_VERSION = 1
+
+
+class BuildCache(object):
+    """模型打包缓存
+
+    Args:
+        path (str): 缓存目录;
+        compress_type (int, 非必填): 压缩方式,仅缓存 zipfile.ZIP_DEFLATED;
+        compresslevel (int, 非必填): 压缩级别,默认与 zipfile 一致;
+        minifier_version (str, 非必填): 源码混淆工具版本,版本变化时重新混淆;
+    """
+
+    def __init__(self, path, compress_type=zipfile.ZIP_DEFLATED,
+                 compresslevel=None, minifier_version=''):
+        self.path = path
+        self.objects_dir = os.path.join(path, 'objects')
+        self.index_path = os.path.join(path, 'index.json')
+        self.compress_type = compress_type
+        if compresslevel is None:
+            compresslevel = zlib.Z_DEFAULT_COMPRESSION
+        self.compresslevel = compresslevel
+        self.minifier_version = minifier_version
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._used = set()
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.index_path) as fp:
+                index = json.load(fp)
+        except (OSError, ValueError):
+            index = {}
+        settings = [CACHE_VERSION, self.compress_type, self.compresslevel]
+        if index.get('settings') != settings:
+            index = {'settings': settings}
+        if index.get('minifier_version') != self.minifier_version:
+            index['minified'] = {}
+        index['minifier_version'] = self.minifier_version
+        index.setdefault('files', {})
+        index.setdefault('entries', {})
+        index.setdefault('minified', {})
+        self._index = index
+        self._files = {}
+
+    def digest(self, filepath):
+        """返回文件内容的 SHA-256 摘要,文件未变化时使用记录的摘要"""
+        return self.digest_files([filepath])[0]
+
+    def digest_files(self, filepaths, executor=None):
+        """按顺序返回各文件内容的 SHA-256 摘要
+
+        大小与修改时间均未变化的文件使用记录的摘要,其余文件在 executor 中计算摘
+        要。
+
+        Args:
+            filepaths (list): 文件路径列表;
+            executor (concurrent.futures.Executor, 非必填): 计算摘要的进程池,
+                                                            默认在当前进程中计算;
+
+        Returns:
+            list: 摘要列表;
+        """
+        keys = []
+        stale = []
+        for filepath in filepaths:
+            filepath = os.path.abspath(filepath)
+            stat = os.stat(filepath)
+            key = [stat.st_size, stat.st_mtime_ns]
+            with self._lock:
+                entry = self._index['files'].get(filepath)
+            if entry is None or entry[:2] != key:
+                stale.append(filepath)
+            keys.append((filepath, key, entry))
+        if executor is None:
+            digests = map(file_sha256, stale)
+        else:
+            digests = executor.map(file_sha256, stale)
+        digests = dict(zip(stale, digests))
+        result = []
+        for filepath, key, entry in keys:
+            sha256 = digests.get(filepath)
+            if sha256 is None:
+                sha256 = entry[2]
+            with self._lock:
+                self._files[filepath] = key + [sha256]
+            result.append(sha256)
+        return result
+
+    def _cached(self, sha256):
+        """返回缓存的 [crc32, 原始大小, 压缩后大小],未缓存时返回 None"""
+        if sha256 is None:
+            return None
+        entry = self._index['entries'].get(sha256)
+        if entry is None or not os.path.exists(self._object_path(sha256)):
+            return None
+        return entry
+
+    def _object_path(self, sha256):
+        return object_path(self.objects_dir, sha256)
+
+    def build(self, ziph, files, minify=None, workers=None, callback=None):
+        """按顺序将文件写入压缩包,优先使用缓存的压缩数据
+
+        文件摘要与未缓存文件的混淆、压缩在 workers 个进程中并行进行,当前进程按
+        files 的顺序依次写入压缩包。
+
+        Args:
+            ziph (zipfile.ZipFile): 以写入模式打开的压缩包;
+            files (list): 元素为 (zipinfo, 文件路径, 是否混淆);
+            minify (callable, 非必填): 混淆函数,以源码字符串为参数,需可被
+                                       pickle(模块级函数);
+            workers (int, 非必填): 进程数,默认为 CPU 核数,为 1 时在当前进程
+                                   中处理;
+            callback (callable, 非必填): 每个文件写入后以 (zipinfo, 是否混淆)
+                                         为参数调用;
+        """
+        if workers is None:
+            workers = cpu_count()
+        executor = None
+        futures = {}
+        results = {}
+        try:
+            # 摘要与混淆、压缩均在进程池中进行,当前进程只负责写入压缩包
+            if workers > 1 and len(files) > 1:
+                executor = ProcessPoolExecutor(min(workers, len(files)))
+            digests = self.digest_files(
+                [filepath for _, filepath, _ in files], executor)
+            plans = []
+            jobs = {}
+            for (zipinfo, filepath, minified), source_sha256 in zip(
+                    files, digests):
+                if minified:
+                    sha256 = self._index['minified'].get(source_sha256)
+                else:
+                    sha256 = source_sha256
+                job = None
+                if self._cached(sha256) is None:
+                    job = (source_sha256, minified)
+                    jobs.setdefault(job, (
+                        self.objects_dir,
+                        filepath,
+                        self.compresslevel,
+                        minify if minified else None,
+                        None if minified else source_sha256
+                    ))
+                plans.append((zipinfo, minified, sha256, job))
+            if executor is not None and len(jobs) > 1:
+                for job, args in jobs.items():
+                    futures[job] = executor.submit(build_object, *args)
+            for zipinfo, minified, sha256, job in plans:
+                if job is None:
+                    self.hits += 1
+                else:
+                    # 同一内容的多个文件只处理一次
+                    if job not in results:
+                        if job in futures:
+                            results[job] = futures[job].result()
+                        else:
+                            results[job] = build_object(*jobs[job])
+                    sha256, entry = results[job]
+                    self._index['entries'][sha256] = entry
+                    if minified:
+                        self._index['minified'][job[0]] = sha256
+                    self.misses += 1
+                self._used.add(sha256)
+                self._write(ziph, zipinfo, sha256)
+                if callback is not None:
+                    callback(zipinfo, minified)
+        finally:
+            if executor is not None:
+                for future in futures.values():
+                    future.cancel()
+                executor.shutdown()
+
+    def _write(self, ziph, zipinfo, sha256):
+        crc, file_size, compress_size = self._index['entries'][sha256]
+        with open(self._object_path(sha256), 'rb') as fp:
+            if zipinfo.compress_type != self.compress_type or \
+                    not can_write_compressed(ziph):
+                # 默认解压后通过 ZipFile.open(..., 'w') 写入
+                zipinfo.file_size = file_size
+                decompressor = zlib.decompressobj(-15)
+                with ziph.open(zipinfo, 'w') as dst:
+                    for chunk in iter(lambda: fp.read(CHUNK_SIZE), b''):
+                        dst.write(decompressor.decompress(chunk))
+                    dst.write(decompressor.flush())
+                return
+            write_compressed(
+                ziph, zipinfo, fp, crc, file_size, compress_size)
+
+    def save(self):
+        """保存缓存索引,并删除本次打包未使用的缓存数据"""
+        with self._lock:
+            index = self._index
+            index['files'] = self._files
+            index['entries'] = dict(
+                (sha256, entry) for sha256, entry in index['entries'].items()
+                if sha256 in self._used)
+            index['minified'] = dict(
+                (src, dst) for src, dst in index['minified'].items()
+                if dst in self._used)
+            if not os.path.isdir(self.path):
+                os.makedirs(self.path)
+            tmp_path = self.index_path + '.tmp'
+            with open(tmp_path, 'w') as fp:
+                json.dump(index, fp)
+            os.replace(tmp_path, self.index_path)
+            used = index['entries']
+        if not os.path.isdir(self.objects_dir):
+            return
+        for root, _, files in os.walk(self.objects_dir):
+            for name in files:
+                if name not in used:
+                    os.unlink(os.path.join(root, name))
+
+
+def build_archive(ziph, files, minify=None, workers=None, callback=None):
+    """不使用缓存时按顺序将文件写入压缩包
+
+    需要混淆的文件在 workers 个进程中并行混淆,当前进程按 files 的顺序依次写入压缩
+    包;不计算文件摘要,也不写入缓存目录。生成的压缩包与 BuildCache.build 一致。
+
+    Args:
+        ziph (zipfile.ZipFile): 以写入模式打开的压缩包;
+        files (list): 元素为 (zipinfo, 文件路径, 是否混淆);
+        minify (callable, 非必填): 混淆函数,以源码字符串为参数,需可被 pickle
+                                   (模块级函数);
+        workers (int, 非必填): 进程数,默认为 CPU 核数,为 1 时在当前进程中处理;
+        callback (callable, 非必填): 每个文件写入后以 (zipinfo, 是否混淆) 为参数
+                                     调用;
+    """
+    sources = [filepath for _, filepath, minified in files if minified]
+    if workers is None:
+        workers = cpu_count()
+    workers = min(workers, len(sources))
+    executor = None
+    futures = []
+    try:
+        if workers > 1:
+            executor = ProcessPoolExecutor(workers)
+            futures = [
+                executor.submit(minify_file, filepath, minify)
+                for filepath in sources
+            ]
+            minified_sources = (future.result() for future in futures)
+        else:
+            minified_sources = (
+                minify_file(filepath, minify) for filepath in sources)
+        for zipinfo, filepath, minified in files:
+            if minified:
+                ziph.writestr(zipinfo, next(minified_sources))
+            else:
+                write_file(ziph, zipinfo, filepath)
+            if callback is not None:
+                callback(zipinfo, minified)
+    finally:
+        if executor is not None:
+            for future in futures:
+                future.cancel()
+            executor.shutdown()
+
+
+def minify_file(filepath, minify):
+    """返回混淆后的源码,可在子进程中执行"""
+    with open(filepath, 'r') as fp:
+        return minify(fp.read())
+
+
+def write_file(ziph, zipinfo, filepath):
+    """将文件分块写入压缩包,避免大文件整个读入内存"""
+    zipinfo.file_size = os.path.getsize(filepath)
+    with open(filepath, 'rb') as src, ziph.open(zipinfo, 'w') as dst:
+        shutil.copyfileobj(src, dst, CHUNK_SIZE)
+
+
+def file_sha256(filepath):
+    """计算文件内容的 SHA-256 摘要"""
+    h = hashlib.sha256()
+    with open(filepath, 'rb') as fp:
+        for chunk in iter(lambda: fp.read(CHUNK_SIZE), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def cpu_count():
+    """当前进程可使用的 CPU 核数"""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0)) or 1
+    return os.cpu_count() or 1
+
+
+def object_path(objects_dir, sha256):
+    return os.path.join(objects_dir, sha256[:2], sha256)
+
+
+def build_object(objects_dir, filepath, compresslevel, minify=None,
+                 sha256=None):
+    """混淆、压缩文件并保存至缓存目录,可在子进程中执行
+
+    Args:
+        objects_dir (str): 缓存数据目录;
+        filepath (str): 文件路径;
+        compresslevel (int): 压缩级别;
+        minify (callable, 非必填): 混淆函数,为 None 时不混淆;
+        sha256 (str, 非必填): 不混淆时文件内容的摘要,为 None 时计算;
+
+    Returns:
+        tuple: (数据摘要, [crc32, 原始大小, 压缩后大小]);
+    """
+    if minify is not None:
+        data = minify_file(filepath, minify).encode('utf-8')
+        sha256 = hashlib.sha256(data).hexdigest()
+        chunks = [data]
+    else:
+        if sha256 is None:
+            sha256 = file_sha256(filepath)
+        chunks = None
+    path = object_path(objects_dir, sha256)
+    dirname = os.path.dirname(path)
+    if not os.path.isdir(dirname):
+        os.makedirs(dirname, exist_ok=True)
+    compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, -15)
+    crc = file_size = compress_size = 0
+    tmp_path = '{}.{}.tmp'.format(path, uuid4().hex)
+    src = None
+    if chunks is None:
+        src = open(filepath, 'rb')
+        chunks = iter(lambda: src.read(CHUNK_SIZE), b'')
+    try:
+        with open(tmp_path, 'wb') as dst:
+            for chunk in chunks:
+                crc = zlib.crc32(chunk, crc)
+                file_size += len(chunk)
+                chunk = compressor.compress(chunk)
+                compress_size += len(chunk)
+                dst.write(chunk)
+            chunk = compressor.flush()
+            compress_size += len(chunk)
+            dst.write(chunk)
+    finally:
+        if src is not None:
+            src.close()
+    os.replace(tmp_path, path)
+    return sha256, [crc, file_size, compress_size]
+
+
+# write_compressed 依赖 ZipFile 的内部实现,仅在逐一核对过 zipfile 源码的 CPython
+# 版本中启用;Python 3.6 在禁用 ZIP64 时的处理与之后的版本不同,未列入
+RAW_COPY_VERSIONS = ((3, 7), (3, 8), (3, 9), (3, 10), (3, 11), (3, 12), (3, 13))
+
+
+def raw_copy_supported(version=None):
+    """解释器是否支持直接写入已压缩的数据
+
+    Args:
+        version (tuple, 非必填): Python 版本,默认为当前 CPython 解释器的版本;
+
+    Returns:
+        bool: 是否支持;
+    """
+    if version is None:
+        if sys.implementation.name != 'cpython':
+            return False
+        version = sys.version_info
+    return tuple(version[:2]) in RAW_COPY_VERSIONS
+
+
+def can_write_compressed(ziph):
+    """压缩包是否支持直接写入已压缩的数据
+
+    仅在 raw_copy_supported() 为 True 且压缩包可随机写入时支持,否则解压后通过
+    ZipFile.open(..., 'w') 写入。
+    """
+    return raw_copy_supported() and bool(getattr(ziph, '_seekable', False))
+
+
+def requires_zip64(file_size):
+    """与 ZipFile.open(..., 'w') 一致,按原始大小的 1.05 倍判断是否使用 ZIP64"""
+    return file_size * 1.05 > zipfile.ZIP64_LIMIT
+
+
+def write_compressed(ziph, zipinfo, fp, crc, file_size, compress_size):
+    """将已压缩的数据直接写入压缩包
+
+    zipfile 未提供写入已压缩数据的接口,此处按 ZipFile.open(..., 'w') 的方式写入
+    本地文件头与数据,并登记到压缩包的中央目录,生成的压缩包与通过 ZipFile.open
+    写入时完全一致。调用前需确认 can_write_compressed(ziph) 为 True。
+    """
+    zip64 = requires_zip64(file_size)
+    if zip64 and not ziph._allowZip64:
+        raise zipfile.LargeZipFile('Filesize would require ZIP64 extensions')
+    if not zip64 and compress_size > zipfile.ZIP64_LIMIT:
+        raise RuntimeError(
+            'Compressed size too large, try using force_zip64')
+    zipinfo.file_size = file_size
+    zipinfo.compress_size = compress_size
+    zipinfo.CRC = crc
+    zipinfo.flag_bits = 0
+    if not zipinfo.external_attr:
+        zipinfo.external_attr = 0o600 << 16
+    with ziph._lock:
+        if ziph._writing:
+            raise ValueError('Can\'t write to the ZIP file while there is '
+                             'another write handle open on it.')
+        ziph.fp.seek(ziph.start_dir)
+        zipinfo.header_offset = ziph.fp.tell()
+        ziph._writecheck(zipinfo)
+        ziph._didModify = True
+        ziph.fp.write(zipinfo.FileHeader(zip64))
+        shutil.copyfileobj(fp, ziph.fp, CHUNK_SIZE)
+        ziph.filelist.append(zipinfo)
+        ziph.NameToInfo[zipinfo.filename] = zipinfo
+        ziph.start_dir = ziph.fp.tell()
@@ -7,7 +7,9 @@ class BaseCommand(metaclass=ABCMeta):
 
     help = ''
 
-    def __init__(self, parser, command_name=None, **kwargs):
+    def __init__(self, parser, command_name=None, argv=None, **kwargs):
+        # 当前子命令之后的命令行参数,用于按需注册下级子命令
+        self.argv = argv if argv is not None else []
         if command_name is not None:
             parser = parser.add_parser(
                 command_name,
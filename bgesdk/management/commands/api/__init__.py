@@ -1,11 +1,12 @@
-import posixpath
 import sys
 
-from importlib import import_module
-
 from bgesdk.management import constants
 from bgesdk.management.command import BaseCommand
-from bgesdk.management.utils import find_commands
+from bgesdk.management.registry import (
+    API_COMMANDS,
+    API_COMMANDS_PACKAGE,
+    add_commands
+)
 from bgesdk.version import __version__
 
 
@@ -34,23 +35,8 @@ class Command(BaseCommand):
                 help='可选子命令。',
                 required=False
             )
-        commands_dir = posixpath.join(__path__[0], 'commands')
-        command_names = find_commands(commands_dir)
-        sort_items = []
-        for sub_command_name in command_names:
-            module = import_module(
-                'bgesdk.management.commands.{}.commands.{}'.format(
-                    COMMAND_NAME, sub_command_name
-                )
-            )
-            command_klass = getattr(module, 'Command', None)
-            if command_klass and not issubclass(command_klass, BaseCommand):
-                continue
-            order = int(getattr(command_klass, 'order', 1))
-            sort_items.append((order, sub_command_name, command_klass))
-        sort_items.sort()
-        for _, sub_command_name, command_klass in sort_items:
-            command_klass(api_subparsers, sub_command_name)
+        add_commands(
+            api_subparsers, API_COMMANDS_PACKAGE, API_COMMANDS, self.argv)
 
     def handler(self, args):
         """打印 subparser 帮助信息"""
@@ -1,8 +1,13 @@
 import posixpath
 import sys
+import time
+
+from fnmatch import fnmatch
+
+from rich.table import Table
 
 from bgesdk.client import API
-from bgesdk.error import APIError
+from bgesdk.error import APIError, BGEError
 from bgesdk.management import constants
 from bgesdk.management.command import BaseCommand
 from bgesdk.management.utils import (
@@ -13,6 +18,8 @@ from bgesdk.management.utils import (
     output_json,
     read_config
 )
+from bgesdk.transfer import DownloadCheckpoint
+from bgesdk.utils import human_byte
 
 
 DEFAULT_OAUTH2_SECTION = constants.DEFAULT_OAUTH2_SECTION
@@ -27,7 +34,36 @@ class Command(BaseCommand):
     def add_arguments(self, parser):
         parser.add_argument(
             'object_name',
-            help='OSS 对象名。'
+            nargs='?',
+            help='OSS 对象名，提供 --list 时可省略。'
+        )
+        parser.add_argument(
+            '-l',
+            '--list',
+            dest='list_file',
+            metavar='FILE',
+            type=str,
+            help='批量下载时的对象列表文件，每行一个 OSS 对象名，为 - 时从标准输入读取。'
+        )
+        parser.add_argument(
+            '-g',
+            '--glob',
+            action='append',
+            metavar='PATTERN',
+            help='仅下载列表中匹配 glob 规则的对象，如 "*.vcf.gz"，可多次提供。'
+        )
+        parser.add_argument(
+            '-d',
+            '--dest_dir',
+            default='.',
+            type=str,
+            help='批量下载时文件保存目录，默认当前目录。'
+        )
+        parser.add_argument(
+            '--keep_dirs',
+            action='store_true',
+            default=False,
+            help='批量下载时在保存目录下保留对象的目录结构。'
         )
         parser.add_argument(
             '-m',
@@ -49,8 +85,20 @@ class Command(BaseCommand):
             '-c',
             '--chunk_size',
             type=int,
-            default=8192,
-            help='下载块大小。'
+            help='下载块大小，默认 1MB。'
+        )
+        parser.add_argument(
+            '-w',
+            '--workers',
+            type=int,
+            default=constants.DOWNLOAD_NUM_THREADS,
+            help='并发下载的连接数，为 1 时顺序下载；批量下载时为同时下载的文件数。'
+        )
+        parser.add_argument(
+            '--part_size',
+            type=int,
+            default=16,
+            help='并发下载时单个区间大小，单位 MB。'
         )
         parser.add_argument(
             '-e',
@@ -70,6 +118,9 @@ class Command(BaseCommand):
         access_token = args.access_token
         object_name = args.object_name
         mode = args.mode
+        if not object_name and not args.list_file:
+            output('[red]请提供 OSS 对象名或对象列表文件[/red]')
+            sys.exit(1)
         project = get_active_project()
         oauth2_section = DEFAULT_OAUTH2_SECTION
         token_section = DEFAULT_TOKEN_SECTION
@@ -77,7 +128,11 @@ class Command(BaseCommand):
         if not access_token:
             access_token = config_get(config.get, token_section, 'access_token')
         endpoint = config_get(config.get, oauth2_section, 'endpoint')
-        api = API(access_token, endpoint=endpoint, timeout=18.)
+        api = API(
+            access_token, endpoint=endpoint, timeout=18., progress='rich')
+        if args.list_file:
+            self.download_many(api, args)
+            return
         filename = posixpath.split(object_name)[1]
         if filename == '':
             output(
@@ -86,7 +141,9 @@ class Command(BaseCommand):
                 )
             )
             sys.exit(1)
-        if posixpath.exists(filename):
+        checkpoint = filename + DownloadCheckpoint.checkpoint_suffix
+        resume = args.mode == 'wb' and posixpath.exists(checkpoint)
+        if not resume and posixpath.exists(filename):
             basename, suffix = posixpath.splitext(filename)
             i = 1
             while True:
@@ -96,18 +153,117 @@ class Command(BaseCommand):
                     break
                 i += 1
         message = '正在下载 {}'.format(object_name)
-        with console.status(message, spinner='earth'):
-            try:
+        output(message)
+        try:
+            if mode == 'wb':
+                # 下载中断后再次执行相同命令即可继续下载
+                api.download_file(
+                    object_name,
+                    filename,
+                    region=args.region,
+                    expiration_time=args.expiration_time,
+                    chunk_size=args.chunk_size,
+                    workers=args.workers,
+                    part_size=args.part_size * 1024 * 1024
+                )
+            else:
                 with open(filename, mode) as fp:
                     api.download(
                         object_name,
                         fp,
                         region=args.region,
                         expiration_time=args.expiration_time,
-                        chunk_size=args.chunk_size
+                        chunk_size=args.chunk_size,
+                        workers=args.workers,
+                        part_size=args.part_size * 1024 * 1024
                     )
-            except APIError as e:
-                output('[red]请求失败：[/red]')
-                output_json(e.result)
-                sys.exit(1)
-            output('[green]文件下载成功：[/green]{}'.format(filename))
+        except APIError as e:
+            output('[red]请求失败：[/red]')
+            output_json(e.result)
+            sys.exit(1)
+        except BGEError as e:
+            output('[red]下载失败：[/red]{}'.format(e))
+            sys.exit(1)
+        output('[green]文件下载成功：[/green]{}'.format(filename))
+
+    def download_many(self, api, args):
+        object_names = read_object_names(args.list_file)
+        if args.object_name:
+            object_names.append(args.object_name)
+        if args.glob:
+            object_names = [
+                name for name in object_names
+                if any(fnmatch(name, pattern) for pattern in args.glob)
+            ]
+        if not object_names:
+            output('[red]没有需要下载的对象[/red]')
+            sys.exit(1)
+        message = '正在下载 {} 个文件至 {}'.format(
+            len(object_names), args.dest_dir)
+        started = time.time()
+        output(message)
+        try:
+            results = api.download_many(
+                object_names,
+                args.dest_dir,
+                region=args.region,
+                expiration_time=args.expiration_time,
+                chunk_size=args.chunk_size,
+                workers=args.workers,
+                part_size=args.part_size * 1024 * 1024,
+                keep_dirs=args.keep_dirs
+            )
+        except BGEError as e:
+            output('[red]下载失败：[/red]{}'.format(e))
+            sys.exit(1)
+        elapsed = time.time() - started
+        failures = [r for r in results if r.error is not None]
+        if failures:
+            output('[red]{} 个文件下载失败：[/red]'.format(len(failures)))
+        else:
+            output('[green]文件下载成功：[/green]')
+        table = Table(
+            title="文件列表",
+            expand=True,
+            show_header=True,
+            header_style="magenta"
+        )
+        table.add_column("序号", style="cyan", no_wrap=True)
+        table.add_column("对象", style="cyan", overflow='fold')
+        table.add_column("保存位置", style="magenta", overflow='fold')
+        table.add_column("大小", style="green", no_wrap=True)
+        table.add_column("速度", style="green", no_wrap=True)
+        for i, result in enumerate(results, 1):
+            if result.error is None:
+                location = result.filepath
+            else:
+                location = '[red]{}[/red]'.format(result.error)
+            table.add_row(
+                str(i),
+                result.object_name,
+                location,
+                human_byte(result.size, 2),
+                '{}/s'.format(human_byte(result.speed, 2))
+            )
+        console.print(table)
+        size = sum(r.size for r in results)
+        output('共下载 {}，耗时 {:.1f}s，平均速度 {}/s'.format(
+            human_byte(size, 2), elapsed,
+            human_byte(size / elapsed if elapsed else 0, 2)))
+        if failures:
+            sys.exit(1)
+
+
+def read_object_names(list_file):
+    """读取对象列表文件,忽略空行与 # 开头的注释行"""
+    if list_file == '-':
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(list_file) as fp:
+            lines = fp.read().splitlines()
+    object_names = []
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith('#'):
+            object_names.append(line)
+    return object_names
@@ -22,7 +22,9 @@ NOT_PARAM_FIELDS = (
     'parser',
     'method',
     'access_token',
-    'subcommand'
+    'subcommand',
+    'all',
+    'workers'
 )
 
 
@@ -89,6 +91,20 @@ class Command(BaseCommand):
             type=int,
             help='每页返回数量，默认值为 50。'
         )
+        parser.add_argument(
+            '-a',
+            '--all',
+            default=False,
+            action='store_true',
+            help='从 --next_page 指定的页码开始获取全部样品。'
+        )
+        parser.add_argument(
+            '-w',
+            '--workers',
+            type=int,
+            default=4,
+            help='与 --all 一起使用，并发获取页面的线程数，默认值为 4。'
+        )
         parser.add_argument(
             '-t',
             '--access_token',
@@ -98,6 +114,8 @@ class Command(BaseCommand):
 
     def handler(self, args):
         access_token = args.access_token
+        fetch_all = args.all
+        workers = args.workers
         params = vars(args)
         for field in NOT_PARAM_FIELDS:
             params.pop(field, None)
@@ -110,7 +128,10 @@ class Command(BaseCommand):
         endpoint = config_get(config.get, oauth2_section, 'endpoint')
         api = API(access_token, endpoint=endpoint, timeout=18.)
         try:
-            result = api.get_samples(**params)
+            if fetch_all:
+                result = list(api.iter_samples(workers=workers, **params))
+            else:
+                result = api.get_samples(**params)
         except APIError as e:
             output('[red]请求失败：[/red]')
             output_json(e.result)
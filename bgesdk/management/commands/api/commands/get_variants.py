@@ -34,6 +34,20 @@ class Command(BaseCommand):
             type=str,
             help='变异位点，多个使用逗号分割。'
         )
+        parser.add_argument(
+            '-b',
+            '--bulk',
+            default=False,
+            action='store_true',
+            help='批量查询，生物样品编号可逗号分割多个，变异位点数量不限，结果按 rs '
+                 '编号合并。'
+        )
+        parser.add_argument(
+            '-w',
+            '--workers',
+            type=int,
+            help='与 --bulk 一起使用，并发请求数，默认值为 4。'
+        )
         parser.add_argument(
             '-t',
             '--access_token',
@@ -54,7 +68,11 @@ class Command(BaseCommand):
         endpoint = config_get(config.get, oauth2_section, 'endpoint')
         api = API(access_token, endpoint=endpoint, timeout=18.)
         try:
-            result = api.get_variants(biosample_id, rsids)
+            if args.bulk:
+                result = api.get_variants_bulk(
+                    biosample_id, rsids, workers=args.workers)
+            else:
+                result = api.get_variants(biosample_id, rsids)
         except APIError as e:
             output('[red]请求失败：[/red]')
             output_json(e.result)
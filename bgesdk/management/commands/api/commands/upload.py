@@ -7,7 +7,6 @@ from bgesdk.management import constants
 from bgesdk.management.command import BaseCommand
 from bgesdk.management.utils import (
     config_get,
-    console,
     get_active_project,
     output,
     output_json,
@@ -28,7 +27,7 @@ class Command(BaseCommand):
         parser.add_argument(
             'filepath',
             type=str,
-            help='要上传的文件路径。'
+            help='要上传的文件路径，为 - 时从标准输入读取并分片上传，如管道中压缩程序的输出。'
         )
         parser.add_argument(
             '-f',
@@ -50,6 +49,7 @@ class Command(BaseCommand):
         parser.add_argument(
             '--multipart_num_threads',
             default=constants.MULTIPART_NUM_THREADS,
+            type=int,
             help='分片上传缺省线程数。'
         )
         parser.add_argument(
@@ -84,11 +84,17 @@ class Command(BaseCommand):
         if not access_token:
             access_token = config_get(config.get, token_section, 'access_token')
         endpoint = config_get(config.get, oauth2_section, 'endpoint')
-        api = API(access_token, endpoint=endpoint, timeout=18.)
-        if not posixpath.isfile(filepath):
+        api = API(
+            access_token, endpoint=endpoint, timeout=18., progress='rich')
+        filename = args.filename
+        if filepath == '-':
+            if not filename:
+                output('[red]从标准输入上传时需要提供 --filename[/red]')
+                sys.exit(1)
+            filepath = sys.stdin.buffer
+        elif not posixpath.isfile(filepath):
             output('[red]只能上传文件[/red]')
             sys.exit(1)
-        filename = args.filename
         cmk_id = args.cmk_id
         part_size = args.part_size
         multipart_threshold = args.multipart_threshold
@@ -96,21 +102,21 @@ class Command(BaseCommand):
         internal = args.internal
         if not filename:
             filename = posixpath.split(filepath)[1]
-        message = '正在上传文件 {}'.format(filepath)
-        with console.status(message, spinner='earth'):
-            try:
-                object_name = api.upload(
-                    filename,
-                    filepath,
-                    part_size=part_size * 1024 * 1024,
-                    multipart_threshold=multipart_threshold * 1024 * 1024,
-                    multipart_num_threads=args.multipart_num_threads,
-                    cmk_id=cmk_id,
-                    region_id=region_id,
-                    internal=internal,
-                )
-            except APIError as e:
-                output('[red]请求失败：[/red]')
-                output_json(e.result)
-                sys.exit(1)
-            output('[green]文件上传成功, 存储位置：[/green]{}'.format(object_name))
+        message = '正在上传文件 {}'.format(args.filepath)
+        output(message)
+        try:
+            object_name = api.upload(
+                filename,
+                filepath,
+                part_size=part_size * 1024 * 1024,
+                multipart_threshold=multipart_threshold * 1024 * 1024,
+                multipart_num_threads=args.multipart_num_threads,
+                cmk_id=cmk_id,
+                region_id=region_id,
+                internal=internal,
+            )
+        except APIError as e:
+            output('[red]请求失败：[/red]')
+            output_json(e.result)
+            sys.exit(1)
+        output('[green]文件上传成功, 存储位置：[/green]{}'.format(object_name))
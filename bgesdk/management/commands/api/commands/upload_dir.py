@@ -1,12 +1,11 @@
-import os
 import sys
 
 
 from rich.table import Table
-from posixpath import join, isfile
 
 from bgesdk.client import API
 from bgesdk.error import APIError
+from bgesdk.fs import iter_files
 from bgesdk.management import constants
 from bgesdk.management.command import BaseCommand
 from bgesdk.management.utils import (
@@ -26,7 +25,7 @@ DEFAULT_TOKEN_SECTION = constants.DEFAULT_TOKEN_SECTION
 class Command(BaseCommand):
 
     order = 14
-    help = '上传目录下文件（不递归上传子目录中文件）。'
+    help = '上传目录下文件（默认不递归上传子目录中文件）。'
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -66,6 +65,43 @@ class Command(BaseCommand):
             action="store_true",
             help='是否使用内部 VPC 域名。'
         )
+        parser.add_argument(
+            '-R',
+            '--recursive',
+            action='store_true',
+            help='递归上传子目录中的文件，并保留文件的相对路径。'
+        )
+        parser.add_argument(
+            '--include',
+            action='append',
+            metavar='PATTERN',
+            help='仅上传匹配 glob 规则的文件，如 "*.fastq.gz"，可多次提供。'
+        )
+        parser.add_argument(
+            '--exclude',
+            action='append',
+            metavar='PATTERN',
+            help='忽略匹配 glob 规则的文件与子目录，可多次提供。'
+        )
+        parser.add_argument(
+            '-w',
+            '--workers',
+            type=int,
+            default=constants.BATCH_UPLOAD_NUM_THREADS,
+            help='同时上传的文件数。'
+        )
+        parser.add_argument(
+            '--max_in_flight',
+            type=int,
+            default=constants.UPLOAD_MAX_IN_FLIGHT,
+            help='同时进行中的上传请求（含分片）数上限。'
+        )
+        parser.add_argument(
+            '-s',
+            '--sync',
+            action='store_true',
+            help='增量上传，跳过内容（CRC64）与平台上已有文件一致的文件。'
+        )
         parser.add_argument(
             '-t',
             '--access_token',
@@ -82,46 +118,68 @@ class Command(BaseCommand):
         if not access_token:
             access_token = config_get(config.get, token_section, 'access_token')
         endpoint = config_get(config.get, oauth2_section, 'endpoint')
-        api = API(access_token, endpoint=endpoint, timeout=18.)
+        api = API(
+            access_token, endpoint=endpoint, timeout=18., progress='rich')
         dirpath = args.dirpath
         cmk_id = args.cmk_id
         part_size = args.part_size
         multipart_threshold = args.multipart_threshold
         region_id = args.region_id
         internal = args.internal
-        files = []
-        for filename in os.listdir(dirpath):
-            filepath = join(dirpath, filename)
-            if isfile(filepath):
-                files.append(filepath)
-        if not files:
+        recursive = args.recursive
+        include = args.include
+        exclude = args.exclude
+        files = iter_files(
+            dirpath, recursive=recursive, include=include, exclude=exclude)
+        if next(files, None) is None:
             output('[red]文件夹中没有可上传的文件[/red]')
             sys.exit(1)
         message = '正在上传目录 {}'.format(dirpath)
-        with console.status(message, spinner='earth'):
-            try:
-                object_names = api.upload_dir(
-                    dirpath,
-                    part_size=part_size * 1024 * 1024,
-                    multipart_threshold=multipart_threshold * 1024 * 1024,
-                    multipart_num_threads=args.multipart_num_threads,
-                    cmk_id=cmk_id,
-                    region_id=region_id,
-                    internal=internal,
-                )
-            except APIError as e:
-                output('[red]请求失败：[/red]')
-                output_json(e.result)
-                sys.exit(1)
-            output('[green]文件上传成功：[/green]')
-            table = Table(
-                title="文件列表",
-                expand=True,
-                show_header=True,
-                header_style="magenta"
+        output(message)
+        try:
+            results = api.upload_dir(
+                dirpath,
+                part_size=part_size * 1024 * 1024,
+                multipart_threshold=multipart_threshold * 1024 * 1024,
+                multipart_num_threads=args.multipart_num_threads,
+                cmk_id=cmk_id,
+                region_id=region_id,
+                internal=internal,
+                recursive=recursive,
+                include=include,
+                exclude=exclude,
+                workers=args.workers,
+                max_in_flight=args.max_in_flight,
+                sync=args.sync,
+                return_results=True
             )
-            table.add_column("序号", style="cyan", no_wrap=True)
-            table.add_column("存储位置", style="magenta", overflow='fold')
-            for i, object_name in enumerate(object_names, 1):
-                table.add_row(str(i), object_name)
-            console.print(table)
+        except APIError as e:
+            output('[red]请求失败：[/red]')
+            output_json(e.result)
+            sys.exit(1)
+        failures = [r for r in results if r.error is not None]
+        if failures:
+            output('[red]{} 个文件上传失败：[/red]'.format(len(failures)))
+        else:
+            output('[green]文件上传成功：[/green]')
+        table = Table(
+            title="文件列表",
+            expand=True,
+            show_header=True,
+            header_style="magenta"
+        )
+        table.add_column("序号", style="cyan", no_wrap=True)
+        table.add_column("文件", style="cyan", overflow='fold')
+        table.add_column("存储位置", style="magenta", overflow='fold')
+        for i, result in enumerate(results, 1):
+            if result.skipped:
+                location = '{} [yellow]（未变化，已跳过）[/yellow]'.format(
+                    result.object_name)
+            elif result.error is None:
+                location = result.object_name
+            else:
+                location = '[red]{}[/red]'.format(result.error)
+            table.add_row(str(i), result.filename, location)
+        console.print(table)
+        if failures:
+            sys.exit(1)
@@ -1,7 +1,6 @@
 import argparse
 import csv
 import docker
-import fnmatch
 import json
 import os
 import python_minifier
@@ -16,13 +15,17 @@ import zipfile
 from datetime import datetime
 from posixpath import join, exists, isdir, relpath, split, abspath
 from rich.prompt import Confirm
-from time import sleep
 from traceback import format_exc
 from uuid import uuid4
 
 from bgesdk.client import API
 from bgesdk.error import APIError
 from bgesdk.management import constants
+from bgesdk.management.build_cache import (
+    BuildCache,
+    build_archive,
+    file_sha256
+)
 from bgesdk.management.command import BaseCommand
 from bgesdk.management.utils import (
     config_get,
@@ -37,10 +40,11 @@ from bgesdk.management.utils import (
     output,
     output_json,
     output_syntax,
+    PatternMatcher,
     read_config,
     SYS_STR
 )
-from bgesdk.utils import human_byte
+from bgesdk.utils import RateLimiter, human_byte, ordered_map
 
 
 DEFAULT_OAUTH2_SECTION = constants.DEFAULT_OAUTH2_SECTION
@@ -161,6 +165,9 @@ TOTAL_PROGRESS = {
 BGE_IGNORE_FILE = '.bgeignore'
 BGE_MINIFY_FILE = '.bgeminify'
 
+# 最近一次部署成功的模型源码压缩包记录,位于 .bge 目录中
+DEPLOY_RECORD_FILE = 'deploy.json'
+
 CREATE_MESSAGE = '创建 {} ...'
 INSTALL_DOCKER_MESSAGE = '\
 请先安装 docker，参考 https://docs.docker.com/engine/install/'
@@ -173,6 +180,15 @@ WHEREIS_DOCKER = 'whereis docker'
 ZIP_COMPRESSION = zipfile.ZIP_DEFLATED
 
 
+def get_minifier_version():
+    """python_minifier 版本号,混淆结果缓存随版本失效"""
+    try:
+        from importlib.metadata import version
+        return version('python_minifier')
+    except Exception:
+        return ''
+
+
 class TestServerPortAction(argparse.Action):
 
     def __call__(self, parser, namespace, values, option_string=None):
@@ -368,6 +384,20 @@ class Command(BaseCommand):
             default='new_license.csv',
             help='输出的 CSV 文件路径。'
         )
+        new_license_p.add_argument(
+            '-w',
+            '--workers',
+            type=int,
+            default=1,
+            help='使用参数文件时并发请求许可证的线程数。'
+        )
+        new_license_p.add_argument(
+            '-r',
+            '--rate',
+            type=float,
+            default=None,
+            help='使用参数文件时每秒最多请求许可证的次数，默认不限制。'
+        )
         new_license_p.set_defaults(
             method=self.new_model_license,
             parser=new_license_p
@@ -423,6 +453,19 @@ class Command(BaseCommand):
             default=None,
             help='输出目录。'
         )
+        package_p.add_argument(
+            '--no-cache',
+            default=False,
+            action='store_true',
+            help='不使用打包缓存，重新压缩、混淆全部文件。'
+        )
+        package_p.add_argument(
+            '-j',
+            '--jobs',
+            type=int,
+            default=None,
+            help='并行混淆、压缩文件的进程数，默认为 CPU 核数。'
+        )
         package_p.set_defaults(method=self.package_model, parser=package_p)
 
 
@@ -446,6 +489,20 @@ class Command(BaseCommand):
             action="store_true",
             help='部署时同时部署代码到镜像模型中。'
         )
+        deploy_p.add_argument(
+            '--no-cache',
+            default=False,
+            action='store_true',
+            help=('不使用打包缓存，重新压缩、混淆全部文件，模型源码未变化时也重新'
+                  '上传。')
+        )
+        deploy_p.add_argument(
+            '-j',
+            '--jobs',
+            type=int,
+            default=None,
+            help='并行混淆、压缩文件的进程数，默认为 CPU 核数。'
+        )
         deploy_p.set_defaults(method=self.deploy_model, parser=deploy_p)
 
         publish_p = model_subparsers.add_parser(
@@ -882,7 +939,8 @@ class Command(BaseCommand):
         access_token = config_get(config.get, token_section, 'access_token')
         endpoint = config_get(config.get, oauth2_section, 'endpoint')
         api = API(
-            access_token, endpoint=endpoint, timeout=DEFAULT_MODEL_TIMEOUT)
+            access_token, endpoint=endpoint, timeout=DEFAULT_MODEL_TIMEOUT,
+            progress='rich')
         try:
             result = api.upload_model_expfs(model_id, 'uploadtest.zip')
         except APIError as e:
@@ -905,10 +963,12 @@ class Command(BaseCommand):
 
     def package_model(self, args):
         target = args.target
-        self._package_model(target=target)
+        self._package_model(
+            target=target, use_cache=not args.no_cache, workers=args.jobs)
 
 
-    def _package_model(self, zip_filename=None, target=None):
+    def _package_model(self, zip_filename=None, target=None, use_cache=True,
+                       workers=None):
         home = get_home()
         config_path = self.get_model_config_path()
         config = get_config_parser(config_path)
@@ -941,8 +1001,19 @@ class Command(BaseCommand):
                 prefix='model-',
                 dir=zip_tmpdir,
                 delete=False) as tmp:
+            cache = None
+            if use_cache:
+                cache = BuildCache(
+                    join(home, '.bge', 'build_cache'),
+                    compress_type=ZIP_COMPRESSION,
+                    minifier_version=get_minifier_version()
+                )
             with zipfile.ZipFile(tmp.name, 'w', ZIP_COMPRESSION) as zf:
-                self._zip_codedir(home, zf)
+                self._zip_codedir(home, zf, cache=cache, workers=workers)
+            if cache is not None:
+                cache.save()
+                output('打包缓存：命中 {} 个文件，重新压缩 {} 个文件'.format(
+                    cache.hits, cache.misses))
             tmp.flush()
             tmp.seek(0, 2)
             size = tmp.tell()
@@ -956,6 +1027,7 @@ class Command(BaseCommand):
         """部署模型"""
         ignore_source = args.ignore_source
         with_mirrors = args.with_mirrors
+        use_cache = not args.no_cache
         project = get_active_project()
         config_path = self.get_model_config_path()
         config = get_config_parser(config_path)
@@ -977,33 +1049,52 @@ class Command(BaseCommand):
         access_token = config_get(config.get, token_section, 'access_token')
         endpoint = config_get(config.get, oauth2_section, 'endpoint')
         api = API(
-            access_token, endpoint=endpoint, timeout=DEFAULT_MODEL_TIMEOUT)
+            access_token, endpoint=endpoint, timeout=DEFAULT_MODEL_TIMEOUT,
+            progress='rich')
         object_name = None
+        archive = None
+        reused = False
         if not ignore_source:
-            model_zip_path = self._package_model()
-            zip_filename = split(model_zip_path)[1]
-            with open(model_zip_path, 'rb') as fp:
-                fp.seek(0, 2)
-                size = fp.tell()
-                fp.seek(0)
-                human_size = human_byte(size)
-                if size > 500 * 1024 * 1024:
-                    output(
-                        '打包后 zip 文件大小为 {}，最大限制 500MB'.format(
-                            human_size
-                        )
+            model_zip_path = self._package_model(
+                use_cache=use_cache, workers=args.jobs)
+            size = os.path.getsize(model_zip_path)
+            if size > 500 * 1024 * 1024:
+                output(
+                    '打包后 zip 文件大小为 {}，最大限制 500MB'.format(
+                        human_byte(size)
                     )
-                    exit(1)
-                output('开始上传模型源码...')
-                try:
-                    object_name = api.upload(zip_filename, fp)
-                except APIError as e:
-                    output('[red]上传模型源码失败：[/red]')
-                    output_json(e.result)
-                    sys.exit(1)
-                output('[green]上传成功[green]')
+                )
+                exit(1)
+            # 压缩包内容确定,与上次部署成功的压缩包一致时无需重新上传
+            archive = {
+                'sha256': file_sha256(model_zip_path),
+                'size': size,
+                'project': project,
+                'endpoint': endpoint
+            }
+            record = self._read_deploy_record()
+            if use_cache and record.get('object_name') and all(
+                    record.get(key) == value
+                    for key, value in archive.items()):
+                object_name = record['object_name']
+                reused = True
+                output('模型源码未变化，使用已上传的 {}'.format(object_name))
+            else:
+                object_name = self._upload_model_archive(api, model_zip_path)
         try:
-            self._deploy_model_code(api, model_id, object_name, **params)
+            progress = self._deploy_model_code(
+                api, model_id, object_name, **params)
+            if progress is None and reused:
+                # 部署请求被拒绝时已上传的压缩包可能已失效,删除部署记录并重新
+                # 上传后重试一次;部署任务本身失败时不重试
+                self._remove_deploy_record()
+                output('[yellow]重新上传模型源码后重试...[/yellow]')
+                object_name = self._upload_model_archive(api, model_zip_path)
+                progress = self._deploy_model_code(
+                    api, model_id, object_name, **params)
+            if progress == 'SUCCESS' and archive is not None:
+                archive['object_name'] = object_name
+                self._write_deploy_record(archive)
         except Exception as e:
             output('[red] 上传部署模型代码到模型 {} 失败...[/red]'.format(model_id))
             output_syntax(str(e))
@@ -1025,6 +1116,43 @@ class Command(BaseCommand):
                 output_syntax(str(e))
             output('\n\n')
 
+    def _upload_model_archive(self, api, model_zip_path):
+        zip_filename = split(model_zip_path)[1]
+        with open(model_zip_path, 'rb') as fp:
+            output('开始上传模型源码...')
+            try:
+                object_name = api.upload(zip_filename, fp)
+            except APIError as e:
+                output('[red]上传模型源码失败：[/red]')
+                output_json(e.result)
+                sys.exit(1)
+            output('[green]上传成功[green]')
+        return object_name
+
+    def _get_deploy_record_path(self):
+        return join(get_home(), '.bge', DEPLOY_RECORD_FILE)
+
+    def _read_deploy_record(self):
+        try:
+            with open(self._get_deploy_record_path()) as fp:
+                return json.load(fp)
+        except (IOError, OSError, ValueError):
+            return {}
+
+    def _remove_deploy_record(self):
+        try:
+            os.remove(self._get_deploy_record_path())
+        except (IOError, OSError):
+            pass
+
+    def _write_deploy_record(self, record):
+        path = self._get_deploy_record_path()
+        dirname = split(path)[0]
+        if not exists(dirname):
+            os.makedirs(dirname)
+        with open(path, 'w') as fp:
+            json.dump(record, fp, indent=4)
+
     def _deploy_model_code(self, api, model_id, object_name, **params):
         with console.status('模型部署中...', spinner='earth'):
             try:
@@ -1048,83 +1176,96 @@ class Command(BaseCommand):
             output('[red]模型 {} 灰度部署失败。任务结果：{}'.format(model_id, result))
         elif 'REVOKED' == progress:
             output('[white]模型 {} 灰度部署任务已被撤销。'.format(model_id))
+        return progress
 
     def _wait_model_task(self, api, task_id, task_path):
-        seconds = 0
-        while True:
-            result = api.task(task_id)
+        def report(result, elapsed):
             progress = result.progress
-            if progress not in TOTAL_PROGRESS:
-                output(TASK_ERROR_MESSAGE.format(seconds, progress))
-                try:
-                    os.unlink(task_path)
-                except (IOError, OSError):
-                    pass
-                sys.exit(1)
-            output(WAIT_MESSAGE.format(seconds, TOTAL_PROGRESS[progress]))
-            if progress in ('SUCCESS', 'FAILURE', 'REVOKED'):
-                break
-            sleep(1)
-            seconds += 1
+            if progress in TOTAL_PROGRESS:
+                output(WAIT_MESSAGE.format(
+                    int(elapsed), TOTAL_PROGRESS[progress]))
+            else:
+                output(TASK_ERROR_MESSAGE.format(int(elapsed), progress))
+        # 指数退避轮询,并遵循服务端返回的 Retry-After 头部
+        result = api.wait_task(task_id, callback=report)
         try:
             os.unlink(task_path)
         except (IOError, OSError):
             pass
+        progress = result.progress
+        if progress not in TOTAL_PROGRESS:
+            sys.exit(1)
         return progress
 
-    def _zip_codedir(self, home, ziph):
+    def _zip_codedir(self, home, ziph, cache=None, workers=None):
         home = home.rstrip('/')
-        total_files = {}
-        zip_relpaths = set()
-        for root, _, files in os.walk(home):
+        ignore_matcher = PatternMatcher(self.get_ignore_patterns(home))
+        minify_matcher = PatternMatcher(self.get_minify_patterns(home))
+        zip_files = []
+        minify_files = []
+        # 压缩包位于模型目录中时不能打包其自身
+        zip_path = ziph.filename and abspath(ziph.filename)
+
+        def skip_dir(path):
+            return ignore_matcher.match_dir(path) and \
+                not minify_matcher.may_match_dir(path)
+
+        for root, dirs, files in os.walk(home):
+            rel_root = relpath(root, home)
+            if rel_root == '.':
+                rel_root = ''
+            # 跳过全部文件均被忽略且没有需混淆文件的目录,不再遍历其中的文件
+            dirs[:] = [
+                d for d in dirs
+                if not skip_dir(join(rel_root, d))
+                and not (cache is not None and join(root, d) == cache.path)
+            ]
             for file in files:
+                zip_relpath = join(rel_root, file)
                 filepath = join(root, file)
-                zip_relpath = relpath(filepath, home)
-                zip_relpaths.add(zip_relpath)
-                total_files[zip_relpath] = filepath
-        src_zip_relpaths = zip_relpaths.copy()
-        ignore_patterns = self.get_ignore_patterns(home)
-        for ignore_pattern in ignore_patterns:
-            if ignore_pattern.startswith('!'):
-                ignore_pattern = ignore_pattern[1:]
-                zip_relpaths.update(
-                    fnmatch.filter(src_zip_relpaths, ignore_pattern))
-                continue
-            zip_relpaths -= set(
-                fnmatch.filter(zip_relpaths, ignore_pattern))
-        minify_relpaths = set()
-        minify_patterns = self.get_minify_patterns(home)
-        for minify_pattern in minify_patterns:
-            if minify_pattern.startswith('!'):
-                minify_pattern = minify_pattern[1:]
-                minify_relpaths -= set(
-                    fnmatch.filter(minify_relpaths, minify_pattern))
-                continue
-            minify_relpaths.update(
-                fnmatch.filter(src_zip_relpaths, minify_pattern))
-        # 仅支持混淆 .py 文件
-        minify_relpaths = fnmatch.filter(minify_relpaths, '*.py')
-        with console.status('正在打包模型源码...', spinner='dots'):
-            for zip_relpath in sorted(zip_relpaths):
-                filepath = total_files[zip_relpath]
-                if zip_relpath in minify_relpaths:
+                if filepath == zip_path:
                     continue
-                zipinfo = zipfile.ZipInfo(zip_relpath)
-                zipinfo.external_attr = 0o755 << 16
-                zipinfo.compress_type = ZIP_COMPRESSION
-                with open(filepath, 'rb') as f:
-                    ziph.writestr(zipinfo, f.read())
-                output('\t{}'.format(zip_relpath))
-            for zip_relpath in sorted(minify_relpaths):
-                filepath = total_files[zip_relpath]
-                with open(filepath, 'r') as fp:
-                    content = fp.read()
-                content = python_minifier.minify(content)
-                zipinfo = zipfile.ZipInfo(zip_relpath)
-                zipinfo.external_attr = 0o755 << 16
-                zipinfo.compress_type = ZIP_COMPRESSION
-                ziph.writestr(zipinfo, content)
-                output('\t{} [green]MINIFIED[/green]'.format(zip_relpath))
+                # 仅支持混淆 .py 文件;与混淆规则匹配的文件即使被忽略也会打包
+                if file.endswith('.py') and minify_matcher.match(zip_relpath):
+                    minify_files.append((zip_relpath, filepath))
+                elif not ignore_matcher.match(zip_relpath):
+                    zip_files.append((zip_relpath, filepath))
+        files = [
+            (self._new_zipinfo(zip_relpath), filepath, False)
+            for zip_relpath, filepath in sorted(zip_files)
+        ]
+        files.extend(
+            (self._new_zipinfo(zip_relpath), filepath, True)
+            for zip_relpath, filepath in sorted(minify_files)
+        )
+
+        def report(zipinfo, minified):
+            if minified:
+                output('\t{} [green]MINIFIED[/green]'.format(
+                    zipinfo.filename))
+            else:
+                output('\t{}'.format(zipinfo.filename))
+
+        with console.status('正在打包模型源码...', spinner='dots'):
+            # 并行混淆、压缩文件,按文件顺序依次写入压缩包,与逐个处理时生成的
+            # 压缩包完全一致;不使用打包缓存时不计算摘要,也不写入缓存目录
+            if cache is None:
+                build = build_archive
+            else:
+                build = cache.build
+            build(
+                ziph,
+                files,
+                minify=python_minifier.minify,
+                workers=workers,
+                callback=report
+            )
+
+    def _new_zipinfo(self, zip_relpath):
+        zipinfo = zipfile.ZipInfo(zip_relpath)
+        zipinfo.external_attr = 0o755 << 16
+        zipinfo.compress_type = ZIP_COMPRESSION
+        return zipinfo
 
     def get_ignore_patterns(self, home):
         patterns = []
@@ -1307,10 +1448,13 @@ class Command(BaseCommand):
         config = read_config(project)
         access_token = config_get(config.get, token_section, 'access_token')
         endpoint = config_get(config.get, oauth2_section, 'endpoint')
+        # 并发请求时每个线程各占用一个连接
+        pool_maxsize = args.workers if args.workers > 1 else None
         api = API(
             access_token,
             endpoint=endpoint,
-            timeout=DEFAULT_MODEL_TIMEOUT
+            timeout=DEFAULT_MODEL_TIMEOUT,
+            pool_maxsize=pool_maxsize
         )
         csv_file = args.csv
         if isdir(csv_file):
@@ -1332,9 +1476,15 @@ class Command(BaseCommand):
             )
             csv_writer.writeheader()
             if args.file:
-                for num, params in enumerate(
-                        self._iter_model_params(args.file),
-                        start=1):
+                results = self._iter_model_licenses(
+                    api,
+                    model_id,
+                    expires,
+                    self._iter_model_params(args.file),
+                    workers=args.workers,
+                    rate=args.rate
+                )
+                for num, params, r, error in results:
                     console.rule()
                     output(
                         '处理第 [green]{}[/green] 行参数：{!r}'.format(
@@ -1342,20 +1492,8 @@ class Command(BaseCommand):
                             params
                         )
                     )
-                    try:
-                        params_val = json.loads(params)
-                    except Exception:
-                        output(format_exc())
-                        continue
-                    try:
-                        r = self._get_model_license(
-                            api,
-                            model_id,
-                            expires,
-                            params_val
-                        )
-                    except Exception:
-                        output(format_exc())
+                    if error is not None:
+                        output(error)
                         continue
                     license_key = r['license_key']
                     expiration_time = r['expiration_time']
@@ -1818,6 +1956,39 @@ class Command(BaseCommand):
                     break
                 yield line.strip()
 
+    def _iter_model_licenses(self, api, model_id, expires, lines, workers=1,
+                             rate=None):
+        """按参数文件的行顺序返回许可证请求结果
+
+        workers 大于 1 时在线程池中并发请求，同一时刻最多缓存 workers * 2 行的结
+        果；rate 限制全部线程合计每秒的请求次数。
+
+        Yields:
+            tuple: (行号, 参数字符串, 许可证, 错误信息)，失败时许可证为 None；
+        """
+        limiter = RateLimiter(rate) if rate else None
+
+        def get_license(item):
+            num, params = item
+            try:
+                params_val = json.loads(params)
+                if limiter is not None:
+                    limiter.acquire()
+                r = self._get_model_license(
+                    api,
+                    model_id,
+                    expires,
+                    params_val
+                )
+            except Exception:
+                return num, params, None, format_exc()
+            return num, params, r, None
+
+        lines = enumerate(lines, start=1)
+        if workers > 1:
+            return ordered_map(get_license, lines, workers)
+        return map(get_license, lines)
+
     def _get_model_license(self, api, model_id, expires, params):
         result = api.model_license(
             model_id,
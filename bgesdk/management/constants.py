@@ -64,3 +64,12 @@ PART_SIZE = 50 * 1024 * 1024
 
 # 分片上传缺省线程数
 MULTIPART_NUM_THREADS = 4
+
+# 批量上传同时上传的文件数
+BATCH_UPLOAD_NUM_THREADS = 4
+
+# 批量上传同时进行中的上传请求(含分片)数上限
+UPLOAD_MAX_IN_FLIGHT = 8
+
+# 并发下载缺省连接数
+DOWNLOAD_NUM_THREADS = 4
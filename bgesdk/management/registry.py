@@ -0,0 +1,153 @@
+#-*- coding: utf-8 -*-
+
+"""
+命令行子命令索引。
+
+构建命令行参数解析器时仅根据索引注册子命令的名称与帮助信息,只有命令行参数中选中
+的子命令才会导入对应模块并注册完整的参数,避免每次运行 bge 时导入全部子命令及其依
+赖(docker、oss2、python_minifier 等)。
+
+新增、删除子命令或修改子命令的 order、help 后需同步更新索引,可运行:
+
+    python -m bgesdk.management.registry
+
+输出最新的索引内容。
+"""
+
+from importlib import import_module
+
+import argparse
+
+
+__all__ = ['COMMANDS', 'API_COMMANDS', 'add_commands', 'build_index']
+
+COMMANDS_PACKAGE = 'bgesdk.management.commands'
+
+API_COMMANDS_PACKAGE = 'bgesdk.management.commands.api.commands'
+
+# (名称, order, help)
+COMMANDS = (
+    ('api', 5, 'BGE 开放平台接口测试工具，可调用部分平台接口。'),
+    ('config', 1, '配置、新增、显示、删除 BGE 开放平台的 OAuth2 配置，仅支持客户端模式。'),
+    ('login', 3, '授权码模式登录并获取授权令牌。'),
+    ('model', 5, '模型初始化脚手架、配置、部署等相关命令。'),
+    ('model_doc', 6,
+     '对模型文档进行预览和发布，可访问 '
+     'https://api.bge.genomics.cn/doc/scripts/model_doc.json 下载示例文件'),
+    ('token', 4, '获取、保存访问令牌。'),
+    ('workon', 2, '激活某项目配置，其他命令均使用已激活的项目配置作为全局配置。'),
+)
+
+API_COMMANDS = (
+    ('aggregate_omics_data', 12,
+     '聚合组学数据（目前仅支持聚合数据流中符合平台设定 JSONPath 规则的数值型数据）。'),
+    ('applet_url', 17,
+     '用于获取小程序加密 URL Link，链接默认于29天后过期，返回的 expire_time 字段代表过期的时间戳（单位：秒）。'),
+    ('download', 15, '下载文件。'),
+    ('ferry_to_oss', 16, '下载科服文件。通过当前接口，从科技服务的文件服务中下载文件并上传至 BGE 平台的 OSS 服务中。'),
+    ('get_data_items', 10, '请求数据项。'),
+    ('get_externals', 5, '获取套件外部编号对应表。'),
+    ('get_func_abundance', 8, '获取微生物功能丰度。'),
+    ('get_gene_abundance', 9, '获取微生物基因丰度。'),
+    ('get_overview', 2, '用户数据概览。'),
+    ('get_range_stream', 11, '请求数据流。'),
+    ('get_samples', 4, '获取样品信息。'),
+    ('get_taxon_abundance', 7, '获取微生物类群丰度。'),
+    ('get_user', 1, '获取用户信息。'),
+    ('get_variants', 6, '获取变异位点数据。'),
+    ('id_meta', 3, '身份要素核验。'),
+    ('task', 18, '获取 BGE 私有平台任务结果。'),
+    ('upload', 13, '上传文件。'),
+    ('upload_dir', 14, '上传目录下文件（默认不递归上传子目录中文件）。'),
+)
+
+
+def selected_command(argv, names):
+    """返回命令行参数中选中的子命令名称,未选中时返回 None
+
+    子命令之前仅允许出现不带值的选项(如 -h、-V)。
+    """
+    for arg in argv:
+        if arg.startswith('-'):
+            continue
+        return arg if arg in names else None
+    return None
+
+
+def add_commands(subparsers, package, index, argv):
+    """按索引注册子命令
+
+    argv 中选中的子命令导入模块并注册完整参数,其余子命令仅注册名称与帮助信息。
+
+    Args:
+        subparsers: argparse 子命令解析器集合;
+        package (str): 子命令模块所在的包;
+        index (tuple): 子命令索引,元素为 (名称, order, help);
+        argv (list): 当前层级之后的命令行参数;
+    """
+    names = [name for name, _, _ in index]
+    selected = selected_command(argv, names)
+    for name, _, help in sorted(index, key=lambda item: (item[1], item[0])):
+        if name == selected:
+            module = import_module('{}.{}'.format(package, name))
+            sub_argv = argv[argv.index(name) + 1:]
+            module.Command(subparsers, name, argv=sub_argv)
+        else:
+            subparsers.add_parser(
+                name,
+                formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+                help=help
+            )
+
+
+def build_index(package):
+    """导入包中全部子命令模块,生成子命令索引"""
+    from .command import BaseCommand
+    from .utils import find_commands
+
+    module = import_module(package)
+    index = []
+    for name in find_commands(module.__path__[0]):
+        command_module = import_module('{}.{}'.format(package, name))
+        command_klass = getattr(command_module, 'Command', None)
+        if command_klass is None or not issubclass(
+                command_klass, BaseCommand):
+            continue
+        order = int(getattr(command_klass, 'order', 1))
+        index.append((name, order, command_klass.help or ''))
+    return tuple(index)
+
+
+def format_index(name, index, width=79):
+    """生成索引的源码,超过 width 的行将帮助信息拆分为多行字符串"""
+    lines = ['{} = ('.format(name)]
+    for item in index:
+        line = '    {!r},'.format(item)
+        if len(line) <= width:
+            lines.append(line)
+            continue
+        lines.append('    ({!r}, {!r},'.format(*item[:2]))
+        chunks = split_text(item[2], width - len("     ''),"))
+        for i, chunk in enumerate(chunks, start=1):
+            lines.append('     {!r}{}'.format(
+                chunk, '),' if i == len(chunks) else ''))
+    lines.append(')')
+    return '\n'.join(lines)
+
+
+def split_text(text, width):
+    """将文本拆分为长度不超过 width 的片段,优先在空格或标点之后拆分"""
+    chunks = []
+    while len(text) > width:
+        pos = max(text.rfind(c, 0, width) for c in ' ，、。：')
+        pos = pos + 1 if pos > 0 else width
+        chunks.append(text[:pos])
+        text = text[pos:]
+    chunks.append(text)
+    return chunks
+
+
+if '__main__' == __name__:
+    for name, package in (('COMMANDS', COMMANDS_PACKAGE),
+                          ('API_COMMANDS', API_COMMANDS_PACKAGE)):
+        print(format_index(name, build_index(package)) + '\n')
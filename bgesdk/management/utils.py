@@ -1,9 +1,11 @@
 #-*- coding: utf-8 -*-
 
+import fnmatch
 import json
 import os
 import pkgutil
 import platform
+import re
 import six
 import sys
 
@@ -16,6 +18,7 @@ from rich.syntax import Syntax
 from six.moves import configparser
 
 from . import __path__, constants
+from bgesdk import codec
 
 if six.PY2:
     ConfigParser = configparser.SafeConfigParser
@@ -35,6 +38,95 @@ class CNConfirm(Confirm):
     validate_error_message = "[prompt.invalid]请输入 Y 或 N"
 
 
+class PatternMatcher(object):
+    """.bgeignore、.bgeminify 规则匹配器
+
+    规则为 Unix 文件名通配符,以 ! 开头的规则表示排除;按顺序应用规则,与路径匹配
+    的最后一条规则决定匹配结果。全部规则编译为一个正则表达式,逆序排列的分支中首
+    个匹配的分支即为最后一条匹配的规则,每个路径只需匹配一次。
+
+    Args:
+        patterns (list): 规则列表;
+    """
+
+    def __init__(self, patterns):
+        self.patterns = []
+        for pattern in patterns:
+            negated = pattern.startswith('!')
+            if negated:
+                pattern = pattern[1:]
+            self.patterns.append((pattern, negated))
+        branches = [
+            '(?P<p{}>{})'.format(i, fnmatch.translate(pattern))
+            for i, (pattern, _) in reversed(list(enumerate(self.patterns)))
+        ]
+        # 与 fnmatch.fnmatch 一致,在大小写不敏感的系统上忽略大小写
+        self._ignore_case = os.path.normcase('A') == 'a'
+        flags = re.IGNORECASE if self._ignore_case else 0
+        self._regex = None
+        if branches:
+            self._regex = re.compile('|'.join(branches), flags)
+
+    def match(self, path):
+        """路径与最后一条匹配的规则为非排除规则时返回 True
+
+        Args:
+            path (str): 相对路径,以 / 分隔;
+        """
+        if self._regex is None:
+            return False
+        m = self._regex.match(path)
+        if m is None:
+            return False
+        return not self.patterns[int(m.lastgroup[1:])][1]
+
+    def match_dir(self, path):
+        """目录下的全部路径均匹配时返回 True,用于遍历时跳过目录
+
+        仅当某条以 * 结尾的非排除规则匹配 "目录/",并且其后没有可能匹配该目录下
+        路径的排除规则时返回 True,无法确定时返回 False。
+
+        Args:
+            path (str): 目录相对路径,以 / 分隔;
+        """
+        prefix = path.rstrip('/') + '/'
+        if self._ignore_case:
+            prefix = prefix.lower()
+        for pattern, negated in reversed(self.patterns):
+            if self._ignore_case:
+                pattern = pattern.lower()
+            literal = re.split(r'[*?\[]', pattern, 1)[0]
+            if not (literal.startswith(prefix) or prefix.startswith(literal)):
+                continue
+            if negated:
+                return False
+            # 以 * 结尾的规则匹配 "目录/" 时,也匹配该目录下的任意路径
+            if pattern.endswith('*') and fnmatch.fnmatchcase(prefix, pattern):
+                return True
+        return False
+
+    def may_match_dir(self, path):
+        """目录下可能存在匹配的路径时返回 True,用于遍历时判断能否跳过目录
+
+        仅比较非排除规则中通配符之前的部分,无法确定时返回 True。
+
+        Args:
+            path (str): 目录相对路径,以 / 分隔;
+        """
+        prefix = path.rstrip('/') + '/'
+        if self._ignore_case:
+            prefix = prefix.lower()
+        for pattern, negated in self.patterns:
+            if negated:
+                continue
+            if self._ignore_case:
+                pattern = pattern.lower()
+            literal = re.split(r'[*?\[]', pattern, 1)[0]
+            if literal.startswith(prefix) or prefix.startswith(literal):
+                return True
+        return False
+
+
 def get_home():
     return abspath('.')
 
@@ -134,7 +226,7 @@ def get_config_parser(path):
 def output_json(data, indent=4, sort_keys=True, ensure_ascii=False,
                 cls=None):
     syntax = Syntax(
-        json.dumps(
+        codec.dumps(
             data,
             indent=indent,
             sort_keys=sort_keys,
@@ -2,9 +2,12 @@
 
 import json
 
+from collections.abc import MutableSequence
 from six.moves import UserDict
 from weakref import proxy
 
+from . import codec
+
 
 class ModelEncoder(json.JSONEncoder):
 
@@ -14,7 +17,9 @@ class ModelEncoder(json.JSONEncoder):
     """
 
     def default(self, o):
-        return o.data
+        if hasattr(o, 'data'):
+            return o.data
+        return json.JSONEncoder.default(self, o)
 
 
 def _encode_data(val):
@@ -42,6 +47,8 @@ def _decode_data(val):
         for sub_val in val:
             ret.append(_decode_data(sub_val))
         return ret
+    elif isinstance(val, LazyListModel):
+        return val.json()
     else:
         return val
 
@@ -64,7 +71,7 @@ class ListModel(list):
 
     def dumps(self, indent=None, ensure_ascii=None, **kwargs):
         r = self.json()
-        return json.dumps(
+        return codec.dumps(
             r, indent=indent, ensure_ascii=ensure_ascii, **kwargs)
 
     def __str__(self):
@@ -146,7 +153,7 @@ class Model(UserDict):
 
     def dumps(self, indent=None, ensure_ascii=None, **kwargs):
         r = self.json()
-        return json.dumps(
+        return codec.dumps(
             r, indent=indent, ensure_ascii=ensure_ascii, **kwargs)
 
     def __str__(self):
@@ -157,6 +164,168 @@ class Model(UserDict):
             self.__class__.__name__, hex(id(self)))
 
 
+def _wrap_lazy(val):
+    if isinstance(val, dict):
+        return LazyModel(val)
+    elif isinstance(val, list):
+        return LazyListModel(val)
+    else:
+        return val
+
+
+def _unwrap_lazy(val):
+    if isinstance(val, LazyModel):
+        return val.data
+    elif isinstance(val, LazyListModel):
+        return val.json()
+    elif isinstance(val, (Model, ListModel)):
+        return val.json()
+    else:
+        return val
+
+
+class LazyListModel(MutableSequence):
+    """延迟封装的列表模型类
+
+    原始列表的视图,不复制数据:元素在被访问时才封装为 LazyModel 或
+    LazyListModel,读取与修改直接作用于原始列表;json() 直接返回原始列表。
+
+    json.dumps 需使用 cls=ModelEncoder 序列化,或使用 dumps()。
+    """
+
+    __hash__ = None
+
+    def __init__(self, data):
+        assert isinstance(data, (list, tuple))
+        self.data = data
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, index):
+        val = self.data[index]
+        if isinstance(index, slice):
+            return LazyListModel(val)
+        return _wrap_lazy(val)
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            value = [_unwrap_lazy(val) for val in value]
+        else:
+            value = _unwrap_lazy(value)
+        self.data[index] = value
+
+    def __delitem__(self, index):
+        del self.data[index]
+
+    def __iter__(self):
+        for val in self.data:
+            yield _wrap_lazy(val)
+
+    def __reversed__(self):
+        for val in reversed(self.data):
+            yield _wrap_lazy(val)
+
+    def __contains__(self, value):
+        return _unwrap_lazy(value) in self.data
+
+    def __eq__(self, other):
+        if isinstance(other, (list, tuple, ListModel, LazyListModel)):
+            return self.data == _unwrap_lazy(other)
+        return NotImplemented
+
+    def __iadd__(self, values):
+        self.extend(values)
+        return self
+
+    def __imul__(self, n):
+        self.data *= n
+        return self
+
+    def insert(self, index, value):
+        self.data.insert(index, _unwrap_lazy(value))
+
+    def append(self, value):
+        self.data.append(_unwrap_lazy(value))
+
+    def extend(self, values):
+        self.data.extend([_unwrap_lazy(val) for val in values])
+
+    def pop(self, index=-1):
+        return _wrap_lazy(self.data.pop(index))
+
+    def remove(self, value):
+        self.data.remove(_unwrap_lazy(value))
+
+    def clear(self):
+        del self.data[:]
+
+    def index(self, value, *args):
+        return self.data.index(_unwrap_lazy(value), *args)
+
+    def count(self, value):
+        return self.data.count(_unwrap_lazy(value))
+
+    def reverse(self):
+        self.data.reverse()
+
+    def sort(self, *args, **kwargs):
+        self.data.sort(*args, **kwargs)
+
+    def json(self):
+        """返回可 JSON 序列化的对象"""
+        if isinstance(self.data, list):
+            return self.data
+        return list(self.data)
+
+    def dumps(self, indent=None, ensure_ascii=None, **kwargs):
+        return codec.dumps(
+            self.json(), indent=indent, ensure_ascii=ensure_ascii, **kwargs)
+
+    def __str__(self):
+        return '%s(%s)' % (self.__class__.__name__, self.data)
+
+    def __repr__(self):
+        return '<%s object at %s>' % (
+            self.__class__.__name__, hex(id(self)))
+
+
+class LazyModel(Model):
+    """延迟封装的接口返回数据模型类
+
+    直接引用原始字典而不复制,嵌套的字典与列表在被访问时才进行封装,修改会同步到
+    原始字典中;json() 直接返回原始字典,适用于数据量较大的接口返回值。
+
+    使用示例:
+
+        >>> data = {'x': [{'x1': 'x1'}]}
+        >>> m = LazyModel(data)
+        >>> m.x[0].x1
+        'x1'
+        >>> m.json() is data
+        True
+    """
+
+    def __init__(self, data):
+        self.data = data
+
+    def __getitem__(self, key):
+        return _wrap_lazy(self.data[key])
+
+    def __setitem__(self, key, value):
+        self.data[key] = _unwrap_lazy(value)
+
+    def __getattr__(self, name):
+        try:
+            return _wrap_lazy(self.data[name])
+        except KeyError:
+            raise AttributeError(name)
+
+    def json(self):
+        """返回可 JSON 序列化的对象"""
+        return self.data
+
+
 class AuthorizationCodeToken(Model):
     """授权码模式返回的令牌对象"""
 
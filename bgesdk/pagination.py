@@ -0,0 +1,165 @@
+#-*- coding: utf-8 -*-
+
+"""
+分页接口迭代工具。
+
+平台分页接口统一返回包含 result(当前页数据)和 next_page(下一页参数)的数据,
+本模块将其转换为逐条返回数据的迭代器,并支持在后台线程中预先读取后续页面。
+"""
+
+from .utils import ordered_map
+
+from six.moves import queue
+
+import math
+import threading
+
+
+__all__ = [
+    'iter_pages', 'iter_numbered_pages', 'last_page_number', 'iter_items',
+    'read_ahead'
+]
+
+_ITEM = 0
+_DONE = 1
+_ERROR = 2
+
+
+def iter_pages(fetch, next_page=None):
+    """按页迭代分页接口
+
+    Args:
+        fetch (callable): 获取单页数据的函数,参数为 next_page,返回包含 result
+                          和 next_page 的 Model;
+        next_page (非必填): 起始页参数,默认值为 None,即首页;
+
+    Yields:
+        Model: 每页数据;
+    """
+    while True:
+        page = fetch(next_page)
+        yield page
+        # 部分接口在最后一页仍返回下一页参数,出现空页或页参数不变时结束迭代
+        if not page['result']:
+            break
+        if page['next_page'] is None or page['next_page'] == next_page:
+            break
+        next_page = page['next_page']
+
+
+def iter_numbered_pages(fetch, next_page=None, workers=4, limit=None):
+    """并发获取以页码分页的接口的全部页面
+
+    首页返回的 count 与每页数量 limit 决定总页数,其余页面在线程池中并发获取,并按
+    页码顺序返回。
+
+    Args:
+        fetch (callable): 获取单页数据的函数,参数为页码,返回包含 count、result
+                          和 next_page 的 Model;
+        next_page (int, 非必填): 起始页码,默认值为 None,即第 1 页;
+        workers (int, 非必填): 并发线程数,默认值为 4;
+        limit (int, 非必填): 请求的每页数量,默认以首页返回数量作为每页数量;
+
+    Yields:
+        Model: 每页数据;
+    """
+    page = next_page or 1
+    first = fetch(page)
+    yield first
+    last = last_page_number(first, page, limit)
+    if last is None:
+        return
+    for ret in ordered_map(fetch, range(page + 1, last + 1), workers):
+        if not ret['result']:
+            break
+        yield ret
+
+
+def last_page_number(first, page, limit=None):
+    """根据首页数据计算最后一页的页码,没有后续页面时返回 None
+
+    首页返回数量少于 limit 时,若已包含 count 中剩余的全部数据则为最后一页,否则
+    为服务端限制了每页数量,以首页实际返回数量作为每页数量。
+
+    Args:
+        first (Model): 首页数据,包含 count、result 和 next_page;
+        page (int): 首页页码;
+        limit (int, 非必填): 请求的每页数量;
+
+    Returns:
+        int: 最后一页的页码;
+    """
+    size = len(first['result'])
+    if not size or not first['next_page']:
+        return None
+    count = first['count']
+    if limit and size < limit and (page - 1) * limit + size >= count:
+        return None
+    if limit and size >= limit:
+        size = limit
+    last = int(math.ceil(count / float(size)))
+    if last <= page:
+        return None
+    return last
+
+
+def iter_items(pages):
+    """逐条返回各页 result 中的数据"""
+    for page in pages:
+        for item in page['result']:
+            yield item
+
+
+def read_ahead(iterable, size):
+    """在后台线程中预先读取迭代器中的元素
+
+    后台线程最多缓存 size 个尚未被消费的元素,消费者停止迭代后后台线程随之退出并
+    关闭被预读取的迭代器,迭代过程中的异常会在消费者线程中重新抛出。
+
+    Args:
+        iterable (iterable): 被预读取的迭代器;
+        size (int): 最多缓存的元素数量;
+
+    Yields:
+        object: 迭代器中的元素;
+    """
+    buffer = queue.Queue(maxsize=int(size))
+    stopped = threading.Event()
+
+    def put(kind, value):
+        while not stopped.is_set():
+            try:
+                buffer.put((kind, value), timeout=0.1)
+            except queue.Full:
+                continue
+            return True
+        return False
+
+    def produce():
+        iterator = iter(iterable)
+        try:
+            for item in iterator:
+                if not put(_ITEM, item):
+                    return
+        except BaseException as e:
+            put(_ERROR, e)
+        else:
+            put(_DONE, None)
+        finally:
+            close = getattr(iterator, 'close', None)
+            if close is not None:
+                close()
+
+    thread = threading.Thread(target=produce)
+    thread.daemon = True
+    thread.start()
+    try:
+        while True:
+            kind, value = buffer.get()
+            if kind == _DONE:
+                break
+            if kind == _ERROR:
+                raise value
+            yield value
+    finally:
+        stopped.set()
@@ -0,0 +1,138 @@
+#-*- coding: utf-8 -*-
+
+"""
+任务结果轮询。
+
+模型部署、回滚等接口返回任务编号,任务通常需要数分钟才能完成。固定间隔轮询会产生
+大量请求,本模块提供指数退避并带随机抖动的轮询策略,同时可遵循服务端返回的
+Retry-After 头部,或通过 RFC 7240 的 Prefer: wait 头部请求服务端长轮询。
+
+使用示例:
+
+    >>> policy = PollPolicy(initial=2, max_interval=60, long_poll=20)
+    >>> api.wait_task(task_id, timeout=1800, poll_policy=policy)
+    Model({...})
+"""
+
+from . import constants
+
+from email.utils import parsedate_tz, mktime_tz
+
+import random
+import re
+import time
+
+
+__all__ = [
+    'PENDING_STATES', 'FINISHED_STATES', 'RETRY_STATUS_CODES', 'PollPolicy',
+    'parse_retry_after'
+]
+
+# 任务未结束时的状态
+PENDING_STATES = ('PENDING', 'RECEIVED', 'RETRY', 'STARTED')
+
+# 任务结束时的状态
+FINISHED_STATES = ('SUCCESS', 'FAILURE', 'REVOKED')
+
+# 服务端限流或暂时不可用的状态码,等待后继续轮询
+RETRY_STATUS_CODES = (429, 503)
+
+
+def parse_retry_after(value, now=None):
+    """解析 Retry-After 头部
+
+    Args:
+        value (str): 秒数或 HTTP 日期;
+        now (float, 非必填): 当前时间戳,默认为 time.time();
+
+    Returns:
+        float: 需等待的秒数,无法解析时为 None;
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    parsed = parsedate_tz(value)
+    if parsed is None:
+        return None
+    if now is None:
+        now = time.time()
+    return max(mktime_tz(parsed) - now, 0.)
+
+
+class PollPolicy(object):
+    """任务轮询策略
+
+    第 n 次轮询后等待 initial * multiplier ** n 秒,不超过 max_interval,并在
+    [1 - jitter, 1 + jitter] 倍范围内随机抖动,避免大量客户端同时轮询。
+
+    Args:
+        initial (float, 非必填): 首次等待秒数,默认 1;
+        max_interval (float, 非必填): 最大等待秒数,默认 30;
+        multiplier (float, 非必填): 等待时间增长倍数,默认 1.5;
+        jitter (float, 非必填): 随机抖动比例,默认 0.2,为 0 时不抖动;
+        retry_after (bool, 非必填): 服务端返回 Retry-After 头部时是否按其等待,
+                                    默认 True;
+        long_poll (float, 非必填): 请求服务端长轮询的最长等待秒数,默认 None 不
+                                   使用长轮询;服务端以 Preference-Applied 头部
+                                   确认时立即发起下一次请求;
+    """
+
+    def __init__(self, initial=None, max_interval=None, multiplier=None,
+                 jitter=None, retry_after=True, long_poll=None):
+        if initial is None:
+            initial = constants.TASK_POLL_INITIAL
+        if max_interval is None:
+            max_interval = constants.TASK_POLL_MAX_INTERVAL
+        if multiplier is None:
+            multiplier = constants.TASK_POLL_MULTIPLIER
+        if jitter is None:
+            jitter = constants.TASK_POLL_JITTER
+        self.initial = float(initial)
+        self.max_interval = float(max_interval)
+        self.multiplier = float(multiplier)
+        self.jitter = float(jitter)
+        self.retry_after = retry_after
+        self.long_poll = long_poll
+
+    def request_headers(self):
+        """返回轮询请求附带的头部"""
+        if not self.long_poll:
+            return {}
+        return {'Prefer': 'wait=%d' % self.long_poll}
+
+    def request_timeout(self, timeout):
+        """长轮询时在请求超时时间上增加服务端的等待时间"""
+        if not self.long_poll or timeout is None:
+            return timeout
+        if isinstance(timeout, tuple):
+            connect, read = timeout
+            return (connect, None if read is None else read + self.long_poll)
+        return timeout + self.long_poll
+
+    def delay(self, attempt, headers=None):
+        """返回第 attempt 次(从 0 开始)轮询后的等待秒数
+
+        Args:
+            attempt (int): 已轮询次数减一;
+            headers (dict, 非必填): 轮询请求的响应头部;
+
+        Returns:
+            float: 等待秒数;
+        """
+        headers = headers or {}
+        if self.long_poll and re.search(
+                r'\bwait\b', headers.get('Preference-Applied', '')):
+            return 0.
+        if self.retry_after:
+            retry_after = parse_retry_after(headers.get('Retry-After'))
+            if retry_after is not None:
+                return retry_after
+        # 限制指数,避免轮询次数很多时浮点数溢出
+        delay = min(
+            self.initial * self.multiplier ** min(attempt, 64),
+            self.max_interval)
+        if self.jitter:
+            delay *= 1 + self.jitter * (2 * random.random() - 1)
+        return max(delay, 0.)
@@ -0,0 +1,254 @@
+#-*- coding: utf-8 -*-
+
+"""
+文件传输进度。
+
+上传、下载时多个线程同时汇报已传输的字节数,本模块在锁内累计字节数,并按固定的时
+间间隔渲染进度,避免每个数据块都格式化字符串并写入终端。渲染时若其他线程正在渲染则
+直接跳过,传输线程不会因等待终端输出而阻塞。
+
+API 默认不输出任何进度,需要时通过 progress 参数指定:
+
+    >>> api = API(access_token, progress='rich')
+    >>> api = API(access_token, progress=lambda desc, done, total: ...)
+"""
+
+from .error import BGEError
+from .utils import human_byte
+
+from functools import partial
+
+import sys
+import threading
+import time
+
+
+__all__ = [
+    'Progress', 'SilentProgress', 'CallbackProgress', 'TextProgress',
+    'RichProgress', 'progress_factory'
+]
+
+
+class Progress(object):
+    """传输进度基类
+
+    update 与 set 可在多个线程中同时调用,距上次渲染超过 interval 秒时调用
+    render 渲染进度,close 时总是渲染最终进度。
+
+    Args:
+        description (str, 非必填): 进度描述,如文件名;
+        total (int, 非必填): 总字节数,未知时为 None;
+        interval (float, 非必填): 渲染间隔秒数,默认 0.1;
+    """
+
+    interval = 0.1
+
+    def __init__(self, description=None, total=None, interval=None):
+        self.description = description
+        self.total = total
+        self.done = 0
+        if interval is not None:
+            self.interval = interval
+        self.closed = False
+        self._lock = threading.Lock()
+        self._render_lock = threading.Lock()
+        self._next_render = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def update(self, size):
+        """累加已传输的字节数"""
+        with self._lock:
+            self.done += size
+        self._maybe_render()
+
+    def set(self, done, total=None):
+        """设置已传输的字节数与总字节数,用于汇报累计值的回调"""
+        with self._lock:
+            self.done = done
+            if total is not None:
+                self.total = total
+        self._maybe_render()
+
+    def close(self):
+        """渲染最终进度,重复调用无效"""
+        with self._render_lock:
+            if self.closed:
+                return
+            self.closed = True
+            self.render(self.done, self.total, True)
+
+    def _maybe_render(self):
+        now = time.monotonic()
+        if now < self._next_render or self.closed:
+            return
+        if not self._render_lock.acquire(False):
+            return
+        try:
+            if not self.closed:
+                self._next_render = now + self.interval
+                self.render(self.done, self.total, False)
+        finally:
+            self._render_lock.release()
+
+    def render(self, done, total, final):
+        """渲染进度,子类实现
+
+        Args:
+            done (int): 已传输的字节数;
+            total (int): 总字节数,未知时为 None;
+            final (bool): 是否为传输结束时的最终渲染;
+        """
+        raise NotImplementedError
+
+
+class SilentProgress(Progress):
+    """仅统计字节数,不输出进度"""
+
+    def _maybe_render(self):
+        pass
+
+    def render(self, done, total, final):
+        pass
+
+
+class CallbackProgress(Progress):
+    """按渲染间隔调用 callback(description, done, total)"""
+
+    def __init__(self, callback, description=None, total=None,
+                 interval=None):
+        super(CallbackProgress, self).__init__(
+            description=description, total=total, interval=interval)
+        self.callback = callback
+
+    def render(self, done, total, final):
+        self.callback(self.description, done, total)
+
+
+class TextProgress(Progress):
+    """在终端单行输出进度条"""
+
+    # 单行输出的进度条固定为 80 个字符长度
+    prog_size = 61
+    stream = None
+
+    def render(self, done, total, final):
+        stream = self.stream or sys.stdout
+        if total:
+            prog_size = self.prog_size
+            eq_size = int(done * prog_size / total)
+            equal_s = '=' * eq_size
+            blank_s = ' ' * (prog_size - eq_size)
+            progress = '>'.join((equal_s, blank_s))
+            percent = '%.2f%%' % float(done / total * 100)
+            stream.write('\r\t%s [%s]' % (percent.rjust(7), progress))
+        else:
+            stream.write('\r\t已传输：%s' % human_byte(done).ljust(7))
+        if final:
+            stream.write('\n')
+        stream.flush()
+
+
+class RichProgress(object):
+    """使用 rich 进度条显示多个并发传输的进度
+
+    同一实例创建的进度共享一个 rich 进度条显示区域,首个传输开始时显示,全部传输
+    结束后关闭。
+
+    Args:
+        console (rich.console.Console, 非必填): 输出进度条的终端;
+        transient (bool, 非必填): 全部传输结束后是否清除进度条,默认 False;
+    """
+
+    def __init__(self, console=None, transient=False):
+        self.console = console
+        self.transient = transient
+        self._lock = threading.Lock()
+        self._live = None
+        self._active = 0
+
+    def __call__(self, description=None, total=None):
+        with self._lock:
+            if self._live is None:
+                self._live = self._new_live()
+                self._live.start()
+            self._active += 1
+            task_id = self._live.add_task(description or '', total=total)
+        return _RichTask(self, self._live, task_id, description, total)
+
+    def _new_live(self):
+        from rich import progress
+        return progress.Progress(
+            progress.TextColumn('{task.description}'),
+            progress.BarColumn(),
+            progress.DownloadColumn(),
+            progress.TransferSpeedColumn(),
+            progress.TimeRemainingColumn(),
+            console=self.console,
+            transient=self.transient
+        )
+
+    def _finish(self):
+        with self._lock:
+            self._active -= 1
+            if not self._active:
+                self._live.stop()
+                self._live = None
+
+
+class _RichTask(Progress):
+    """RichProgress 中单个传输的进度"""
+
+    def __init__(self, group, live, task_id, description, total):
+        super(_RichTask, self).__init__(description=description, total=total)
+        self.group = group
+        self.live = live
+        self.task_id = task_id
+
+    def render(self, done, total, final):
+        self.live.update(self.task_id, completed=done, total=total)
+        if final:
+            self.group._finish()
+
+
+_progress_classes = {
+    'silent': SilentProgress,
+    'text': TextProgress,
+    'rich': RichProgress,
+}
+
+
+def progress_factory(progress):
+    """将 API 的 progress 参数转换为创建进度对象的函数
+
+    Args:
+        progress: 进度输出方式,可以是:
+            - None 或 False: 不输出进度;
+            - 'silent'、'text' 或 'rich': 对应的内置实现;
+            - Progress 子类或 RichProgress 实例;
+            - 其他可调用对象: 作为回调函数,以 (description, done, total)
+              为参数调用;
+
+    Returns:
+        callable: 以 (description, total) 为参数,返回 Progress 对象;
+    """
+    if progress is None or progress is False:
+        return SilentProgress
+    if isinstance(progress, str):
+        try:
+            progress = _progress_classes[progress]
+        except KeyError:
+            raise BGEError('unsupported progress: %s' % progress)
+    if progress is RichProgress:
+        return RichProgress()
+    if isinstance(progress, RichProgress):
+        return progress
+    if isinstance(progress, type) and issubclass(progress, Progress):
+        return progress
+    if callable(progress):
+        return partial(CallbackProgress, progress)
+    raise BGEError('unsupported progress: %r' % (progress,))
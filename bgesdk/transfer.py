@@ -0,0 +1,530 @@
+#-*- coding: utf-8 -*-
+
+"""
+文件传输辅助工具。
+
+批量上传、下载时多个文件与同一文件的多个分片在不同线程中并发传输,本模块提供在这
+些线程之间共享的并发限制、HTTP Range 分段下载、数据流的分片上传以及增量上传使
+用的文件摘要。
+"""
+
+from .error import BGEError
+
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial, wraps
+
+import copy
+import hashlib
+import io
+import json
+import os
+import requests
+import threading
+
+
+__all__ = [
+    'TransferLimiter', 'FileWriter', 'RangeError', 'DownloadCheckpoint',
+    'HashManifest', 'Digest', 'is_seekable', 'is_appending', 'is_stream',
+    'split_ranges',
+    'fetch_range', 'iter_parts', 'stream_upload', 'file_digest',
+    'remote_matches'
+]
+
+
+class TransferLimiter(object):
+    """限制同时进行中的传输请求数量
+
+    文件级线程与 oss2 分片上传线程共享同一个限制器,因此无论同时上传多少个文件、
+    每个文件使用多少分片线程,同时进行中的 PUT 请求数都不会超过 max_in_flight。
+
+    Args:
+        max_in_flight (int): 同时进行中的传输请求数上限;
+    """
+
+    # 受限制的 oss2.Bucket 数据传输方法
+    bucket_methods = ('put_object', 'upload_part', 'append_object')
+
+    def __init__(self, max_in_flight):
+        self.max_in_flight = max(int(max_in_flight), 1)
+        self._semaphore = threading.BoundedSemaphore(self.max_in_flight)
+
+    def __enter__(self):
+        self._semaphore.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._semaphore.release()
+
+    def wrap(self, func):
+        """返回在限制器内执行 func 的函数"""
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with self:
+                return func(*args, **kwargs)
+        return wrapper
+
+    def limit_bucket(self, bucket):
+        """返回数据传输请求受限制器约束的 bucket 副本
+
+        副本与 bucket 共享认证对象与连接池,仅替换副本实例的方法,
+        oss2.resumable_upload 等通过副本发起的分片请求同样受到约束。
+
+        Args:
+            bucket (oss2.Bucket): OSS 存储空间对象;
+
+        Returns:
+            oss2.Bucket: bucket 的副本;
+        """
+        bucket = copy.copy(bucket)
+        for name in self.bucket_methods:
+            method = getattr(bucket, name, None)
+            if method is not None:
+                setattr(bucket, name, self.wrap(method))
+        return bucket
+
+
+def is_seekable(fp):
+    """判断文件对象是否支持随机位置写入"""
+    seekable = getattr(fp, 'seekable', None)
+    if seekable is None:
+        return False
+    try:
+        return bool(seekable())
+    except (OSError, ValueError):
+        return False
+
+
+def is_appending(fp):
+    """判断文件对象是否以追加模式打开
+
+    追加模式下 write 总是写入文件末尾,Linux 上 os.pwrite 也会忽略偏移量,无法按
+    位置写入。
+    """
+    if 'a' in getattr(fp, 'mode', ''):
+        return True
+    try:
+        fd = fp.fileno()
+    except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+        return False
+    try:
+        import fcntl
+    except ImportError:
+        return False
+    try:
+        return bool(fcntl.fcntl(fd, fcntl.F_GETFL) & os.O_APPEND)
+    except OSError:
+        return False
+
+
+class FileWriter(object):
+    """线程安全地向文件对象的指定位置写入数据
+
+    文件对象存在文件描述符且系统支持 os.pwrite 时直接按偏移量写入,多个线程无需
+    加锁;否则加锁后通过 seek 与 write 写入。
+
+    Args:
+        fp (file like object): 支持 seek 且非追加模式的可写文件对象;
+        base (int, 非必填): 写入位置的起始偏移量;
+    """
+
+    def __init__(self, fp, base=0):
+        if is_appending(fp):
+            raise ValueError('can not write at offsets in append mode')
+        self.fp = fp
+        self.base = base
+        self._fd = None
+        self._lock = threading.Lock()
+        if hasattr(os, 'pwrite'):
+            try:
+                self._fd = fp.fileno()
+            except (AttributeError, OSError, io.UnsupportedOperation):
+                self._fd = None
+
+    def write(self, data, offset):
+        """将 data 写入 base + offset 位置"""
+        offset += self.base
+        if self._fd is None:
+            with self._lock:
+                self.fp.seek(offset)
+                self.fp.write(data)
+            return
+        view = memoryview(data)
+        while view:
+            written = os.pwrite(self._fd, view, offset)
+            view = view[written:]
+            offset += written
+
+
+def split_ranges(start, end, part_size):
+    """将 [start, end) 按 part_size 拆分为 HTTP Range 区间 [(first, last)]"""
+    part_size = max(int(part_size), 1)
+    return [
+        (first, min(first + part_size, end) - 1)
+        for first in range(start, end, part_size)
+    ]
+
+
+class RangeError(BGEError):
+    """HTTP Range 请求返回非 206 状态码"""
+
+    def __init__(self, status_code):
+        self.status_code = status_code
+        super(RangeError, self).__init__(
+            'range request failed: HTTP %s' % status_code)
+
+
+def fetch_range(session, url, writer, first, last, chunk_size=None,
+                timeout=None, callback=None, max_retries=3):
+    """下载 HTTP Range 区间 [first, last] 并写入对应的位置
+
+    连接中断时从已写入的位置继续请求剩余数据,最多重试 max_retries 次。
+
+    Args:
+        session (requests.Session): HTTP 会话;
+        url (str): 下载地址;
+        writer (FileWriter): 写入对象;
+        first (int): 区间起始位置;
+        last (int): 区间结束位置(包含);
+        chunk_size (int, 非必填): 单次读取的数据大小;
+        timeout (num, 非必填): 请求超时时间;
+        callback (callable, 非必填): 每写入一块数据后以写入字节数调用;
+        max_retries (int, 非必填): 连接中断时的重试次数;
+
+    Raises:
+        RangeError: 服务端未返回 206 状态码,如下载地址已过期;
+        BGEError: 多次重试后仍未完成下载;
+
+    Returns:
+        int: 写入的字节数;
+    """
+    position = first
+    retries = 0
+    while position <= last:
+        headers = {'Range': 'bytes=%d-%d' % (position, last)}
+        error = 'incomplete response'
+        try:
+            with session.get(
+                    url, headers=headers, stream=True, timeout=timeout) as r:
+                if r.status_code != 206:
+                    raise RangeError(r.status_code)
+                for chunk in r.iter_content(chunk_size):
+                    writer.write(chunk, position)
+                    position += len(chunk)
+                    if callback is not None:
+                        callback(len(chunk))
+        except (requests.exceptions.ConnectionError,
+                requests.exceptions.ChunkedEncodingError,
+                requests.exceptions.Timeout) as e:
+            error = e
+        if position <= last:
+            retries += 1
+            if retries > max_retries:
+                raise BGEError('fail to download bytes=%d-%d: %s' % (
+                    position, last, error))
+    return position - first
+
+
+class DownloadCheckpoint(object):
+    """断点续传下载记录
+
+    记录保存在目标文件旁的 <文件名>.bgedownload 中,内容为对象信息与已完成的区
+    间;下载数据写入 <文件名>.bgepart,全部区间完成后替换为目标文件。
+
+    Args:
+        filepath (str): 目标文件路径;
+        identity (dict): 对象信息(对象名、大小、ETag 等),与记录中不一致时重新
+                         下载;
+    """
+
+    checkpoint_suffix = '.bgedownload'
+    part_suffix = '.bgepart'
+
+    def __init__(self, filepath, identity):
+        self.filepath = filepath
+        self.path = filepath + self.checkpoint_suffix
+        self.part_path = filepath + self.part_suffix
+        self.identity = identity
+        self.done = set()
+        self._lock = threading.Lock()
+
+    def load(self):
+        """读取已有的下载记录,返回是否可继续下载"""
+        try:
+            with open(self.path, 'r') as fp:
+                record = json.load(fp)
+        except (IOError, OSError, ValueError):
+            return False
+        if record.get('identity') != self.identity:
+            return False
+        size = self.identity.get('size')
+        try:
+            if os.path.getsize(self.part_path) != size:
+                return False
+        except OSError:
+            return False
+        self.done = set(tuple(r) for r in record.get('done', []))
+        return True
+
+    def add(self, rng):
+        """记录已完成的区间"""
+        with self._lock:
+            self.done.add(tuple(rng))
+            self._save()
+
+    def save(self):
+        with self._lock:
+            self._save()
+
+    def _save(self):
+        record = {
+            'identity': self.identity,
+            'done': sorted(self.done)
+        }
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as fp:
+            json.dump(record, fp)
+        os.replace(tmp_path, self.path)
+
+    def finish(self):
+        """下载完成,将数据文件替换为目标文件并删除下载记录"""
+        os.replace(self.part_path, self.filepath)
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+def is_stream(data, threshold):
+    """判断 data 是否应通过 stream_upload 分片上传
+
+    管道等不支持 seek 的文件对象以及 bytes 迭代器总是分片上传;支持 seek 的文件对
+    象在剩余数据长度达到 threshold 时分片上传;bytes 与 str 不分片上传。
+    """
+    if isinstance(data, (bytes, bytearray, str)):
+        return False
+    if hasattr(data, 'read'):
+        if not is_seekable(data):
+            return True
+        position = data.tell()
+        end = data.seek(0, os.SEEK_END)
+        data.seek(position)
+        return end - position >= threshold
+    return hasattr(data, '__iter__')
+
+
+def _read_part(read, part_size):
+    """从文件对象中读取 part_size 字节,管道单次读取不足时继续读取直至结束"""
+    chunks = []
+    size = 0
+    while size < part_size:
+        chunk = read(part_size - size)
+        if not chunk:
+            break
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        chunks.append(chunk)
+        size += len(chunk)
+    return b''.join(chunks)
+
+
+def iter_parts(source, part_size):
+    """将类文件对象或 bytes 迭代器切分为 part_size 大小的分片
+
+    Args:
+        source (file like object|iterable): 数据来源,迭代器中的 str 按 utf-8 编码;
+        part_size (int): 分片大小,最后一个分片可能小于该值;
+
+    Yields:
+        bytes: 分片数据;
+    """
+    read = getattr(source, 'read', None)
+    if read is not None:
+        while True:
+            data = _read_part(read, part_size)
+            if data:
+                yield data
+            if len(data) < part_size:
+                return
+    buffer = bytearray()
+    for chunk in source:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        buffer += chunk
+        while len(buffer) >= part_size:
+            yield bytes(buffer[:part_size])
+            del buffer[:part_size]
+    if buffer:
+        yield bytes(buffer)
+
+
+def stream_upload(bucket, key, source, part_size, num_threads=4,
+                  headers=None, callback=None):
+    """边读取边分片上传数据流
+
+    数据按 part_size 切分后在 num_threads 个线程中并发上传,读取下一个分片前需等
+    待空闲的上传槽位,因此内存中最多同时存在 num_threads 个分片。数据不足两个分片
+    时直接使用 put_object 上传。任一分片上传失败时取消分片上传并抛出异常。
+
+    Args:
+        bucket (oss2.Bucket): OSS 存储空间对象;
+        key (str): OSS 对象名;
+        source (file like object|iterable): 管道、文件对象或 bytes 迭代器;
+        part_size (int): 分片大小;
+        num_threads (int, 非必填): 并发上传的分片数,默认 4;
+        headers (dict, 非必填): 创建对象时使用的 HTTP 头;
+        callback (callable, 非必填): 每上传一个分片后以分片字节数调用;
+
+    Returns:
+        oss2.models.RequestResult: 上传结果;
+    """
+    from oss2.models import PartInfo
+
+    part_size = int(part_size)
+    num_threads = max(int(num_threads), 1)
+    parts = iter_parts(source, part_size)
+    first = next(parts, b'')
+    second = next(parts, None) if len(first) == part_size else None
+    if second is None:
+        result = bucket.put_object(key, first, headers=headers)
+        if callback is not None:
+            callback(len(first))
+        return result
+    upload_id = bucket.init_multipart_upload(key, headers=headers).upload_id
+    slots = threading.BoundedSemaphore(num_threads)
+    failed = threading.Event()
+    pending = [first, second]
+
+    def upload(number, data):
+        try:
+            result = bucket.upload_part(key, upload_id, number, data)
+        except BaseException:
+            failed.set()
+            raise
+        finally:
+            slots.release()
+        if callback is not None:
+            callback(len(data))
+        return PartInfo(number, result.etag, size=len(data))
+
+    futures = []
+    try:
+        with ThreadPoolExecutor(max_workers=num_threads) as executor:
+            number = 0
+            while not failed.is_set():
+                slots.acquire()
+                data = pending.pop(0) if pending else next(parts, None)
+                if data is None:
+                    slots.release()
+                    break
+                number += 1
+                futures.append(executor.submit(upload, number, data))
+                del data
+            part_infos = [future.result() for future in futures]
+        return bucket.complete_multipart_upload(key, upload_id, part_infos)
+    except BaseException:
+        for future in futures:
+            future.cancel()
+        try:
+            bucket.abort_multipart_upload(key, upload_id)
+        except Exception:
+            pass
+        raise
+
+
+class Digest(object):
+    """数据的 CRC64(与 OSS x-oss-hash-crc64ecma 一致)与 MD5 摘要"""
+
+    def __init__(self):
+        from oss2.utils import Crc64
+        self._crc = Crc64()
+        self._md5 = hashlib.md5()
+        self.size = 0
+
+    def update(self, data):
+        self._crc.update(data)
+        self._md5.update(data)
+        self.size += len(data)
+
+    @property
+    def crc64(self):
+        return self._crc.crc
+
+    @property
+    def md5(self):
+        return self._md5.hexdigest()
+
+
+def file_digest(path, chunk_size=1024 * 1024):
+    """分块读取文件,计算 (crc64, md5) 摘要"""
+    digest = Digest()
+    with open(path, 'rb') as fp:
+        for chunk in iter(partial(fp.read, chunk_size), b''):
+            digest.update(chunk)
+    return digest.crc64, digest.md5
+
+
+def remote_matches(result, crc64, md5):
+    """判断 HEAD 请求返回的对象信息与本地摘要是否一致
+
+    优先比较 CRC64;服务端未返回 CRC64 时,仅对 ETag 为内容 MD5 的对象(非分片上
+    传)比较 MD5。
+    """
+    if result.server_crc is not None:
+        return result.server_crc == crc64
+    etag = (result.etag or '').lower()
+    return len(etag) == 32 and '-' not in etag and etag == md5
+
+
+class HashManifest(object):
+    """本地文件摘要缓存
+
+    以文件绝对路径为键记录文件大小、修改时间与摘要,文件大小与修改时间均未变化时
+    直接使用缓存的摘要,避免重复读取文件。可在多个线程中同时使用。
+
+    Args:
+        path (str): 缓存文件路径;
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._entries = None
+        self._changed = False
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._entries is None:
+            try:
+                with open(self.path) as fp:
+                    self._entries = json.load(fp)
+            except (OSError, ValueError):
+                self._entries = {}
+        return self._entries
+
+    def digest(self, filepath, chunk_size=1024 * 1024):
+        """返回文件的 (crc64, md5),文件未变化时使用缓存"""
+        filepath = os.path.abspath(filepath)
+        stat = os.stat(filepath)
+        key = [stat.st_size, stat.st_mtime_ns]
+        with self._lock:
+            entry = self._load().get(filepath)
+        if entry is not None and entry[:2] == key:
+            return entry[2], entry[3]
+        crc64, md5 = file_digest(filepath, chunk_size=chunk_size)
+        with self._lock:
+            self._entries[filepath] = key + [crc64, md5]
+            self._changed = True
+        return crc64, md5
+
+    def save(self):
+        """保存缓存,未发生变化时不写入"""
+        with self._lock:
+            if not self._changed:
+                return
+            dirname = os.path.dirname(self.path)
+            if dirname and not os.path.isdir(dirname):
+                os.makedirs(dirname)
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w') as fp:
+                json.dump(self._entries, fp)
+            os.replace(tmp_path, self.path)
+            self._changed = False
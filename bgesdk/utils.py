@@ -1,7 +1,11 @@
 #-*- coding: utf-8 -*-
 
 import logging
+import threading
+import time
 
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from six.moves import http_client
 
 
@@ -30,3 +34,67 @@ def human_byte(size, dot=2):
     else:
         size = str(round(size / pow(1024, 3), dot)) + 'GB'
     return size
+
+
+def ordered_map(func, iterable, workers, window=None):
+    """在线程池中并发执行 func,按输入顺序返回结果
+
+    同一时刻最多提交 window 个任务,输入元素在提交前才从 iterable 中读取;迭代器被
+    提前关闭或任务出现异常时取消尚未开始的任务。
+
+    Args:
+        func (callable): 处理单个元素的函数;
+        iterable (iterable): 输入元素;
+        workers (int): 并发线程数;
+        window (int, 非必填): 同一时刻最多提交的任务数,默认 workers * 2;
+
+    Yields:
+        object: func 的返回值,顺序与输入一致;
+    """
+    workers = max(int(workers), 1)
+    if window is None:
+        window = workers * 2
+    window = max(int(window), 1)
+    futures = deque()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        try:
+            for item in iterable:
+                futures.append(executor.submit(func, item))
+                if len(futures) >= window:
+                    yield futures.popleft().result()
+            while futures:
+                yield futures.popleft().result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+class RateLimiter(object):
+    """限制多个线程合计的调用频率
+
+    每次 acquire 预约下一个调用时间点,相邻调用间隔不小于 1 / rate 秒,未到预约时
+    间时在调用线程中等待。
+
+    Args:
+        rate (float): 每秒最多调用次数;
+    """
+
+    def __init__(self, rate, clock=time.monotonic, sleep=time.sleep):
+        if rate <= 0:
+            raise ValueError('rate must be greater than 0')
+        self.interval = 1. / rate
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._next = None
+
+    def acquire(self):
+        """等待至允许下一次调用"""
+        with self._lock:
+            now = self._clock()
+            if self._next is None or self._next < now:
+                self._next = now
+            delay = self._next - now
+            self._next += self.interval
+        if delay > 0:
+            self._sleep(delay)
@@ -1,13 +1,25 @@
 #-*- coding: utf-8 -*-
 
 from bgesdk.client import OAuth2
-from six.moves.urllib.parse import parse_qsl, urlparse
+from six.moves.BaseHTTPServer import BaseHTTPRequestHandler
+from six.moves.urllib.parse import parse_qsl, unquote, urlparse
 
+import json
 import logging
 import os
 import pytest
 import requests
 import six
+import threading
+
+try:
+    from http.server import ThreadingHTTPServer
+except ImportError:
+    from six.moves.socketserver import ThreadingMixIn
+    from six.moves.BaseHTTPServer import HTTPServer
+
+    class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+        daemon_threads = True
 
 
 ENDPOINT = os.environ.get('ENDPOINT')
@@ -118,3 +130,90 @@ def self_meta_biosample_id():
 def other_biosample_id():
     """其他人的样品编号"""
     return OTHER_BIOSAMPLE_ID
+
+
+class StubServer(object):
+    """本地 HTTP 桩服务器
+
+    记录建立的 TCP 连接数与收到的请求，并按请求路径返回预设的响应，用于离线测试
+    SDK 的传输层行为。
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self.connections = 0
+        self.requests = []
+        self.lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                BaseHTTPRequestHandler.setup(self)
+                with server.lock:
+                    server.connections += 1
+
+            def log_message(self, *args):
+                pass
+
+            def _handle(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                url = urlparse(self.path)
+                path = unquote(url.path)
+                query = dict(parse_qsl(url.query, keep_blank_values=True))
+                with server.lock:
+                    server.requests.append((self.command, path, query))
+                route = server.routes.get(path)
+                if route is None:
+                    status, headers, content = 404, {}, b''
+                else:
+                    status, headers, content = route(self, query, body)
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                if self.command != 'HEAD':
+                    self.wfile.write(content)
+
+            do_GET = do_POST = do_PUT = do_HEAD = do_DELETE = _handle
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.httpd.daemon_threads = True
+        self.endpoint = 'http://127.0.0.1:{}'.format(self.httpd.server_port)
+
+    def add_json(self, path, data=None, pagination=None, code=0, msg='success'):
+        """注册返回平台标准 JSON 结构的路由"""
+        result = {'code': code, 'msg': msg, 'data': data}
+        if pagination is not None:
+            result['pagination'] = pagination
+        content = json.dumps(result).encode('utf-8')
+        headers = {'Content-Type': 'application/json'}
+        self.routes[path] = lambda handler, query, body: (
+            200, headers, content)
+
+    def add(self, path, func):
+        """注册自定义路由，func(handler, query, body) 返回
+        (status, headers, content)"""
+        self.routes[path] = func
+
+    def start(self):
+        thread = threading.Thread(target=self.httpd.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def stub_server():
+    server = StubServer()
+    server.start()
+    yield server
+    server.stop()
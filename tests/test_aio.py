@@ -0,0 +1,192 @@
+#-*- coding: utf-8 -*-
+
+from bgesdk import models
+from bgesdk.aio import AsyncAPI, AsyncOAuth2, _aiter_numbered_pages
+from bgesdk.error import APIError, BGEError
+
+import asyncio
+import json
+import pytest
+import socket
+import time
+
+pytest.importorskip('aiohttp')
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+class TestAsyncAPI:
+
+    def test_concurrent_calls(self, stub_server):
+        """并发调用共享连接池"""
+        stub_server.add_json('/profile', {'name': 'Tom'})
+
+        async def main():
+            async with AsyncAPI(
+                    'demo', endpoint=stub_server.endpoint,
+                    pool_maxsize=8) as api:
+                return await asyncio.gather(
+                    *[api.get_user() for _ in range(50)])
+
+        results = run(main())
+        assert len(results) == 50
+        assert all(isinstance(r, models.Model) for r in results)
+        assert results[0].name == 'Tom'
+        assert stub_server.connections <= 8
+
+    def test_api_error(self, stub_server):
+        stub_server.add_json('/profile', code=41001, msg=u'参数错误')
+
+        async def main():
+            async with AsyncAPI('demo', endpoint=stub_server.endpoint) as api:
+                await api.get_user()
+
+        with pytest.raises(APIError) as e:
+            run(main())
+        assert e.value.code == 41001
+        assert e.value.msg == u'参数错误'
+
+    def test_timeout(self, stub_server):
+        """请求超时重试后仍失败时抛出 BGEError"""
+        def route(handler, query, body):
+            time.sleep(1.5)
+            return 200, {'Content-Type': 'application/json'}, b'{}'
+        stub_server.add('/profile', route)
+
+        async def main():
+            async with AsyncAPI(
+                    'demo', endpoint=stub_server.endpoint, timeout=1,
+                    max_retries=1) as api:
+                await api.get_user()
+
+        with pytest.raises(BGEError):
+            run(main())
+        assert len(stub_server.requests) == 2
+
+    def test_server_disconnected(self, stub_server):
+        """服务端中断连接时重试,重试后仍失败时抛出 BGEError"""
+        def route(handler, query, body):
+            handler.close_connection = True
+            handler.connection.shutdown(socket.SHUT_RDWR)
+            return 200, {}, b''
+        stub_server.add('/profile', route)
+
+        async def main(max_retries):
+            async with AsyncAPI(
+                    'demo', endpoint=stub_server.endpoint,
+                    max_retries=max_retries) as api:
+                await api.get_user()
+
+        # aiohttp 自身可能对幂等请求重试,以不重试时的请求次数为基准
+        with pytest.raises(BGEError) as e:
+            run(main(0))
+        assert 'ServerDisconnectedError' in str(e.value)
+        attempts = len(stub_server.requests)
+        del stub_server.requests[:]
+        with pytest.raises(BGEError):
+            run(main(2))
+        assert len(stub_server.requests) == attempts * 3
+
+    def test_pagination(self, stub_server):
+        """类群丰度分页数据与同步客户端一致"""
+        stub_server.add_json(
+            '/microbiome/taxon_abundance', [{'taxon_id': 't1'}],
+            pagination={'count': 1, 'page': 1})
+
+        async def main():
+            async with AsyncAPI('demo', endpoint=stub_server.endpoint) as api:
+                return await api.get_taxon_abundance('e-b1')
+
+        ret = run(main())
+        assert ret.json() == {
+            'count': 1,
+            'next_page': 2,
+            'result': [{'taxon_id': 't1'}]
+        }
+        method, path, query = stub_server.requests[0]
+        assert query == {
+            'biosample_id': 'E-B1',
+            'limit': '50',
+            'page': '1'
+        }
+
+    def test_oauth2(self, stub_server):
+        stub_server.add_json('/oauth2/access_token', {'access_token': 'x'})
+
+        async def main():
+            async with AsyncOAuth2(
+                    'demo', 'demo', endpoint=stub_server.endpoint) as oauth2:
+                token = await oauth2.get_credentials_token()
+                return token, oauth2.get_api(token.access_token)
+
+        token, api = run(main())
+        assert isinstance(token, models.ClientCredentialsToken)
+        assert isinstance(api, AsyncAPI)
+        assert token.access_token == 'x'
+
+    def test_iter_samples(self, stub_server):
+        stub_server.add_json('/samples', {
+            'count': 2, 'next_page': None, 'result': [{'id': 1}, {'id': 2}]
+        })
+
+        async def main():
+            async with AsyncAPI('demo', endpoint=stub_server.endpoint) as api:
+                return [item async for item in api.iter_samples(read_ahead=2)]
+
+        assert run(main()) == [{'id': 1}, {'id': 2}]
+
+    def test_iter_samples_workers(self, stub_server):
+        def route(handler, query, body):
+            page = int(query['page'])
+            data = {
+                'count': 30,
+                'next_page': page + 1 if page < 3 else None,
+                'result': [{'id': page * 10 + i} for i in range(10)]
+            }
+            content = json.dumps({'code': 0, 'msg': 'success', 'data': data})
+            return 200, {'Content-Type': 'application/json'}, content.encode()
+        stub_server.add('/samples', route)
+
+        async def main():
+            async with AsyncAPI('demo', endpoint=stub_server.endpoint) as api:
+                return [
+                    item['id'] async for item in api.iter_samples(workers=3)
+                ]
+
+        assert run(main()) == list(range(10, 40))
+
+    def test_numbered_pages_window(self):
+        """与 ordered_map 一致,最多预先获取 workers * 2 页"""
+        started = []
+
+        async def fetch(page):
+            started.append(page)
+            await asyncio.sleep(0)
+            return models.Model({
+                'count': 1000,
+                'next_page': page + 1,
+                'result': [{'id': page}] * 10
+            })
+
+        async def main():
+            pages = _aiter_numbered_pages(fetch, workers=2, limit=10)
+            received = []
+            async for page in pages:
+                received.append(page['result'][0]['id'])
+                # 消费较慢时不会继续创建新的请求
+                await asyncio.sleep(0.01)
+                assert len(started) <= len(received) + 2 * 2
+                if len(received) == 10:
+                    break
+            await pages.aclose()
+            await asyncio.sleep(0.01)
+            return received
+
+        assert run(main()) == list(range(1, 11))
+        assert len(started) <= 10 + 2 * 2
@@ -0,0 +1,126 @@
+#-*- coding: utf-8 -*-
+
+from bgesdk.__main__ import init_parser
+from bgesdk.management import registry
+
+import os
+import subprocess
+import sys
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# 进程退出时输出已导入的全部模块名
+SCRIPT = """
+import atexit, runpy, sys
+atexit.register(lambda: sys.stderr.write('\\n'.join(sys.modules)))
+sys.argv = ['bge'] + sys.argv[1:]
+runpy.run_module('bgesdk', run_name='__main__', alter_sys=True)
+"""
+
+
+def imported_modules(*argv):
+    """运行 bge 命令,返回进程中已导入的模块名集合"""
+    ret = subprocess.run(
+        [sys.executable, '-c', SCRIPT] + list(argv),
+        cwd=ROOT,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        universal_newlines=True
+    )
+    return set(ret.stderr.splitlines())
+
+
+# 在已导入各子命令共同依赖(bgesdk、requests、rich 等)的进程中执行语句,输出耗时
+TIMING_SCRIPT = """
+import json, sys, time
+import bgesdk.management.utils
+start = time.perf_counter()
+exec(sys.argv[1])
+sys.stdout.write(json.dumps(time.perf_counter() - start))
+"""
+
+# 导入全部子命令模块,即按需导入之前构建参数解析器时的导入开销
+IMPORT_ALL = """
+from bgesdk.management import registry
+registry.build_index(registry.COMMANDS_PACKAGE)
+registry.build_index(registry.API_COMMANDS_PACKAGE)
+"""
+
+# 构建参数解析器的耗时上限,为导入全部子命令模块耗时的比例
+IMPORT_TIME_BUDGET = 0.3
+
+
+def import_time(statement, repeat=3):
+    """在新的解释器进程中多次执行语句,返回耗时的最小值(秒)"""
+    timings = []
+    for _ in range(repeat):
+        output = subprocess.check_output(
+            [sys.executable, '-c', TIMING_SCRIPT, statement], cwd=ROOT)
+        timings.append(float(output))
+    return min(timings)
+
+
+class TestRegistry:
+
+    def test_index_up_to_date(self):
+        """索引需与子命令模块保持一致,更新方法见 registry 模块说明"""
+        assert sorted(registry.build_index(registry.COMMANDS_PACKAGE)) == \
+            sorted(registry.COMMANDS)
+        assert sorted(registry.build_index(
+            registry.API_COMMANDS_PACKAGE)) == sorted(registry.API_COMMANDS)
+
+    def test_index_format(self):
+        """索引源码与 python -m bgesdk.management.registry 的输出一致"""
+        with open(registry.__file__, encoding='utf-8') as fp:
+            source = fp.read()
+        for name in ('COMMANDS', 'API_COMMANDS'):
+            text = registry.format_index(name, getattr(registry, name))
+            assert text in source
+            assert max(len(line) for line in text.splitlines()) <= 79
+
+    def test_split_text(self):
+        assert registry.split_text('abc def', 5) == ['abc ', 'def']
+        assert registry.split_text('甲乙，丙丁戊', 4) == ['甲乙，', '丙丁戊']
+        assert registry.split_text('abcdefg', 3) == ['abc', 'def', 'g']
+
+    def test_parse_selected(self):
+        argv = ['api', 'download', 'dest/data.bin', '-w', '2']
+        args = init_parser(argv).parse_args(argv)
+        assert args.command == 'api'
+        assert args.subcommand == 'download'
+        assert args.object_name == 'dest/data.bin'
+        assert args.workers == 2
+
+    def test_selected_command(self):
+        names = ['api', 'token']
+        assert registry.selected_command(['-V'], names) is None
+        assert registry.selected_command(['token', 'api'], names) == 'token'
+        assert registry.selected_command(['unknown'], names) is None
+
+
+class TestLazyImport:
+
+    def test_token(self):
+        modules = imported_modules('token', '-h')
+        assert 'bgesdk.management.commands.token' in modules
+        for name in ['docker', 'python_minifier', 'qprompt', 'oss2',
+                     'bgesdk.management.commands.model',
+                     'bgesdk.management.commands.api']:
+            assert name not in modules
+
+    def test_import_time(self):
+        """构建参数解析器时仅导入选中的子命令,耗时不超过导入全部子命令的 30%"""
+        budget = import_time(IMPORT_ALL) * IMPORT_TIME_BUDGET
+        for argv in (['token', '-h'], ['api', 'get_user', '-h']):
+            statement = (
+                'from bgesdk.__main__ import init_parser\n'
+                'init_parser({!r})'.format(argv))
+            assert import_time(statement) <= budget
+
+    def test_api_subcommand(self):
+        modules = imported_modules('api', 'get_user', '-h')
+        assert 'bgesdk.management.commands.api.commands.get_user' in modules
+        assert 'bgesdk.management.commands.api.commands.upload' not in modules
+        assert 'docker' not in modules
@@ -0,0 +1,103 @@
+#-*- coding: utf-8 -*-
+
+from bgesdk import codec, models
+from bgesdk.client import API
+from bgesdk.error import BGEError
+
+import json
+import math
+import pytest
+
+
+DATA = {
+    'name': u'中文',
+    'children': [{'age': 1.5, 'tags': []}, None, True],
+    'detail': {},
+    'text': 'a\nb "c"'
+}
+
+
+@pytest.fixture
+def restore_codec():
+    current = codec.get_codec()
+    yield
+    codec.set_codec(current)
+
+
+class TestCodec:
+
+    @pytest.mark.parametrize('name', ['json', 'orjson'])
+    def test_loads(self, restore_codec, name):
+        if name == 'orjson':
+            pytest.importorskip('orjson')
+        codec.set_codec(name)
+        content = json.dumps(DATA).encode('utf-8')
+        assert codec.loads(content) == DATA
+        assert codec.loads(content.decode('utf-8')) == DATA
+
+    @pytest.mark.parametrize('indent', [2, 4])
+    @pytest.mark.parametrize('sort_keys', [True, False])
+    def test_orjson_indent(self, indent, sort_keys):
+        pytest.importorskip('orjson')
+        model = models.Model(DATA)
+        expected = json.dumps(
+            model, indent=indent, sort_keys=sort_keys, ensure_ascii=False,
+            cls=models.ModelEncoder)
+        assert codec.OrjsonCodec(exact=False).dumps(
+            model, indent=indent, sort_keys=sort_keys,
+            cls=models.ModelEncoder) == expected
+
+    def test_orjson_fallback(self):
+        pytest.importorskip('orjson')
+        orjson_codec = codec.OrjsonCodec(exact=False)
+        assert orjson_codec.dumps(DATA, ensure_ascii=True) == json.dumps(DATA)
+        assert orjson_codec.dumps({'n': 2 ** 70}) == '{"n": %d}' % 2 ** 70
+        assert orjson_codec.dumps(
+            DATA, separators=(',', ':')) == json.dumps(
+                DATA, separators=(',', ':'), ensure_ascii=False)
+        with pytest.raises(TypeError):
+            orjson_codec.dumps({'x': object()})
+
+    @pytest.mark.parametrize('indent', [None, 4])
+    def test_orjson_exact(self, restore_codec, indent):
+        """安装 orjson 不改变序列化结果"""
+        pytest.importorskip('orjson')
+        codec.set_codec('orjson')
+        data = dict(DATA, floats=[1e16, 1e-7, float('nan')])
+        model = models.Model(data)
+        assert model.dumps(indent=indent) == json.dumps(
+            data, indent=indent, ensure_ascii=False)
+        assert models.ListModel([data]).dumps() == json.dumps(
+            [data], ensure_ascii=False)
+
+    def test_orjson_loads_fallback(self):
+        """orjson 无法解析的整数与 NaN 回退到标准库 json"""
+        pytest.importorskip('orjson')
+        orjson_codec = codec.OrjsonCodec()
+        assert orjson_codec.loads(b'{"n": %d}' % 2 ** 70) == {'n': 2 ** 70}
+        assert math.isnan(orjson_codec.loads(b'[NaN]')[0])
+        with pytest.raises(ValueError):
+            orjson_codec.loads(b'{invalid')
+
+    def test_set_codec(self, restore_codec):
+        with pytest.raises(BGEError):
+            codec.set_codec('unknown')
+        codec.set_codec('json')
+        assert codec.get_codec().name == 'json'
+
+    def test_client(self, restore_codec, stub_server):
+        """客户端使用当前编解码器解析接口返回值"""
+        contents = []
+
+        class RecordCodec(codec.StdlibCodec):
+
+            def loads(self, content):
+                contents.append(content)
+                return codec.StdlibCodec.loads(self, content)
+
+        codec.set_codec(RecordCodec())
+        stub_server.add_json('/profile', {'name': 'Tom'})
+        api = API('demo', endpoint=stub_server.endpoint)
+        assert api.get_user().name == 'Tom'
+        assert len(contents) == 1
+        assert isinstance(contents[0], bytes)
@@ -0,0 +1,132 @@
+#-*- coding: utf-8 -*-
+
+from bgesdk.client import API
+from bgesdk.credentials import STSCredentialsProvider, parse_expiration
+from bgesdk.fs import FileItem
+from bgesdk.models import Model
+
+import json
+import time
+
+
+def new_token(n, expiration=None):
+    credentials = {
+        'access_key_id': 'id%d' % n,
+        'access_key_secret': 'secret%d' % n,
+        'security_token': 'token%d' % n
+    }
+    if expiration is not None:
+        credentials['expiration'] = expiration
+    return Model({'credentials': credentials})
+
+
+class Fetcher(object):
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return new_token(self.calls, time.time() + self.ttl)
+
+
+class TestParseExpiration:
+
+    def test_formats(self):
+        assert parse_expiration('1970-01-02T00:00:00Z') == 86400
+        assert parse_expiration('1970-01-02T00:00:00.500Z') == 86400.5
+        assert parse_expiration(86400) == 86400
+        assert parse_expiration('86400') == 86400
+        assert parse_expiration('tomorrow') is None
+        assert parse_expiration(None) is None
+
+
+class TestSTSCredentialsProvider:
+
+    def test_valid(self):
+        fetch = Fetcher(3600)
+        provider = STSCredentialsProvider(fetch)
+        for _ in range(3):
+            assert provider.get_credentials().get_security_token() == 'token1'
+        assert fetch.calls == 1
+        # 提前刷新时间不超过有效期的四分之一
+        assert provider.expires_at - provider.refresh_at == 300
+
+    def test_background_refresh(self):
+        fetch = Fetcher(3600)
+        provider = STSCredentialsProvider(fetch)
+        provider.refresh_at = time.time() - 1
+        # 临近过期时在后台获取新凭证
+        assert provider.get_credentials().get_security_token() in (
+            'token1', 'token2')
+        for _ in range(50):
+            if provider.get_credentials().get_security_token() == 'token2':
+                break
+            time.sleep(0.01)
+        assert provider.get_credentials().get_security_token() == 'token2'
+        assert fetch.calls == 2
+
+    def test_expired(self):
+        fetch = Fetcher(3600)
+        provider = STSCredentialsProvider(fetch)
+        provider.expires_at = time.time() - 1
+        assert provider.get_credentials().get_security_token() == 'token2'
+
+    def test_background_failure(self):
+        fetch = Fetcher(3600)
+        provider = STSCredentialsProvider(fetch)
+
+        def fail():
+            raise IOError('unavailable')
+        provider.fetch = fail
+        provider.refresh_at = time.time() - 1
+        assert provider.get_credentials().get_security_token() == 'token1'
+        for _ in range(50):
+            if provider._refreshing is None:
+                break
+            time.sleep(0.01)
+        # 失败后稍后重试,不会在每次签名时重新获取
+        assert provider.refresh_at > time.time()
+
+
+class TestUploadRefresh:
+
+    def test_batch_upload_refresh(self, stub_server):
+        """批量上传过程中凭证过期时使用刷新后的凭证"""
+        calls = []
+
+        def sts(handler, query, body):
+            calls.append(1)
+            data = {
+                'bucket': 'bucket',
+                'endpoint': stub_server.endpoint,
+                'destination': 'dest',
+                'region_id': 'oss-cn-shenzhen',
+                'credentials': {
+                    'access_key_id': 'id',
+                    'access_key_secret': 'secret',
+                    'security_token': 'token%d' % len(calls),
+                    # 首个凭证已过期
+                    'expiration': time.time() + (len(calls) - 1) * 3600
+                }
+            }
+            content = json.dumps({'code': 0, 'msg': 'success', 'data': data})
+            return 200, {'Content-Type': 'application/json'}, content.encode()
+        stub_server.add('/sts/token', sts)
+        stub_server.add_json('/oauth2/introspect', {
+            'active': True, 'client_id': 'client'
+        })
+        tokens = []
+
+        def put(handler, query, body):
+            tokens.append(handler.headers['x-oss-security-token'])
+            return 200, {'ETag': '"etag"', 'x-oss-request-id': 'r'}, b''
+        for i in range(3):
+            stub_server.add('/bucket/dest/f%d.txt' % i, put)
+        api = API('demo', endpoint=stub_server.endpoint)
+        results = api.batch_upload(
+            [FileItem('f%d.txt' % i, b'data') for i in range(3)])
+        assert results == ['dest/f%d.txt' % i for i in range(3)]
+        assert len(calls) == 2
+        assert tokens == ['token2'] * 3
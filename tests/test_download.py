@@ -0,0 +1,343 @@
+#-*- coding: utf-8 -*-
+
+from bgesdk.client import API, _DownloadURL
+from bgesdk.error import BGEError
+from collections import OrderedDict
+from functools import partial
+from six.moves.urllib.parse import parse_qs
+
+import io
+import json
+import os
+import pytest
+import re
+import threading
+import time
+
+
+CONTENT = os.urandom(300 * 1024 + 123)
+
+
+def add_object(stub_server, content=CONTENT, ranges=True, status=200):
+    """注册支持(或不支持) HTTP Range 的下载地址"""
+    url = stub_server.endpoint + '/objects/data.bin'
+    stub_server.add_json('/oss/sign_url', {'url': url})
+
+    def route(handler, query, body):
+        if status != 200:
+            return status, {}, b''
+        headers = {'Content-Type': 'application/octet-stream'}
+        value = handler.headers.get('Range')
+        if not ranges:
+            return 200, headers, content
+        headers['Accept-Ranges'] = 'bytes'
+        if value is None:
+            return 200, headers, content
+        first, last = re.match(r'bytes=(\d+)-(\d*)', value).groups()
+        first = int(first)
+        last = int(last) if last else len(content) - 1
+        headers['Content-Range'] = 'bytes %d-%d/%d' % (
+            first, last, len(content))
+        return 206, headers, content[first:last + 1]
+    stub_server.add('/objects/data.bin', route)
+
+
+def range_requests(stub_server):
+    return [
+        r for r in stub_server.requests
+        if r[1] == '/objects/data.bin'
+    ]
+
+
+class TestDownload:
+
+    def test_ranged(self, stub_server, tmpdir):
+        add_object(stub_server)
+        api = API('demo', endpoint=stub_server.endpoint)
+        path = str(tmpdir.join('data.bin'))
+        with open(path, 'wb') as fp:
+            api.download(
+                'dest/data.bin', fp, workers=4, part_size=64 * 1024,
+                chunk_size=16 * 1024)
+            assert fp.tell() == len(CONTENT)
+        with open(path, 'rb') as fp:
+            assert fp.read() == CONTENT
+        # 首个区间复用首次请求,其余 4 个区间使用 Range 请求
+        assert len(range_requests(stub_server)) == 5
+
+    def test_append(self, stub_server, tmpdir):
+        """写入位置从文件对象的当前位置开始"""
+        add_object(stub_server)
+        api = API('demo', endpoint=stub_server.endpoint)
+        path = str(tmpdir.join('data.bin'))
+        with open(path, 'wb') as fp:
+            fp.write(b'header')
+            api.download('dest/data.bin', fp, part_size=64 * 1024)
+            fp.write(b'footer')
+        with open(path, 'rb') as fp:
+            assert fp.read() == b'header' + CONTENT + b'footer'
+
+    def test_append_mode(self, stub_server, tmpdir):
+        """追加模式打开的文件无法按位置写入,顺序下载"""
+        add_object(stub_server)
+        api = API('demo', endpoint=stub_server.endpoint)
+        path = str(tmpdir.join('data.bin'))
+        with open(path, 'wb') as fp:
+            fp.write(b'header')
+        with open(path, 'ab') as fp:
+            api.download(
+                'dest/data.bin', fp, workers=4, part_size=64 * 1024,
+                chunk_size=16 * 1024)
+        with open(path, 'rb') as fp:
+            assert fp.read() == b'header' + CONTENT
+        assert len(range_requests(stub_server)) == 1
+
+    def test_no_accept_ranges(self, stub_server, tmpdir):
+        add_object(stub_server, ranges=False)
+        api = API('demo', endpoint=stub_server.endpoint)
+        path = str(tmpdir.join('data.bin'))
+        with open(path, 'wb') as fp:
+            api.download('dest/data.bin', fp, part_size=64 * 1024)
+        with open(path, 'rb') as fp:
+            assert fp.read() == CONTENT
+        assert len(range_requests(stub_server)) == 1
+
+    def test_file_like(self, stub_server):
+        """支持 seek 的文件对象同样可以并发下载"""
+        add_object(stub_server)
+        api = API('demo', endpoint=stub_server.endpoint)
+        fp = io.BytesIO()
+        api.download(
+            'dest/data.bin', fp, part_size=64 * 1024, chunk_size=16 * 1024)
+        assert fp.getvalue() == CONTENT
+        assert len(range_requests(stub_server)) == 5
+
+    def test_not_seekable(self, stub_server):
+        add_object(stub_server)
+        api = API('demo', endpoint=stub_server.endpoint)
+        chunks = []
+
+        class Writer(object):
+
+            def write(self, data):
+                chunks.append(data)
+
+        api.download(
+            'dest/data.bin', Writer(), part_size=64 * 1024,
+            chunk_size=16 * 1024)
+        assert b''.join(chunks) == CONTENT
+        assert len(range_requests(stub_server)) == 1
+
+    def test_http_error(self, stub_server):
+        add_object(stub_server, status=403)
+        api = API('demo', endpoint=stub_server.endpoint)
+        with pytest.raises(BGEError):
+            api.download('dest/data.bin', io.BytesIO())
+
+
+class FlakyObject(object):
+    """可控制失败区间与签名过期的下载地址"""
+
+    def __init__(self, stub_server, content=CONTENT):
+        self.content = content
+        self.signature = 0
+        self.valid = set()
+        self.fail_offsets = set()
+        self.ranges = []
+        stub_server.add('/oss/sign_url', self.sign)
+        stub_server.add('/objects/data.bin', self.get)
+        self.endpoint = stub_server.endpoint
+
+    def sign(self, handler, query, body):
+        self.signature += 1
+        self.valid = {str(self.signature)}
+        url = '%s/objects/data.bin?sig=%d' % (self.endpoint, self.signature)
+        content = json.dumps({
+            'code': 0, 'msg': 'success', 'data': {'url': url}
+        }).encode('utf-8')
+        return 200, {'Content-Type': 'application/json'}, content
+
+    def get(self, handler, query, body):
+        if query.get('sig') not in self.valid:
+            return 403, {}, b''
+        first, last = [int(v) for v in re.match(
+            r'bytes=(\d+)-(\d+)', handler.headers['Range']).groups()]
+        self.ranges.append((first, last))
+        if first in self.fail_offsets:
+            return 500, {}, b''
+        headers = {
+            'Accept-Ranges': 'bytes',
+            'ETag': '"etag"',
+            'Content-Range': 'bytes %d-%d/%d' % (
+                first, last, len(self.content))
+        }
+        return 206, headers, self.content[first:last + 1]
+
+
+class TestDownloadFile:
+
+    def test_download(self, stub_server, tmpdir):
+        obj = FlakyObject(stub_server)
+        api = API('demo', endpoint=stub_server.endpoint)
+        path = str(tmpdir.join('data.bin'))
+        assert api.download_file(
+            'dest/data.bin', path, part_size=64 * 1024) == path
+        with open(path, 'rb') as fp:
+            assert fp.read() == CONTENT
+        assert sorted(os.listdir(str(tmpdir))) == ['data.bin']
+        # 1 个探测请求 + 5 个区间
+        assert len(obj.ranges) == 6
+
+    def test_resume(self, stub_server, tmpdir):
+        obj = FlakyObject(stub_server)
+        obj.fail_offsets = {128 * 1024}
+        api = API('demo', endpoint=stub_server.endpoint)
+        path = str(tmpdir.join('data.bin'))
+        with pytest.raises(BGEError) as e:
+            api.download_file('dest/data.bin', path, part_size=64 * 1024)
+        assert 'resume' in str(e.value)
+        assert not os.path.exists(path)
+        assert os.path.exists(path + '.bgedownload')
+        assert os.path.exists(path + '.bgepart')
+        obj.fail_offsets = set()
+        obj.ranges = []
+        api.download_file('dest/data.bin', path, part_size=64 * 1024)
+        with open(path, 'rb') as fp:
+            assert fp.read() == CONTENT
+        # 重新签名后仅下载失败的区间
+        assert obj.signature == 2
+        assert obj.ranges == [(0, 0), (128 * 1024, 192 * 1024 - 1)]
+        assert not os.path.exists(path + '.bgedownload')
+
+    def test_changed_object(self, stub_server, tmpdir):
+        """对象发生变化时重新下载"""
+        obj = FlakyObject(stub_server)
+        obj.fail_offsets = {0}
+        api = API('demo', endpoint=stub_server.endpoint)
+        path = str(tmpdir.join('data.bin'))
+        with pytest.raises(BGEError):
+            api.download_file('dest/data.bin', path, part_size=64 * 1024)
+        obj.fail_offsets = set()
+        obj.content = CONTENT[:100 * 1024]
+        api.download_file('dest/data.bin', path, part_size=64 * 1024)
+        with open(path, 'rb') as fp:
+            assert fp.read() == CONTENT[:100 * 1024]
+
+    def test_url_expired(self, stub_server, tmpdir):
+        """下载过程中地址过期时重新签名"""
+        obj = FlakyObject(stub_server)
+        api = API('demo', endpoint=stub_server.endpoint)
+        path = str(tmpdir.join('data.bin'))
+        original = obj.get
+
+        def expire_after_probe(handler, query, body):
+            ret = original(handler, query, body)
+            if handler.headers['Range'] == 'bytes=0-0':
+                obj.valid = set()
+            return ret
+        stub_server.add('/objects/data.bin', expire_after_probe)
+        api.download_file(
+            'dest/data.bin', path, part_size=64 * 1024, workers=2)
+        with open(path, 'rb') as fp:
+            assert fp.read() == CONTENT
+        assert obj.signature == 2
+
+
+class ObjectStore(object):
+    """按 object_name 签名并提供 HTTP Range 下载的多个对象"""
+
+    def __init__(self, stub_server, objects):
+        self.objects = objects
+        self.signed = []
+        stub_server.add('/oss/sign_url', self.sign)
+        for i, name in enumerate(objects):
+            stub_server.add('/objects/%d' % i, partial(self.get, name))
+        self.endpoint = stub_server.endpoint
+
+    def sign(self, handler, query, body):
+        name = parse_qs(body.decode('utf-8'))['object_name'][0]
+        self.signed.append(name)
+        if name not in self.objects:
+            content = {'code': 404, 'msg': 'object not found', 'data': None}
+        else:
+            url = '%s/objects/%d' % (
+                self.endpoint, list(self.objects).index(name))
+            content = {'code': 0, 'msg': 'success', 'data': {'url': url}}
+        return 200, {'Content-Type': 'application/json'}, json.dumps(
+            content).encode('utf-8')
+
+    def get(self, name, handler, query, body):
+        content = self.objects[name]
+        first, last = [int(v) for v in re.match(
+            r'bytes=(\d+)-(\d+)', handler.headers['Range']).groups()]
+        last = min(last, len(content) - 1)
+        headers = {
+            'Accept-Ranges': 'bytes',
+            'Content-Range': 'bytes %d-%d/%d' % (first, last, len(content))
+        }
+        return 206, headers, content[first:last + 1]
+
+
+class TestDownloadMany:
+
+    def test_download_many(self, stub_server, tmpdir):
+        objects = OrderedDict(
+            ('dest/%d/file%d.bin' % (i, i), os.urandom(1000 * (i + 1)))
+            for i in range(6))
+        store = ObjectStore(stub_server, objects)
+        api = API('demo', endpoint=stub_server.endpoint)
+        names = list(objects) + ['dest/missing.bin']
+        ret = api.download_many(
+            names, str(tmpdir), workers=3, keep_dirs=True)
+        assert [r.object_name for r in ret] == names
+        for r in ret[:-1]:
+            assert r.error is None
+            assert r.size == len(objects[r.object_name])
+            with open(r.filepath, 'rb') as fp:
+                assert fp.read() == objects[r.object_name]
+        assert ret[-1].filepath is None
+        assert 'object not found' in ret[-1].error
+        # 每个对象仅签名一次
+        assert sorted(store.signed) == sorted(names)
+
+    def test_sign_ahead(self, stub_server, tmpdir):
+        """正在下载的文件之外最多提前获取 sign_ahead 个文件的下载地址"""
+        objects = OrderedDict(
+            ('dest/file%d.bin' % i, os.urandom(100)) for i in range(10))
+        store = ObjectStore(stub_server, objects)
+        release = threading.Event()
+        for i, name in enumerate(objects):
+            def get(handler, query, body, name=name):
+                release.wait(10)
+                return store.get(name, handler, query, body)
+            stub_server.add('/objects/%d' % i, get)
+        api = API('demo', endpoint=stub_server.endpoint)
+        results = []
+        thread = threading.Thread(target=lambda: results.extend(
+            api.download_many(
+                list(objects), str(tmpdir), workers=2, sign_ahead=1)))
+        thread.start()
+        try:
+            time.sleep(0.3)
+            assert len(store.signed) == 2 + 1
+        finally:
+            release.set()
+            thread.join(10)
+        assert [r.error for r in results] == [None] * len(objects)
+        assert sorted(store.signed) == sorted(objects)
+
+    def test_duplicate_filenames(self, stub_server, tmpdir):
+        api = API('demo', endpoint=stub_server.endpoint)
+        with pytest.raises(BGEError):
+            api.download_many(['a/data.bin', 'b/data.bin'], str(tmpdir))
+
+    def test_resign_before_expired(self, stub_server, tmpdir):
+        """地址剩余有效期不足时使用前重新签名"""
+        store = ObjectStore(stub_server, {'dest/data.bin': CONTENT})
+        api = API('demo', endpoint=stub_server.endpoint)
+        url = _DownloadURL(api, 'dest/data.bin', expiration_time=600)
+        assert url.url == url.url
+        assert len(store.signed) == 1
+        url.expires_at = time.time() + url.margin
+        url.url
+        assert len(store.signed) == 2
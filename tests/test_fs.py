@@ -1,7 +1,8 @@
 #-*- coding: utf-8 -*-
 
-from bgesdk.fs import FileItem
+from bgesdk.fs import FileItem, iter_files
 
+import os
 import pytest
 
 
@@ -9,4 +10,35 @@ class TestFS:
 
     def test_file_item(self):
         inst = FileItem('hello.txt', 'Hello world')
-        assert isinstance(inst, FileItem)
\ No newline at end of file
+        assert isinstance(inst, FileItem)
+
+
+class TestIterFiles:
+
+    @pytest.fixture
+    def tree(self, tmpdir):
+        for path in ['a.fq', 'b.txt', 'sub/c.fq', 'sub/deep/d.fq',
+                     'logs/e.fq', 'logs/f.txt']:
+            tmpdir.join(path).write('x', ensure=True)
+        tmpdir.join('link.fq').mksymlinkto(tmpdir.join('a.fq'))
+        return str(tmpdir)
+
+    def test_flat(self, tree):
+        assert [rel for rel, _ in iter_files(tree)] == ['a.fq', 'b.txt']
+
+    def test_recursive(self, tree):
+        files = list(iter_files(tree, recursive=True))
+        assert [rel for rel, _ in files] == [
+            'a.fq', 'b.txt', 'logs/e.fq', 'logs/f.txt', 'sub/c.fq',
+            'sub/deep/d.fq'
+        ]
+        assert files[-1][1] == os.path.join(tree, 'sub', 'deep', 'd.fq')
+
+    def test_filters(self, tree):
+        files = iter_files(
+            tree, recursive=True, include=['*.fq'], exclude=['logs'])
+        assert [rel for rel, _ in files] == [
+            'a.fq', 'sub/c.fq', 'sub/deep/d.fq'
+        ]
+        files = iter_files(tree, recursive=True, exclude=['sub/*', '*.txt'])
+        assert [rel for rel, _ in files] == ['a.fq', 'logs/e.fq']
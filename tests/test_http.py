@@ -0,0 +1,52 @@
+#-*- coding: utf-8 -*-
+
+from bgesdk.client import API, OAuth2
+from bgesdk.error import APIError
+from bgesdk.http import HTTPRequest
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+
+class TestHTTPRequest:
+
+    def test_reuse_connection(self, stub_server):
+        """同一实例的多次接口调用复用同一个 TCP 连接"""
+        stub_server.add_json('/profile', {'name': 'Tom'})
+        api = API('demo', endpoint=stub_server.endpoint)
+        for _ in range(20):
+            assert api.get_user().name == 'Tom'
+        assert stub_server.connections == 1
+        api.close()
+
+    def test_no_keep_alive(self, stub_server):
+        """关闭长连接后每次调用都会重新建立连接"""
+        stub_server.add_json('/profile', {'name': 'Tom'})
+        api = API('demo', endpoint=stub_server.endpoint, keep_alive=False)
+        for _ in range(3):
+            api.get_user()
+        assert stub_server.connections == 3
+
+    def test_pool_maxsize(self, stub_server):
+        """多线程共享连接池，连接数不超过连接池大小"""
+        stub_server.add_json('/profile', {'name': 'Tom'})
+        api = API('demo', endpoint=stub_server.endpoint, pool_maxsize=4)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(lambda _: api.get_user(), range(40)))
+        assert len(results) == 40
+        assert stub_server.connections <= 4
+
+    def test_oauth2_shares_pool_settings(self, stub_server):
+        oauth2 = OAuth2(
+            'demo', 'demo', endpoint=stub_server.endpoint, pool_maxsize=2,
+            keep_alive=False)
+        api = oauth2.get_api('demo')
+        assert api.pool_maxsize == 2
+        assert api.keep_alive is False
+
+    def test_api_error(self, stub_server):
+        stub_server.add_json('/profile', code=41001, msg=u'参数错误')
+        request = HTTPRequest(stub_server.endpoint)
+        with pytest.raises(APIError) as e:
+            request.get('/profile')
+        assert e.value.code == 41001
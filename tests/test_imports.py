@@ -0,0 +1,26 @@
+#-*- coding: utf-8 -*-
+
+import subprocess
+import sys
+
+
+def imported_modules(statement):
+    """在新的解释器进程中执行导入语句,返回已导入的顶层包名集合"""
+    script = '\n'.join([
+        statement,
+        'import sys',
+        "sys.stdout.write('\\n'.join(m.split('.')[0] for m in sys.modules))",
+    ])
+    output = subprocess.check_output([sys.executable, '-c', script])
+    return set(output.decode('utf-8').splitlines())
+
+
+class TestLazyImport:
+
+    def test_api(self):
+        modules = imported_modules('from bgesdk import API')
+        assert 'bgesdk' in modules
+        for name in ['oss2', 'aliyunsdkcore', 'requests_toolbelt',
+                     'asyncio', 'aiohttp']:
+            assert name not in modules
+
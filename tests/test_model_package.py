@@ -0,0 +1,497 @@
+#-*- coding: utf-8 -*-
+
+from bgesdk.management import build_cache
+from bgesdk.management.build_cache import BuildCache
+from bgesdk.management.commands import model
+from bgesdk.management.commands.model import Command
+from bgesdk.management.utils import PatternMatcher
+from bgesdk.utils import RateLimiter
+
+import argparse
+import csv
+import fnmatch
+import io
+import json
+import os
+import pytest
+import shutil
+import threading
+import time
+import zipfile
+
+
+PATHS = [
+    'main.py', 'README.md', 'lib/a.py', 'lib/a.pyc', 'lib/sub/b.py',
+    '.bge/task_id', '.bge/tmp/model.zip', 'data/ref.bin', 'data/keep.txt',
+]
+
+
+def sequential(patterns, paths):
+    """.bgeignore 规则原有的逐条过滤实现"""
+    selected = set()
+    for pattern in patterns:
+        if pattern.startswith('!'):
+            selected -= set(fnmatch.filter(selected, pattern[1:]))
+            continue
+        selected.update(fnmatch.filter(paths, pattern))
+    return selected
+
+
+# 当前进程中计算摘要的文件,进程池中计算的不会记录在此
+HASHED = []
+
+
+def recording_sha256(filepath):
+    HASHED.append(filepath)
+    return FILE_SHA256(filepath)
+
+
+FILE_SHA256 = build_cache.file_sha256
+
+
+def write_files(home, files):
+    for path, content in files.items():
+        filepath = os.path.join(home, path)
+        if not os.path.isdir(os.path.dirname(filepath)):
+            os.makedirs(os.path.dirname(filepath))
+        with open(filepath, 'wb') as fp:
+            fp.write(content)
+
+
+class TestPatternMatcher:
+
+    def test_last_match_wins(self):
+        for patterns in (
+                ['.bge/*', 'lib/*.pyc'],
+                ['lib/*', '!lib/*.py'],
+                ['!lib/*', 'main.py'],
+                ['*.py', '!lib/*', 'lib/sub/*'],
+                ['data/*', '!data/keep.txt', '*'],
+                []):
+            matcher = PatternMatcher(patterns)
+            expected = sequential(patterns, PATHS)
+            assert set(p for p in PATHS if matcher.match(p)) == expected
+
+    def test_match_dir(self):
+        matcher = PatternMatcher(['.bge/*', 'lib/*.pyc', 'data/*'])
+        assert matcher.match_dir('.bge')
+        assert matcher.match_dir('.bge/tmp')
+        assert not matcher.match_dir('lib')
+        assert matcher.match_dir('data')
+        matcher = PatternMatcher(['data/*', '!data/keep.txt'])
+        assert not matcher.match_dir('data')
+        matcher = PatternMatcher(['data/*', '!*.txt'])
+        assert not matcher.match_dir('data')
+        matcher = PatternMatcher(['data/*', '!lib/*'])
+        assert matcher.match_dir('data')
+
+    def test_may_match_dir(self):
+        matcher = PatternMatcher(['!lib/*', 'main.py', 'src/sub/*.py'])
+        assert not matcher.may_match_dir('.bge')
+        assert not matcher.may_match_dir('lib')
+        assert matcher.may_match_dir('src')
+        assert matcher.may_match_dir('src/sub/deep')
+        assert PatternMatcher(['*.py']).may_match_dir('.bge')
+        assert not PatternMatcher([]).may_match_dir('lib')
+
+
+class TestZipCodedir:
+
+    def test_zip(self, tmpdir):
+        home = str(tmpdir)
+        big = os.urandom(3 * 1024 * 1024)
+        files = {
+            '.bgeignore': b'.bge/*\nlib/*.pyc\n',
+            '.bgeminify': b'!lib/*\nmain.py\n',
+            'main.py': b'def main(argument):\n    return argument\n',
+            'lib/a.py': b'A = 1\n',
+            'lib/a.pyc': b'\x00',
+            'lib/ref.bin': big,
+            '.bge/tmp/model.zip': b'zip',
+        }
+        write_files(home, files)
+        command = Command.__new__(Command)
+        # 压缩包位于模型目录中,不应打包自身
+        zip_path = os.path.join(home, 'out.zip')
+        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+            command._zip_codedir(home, zf)
+        with zipfile.ZipFile(zip_path) as zf:
+            assert zf.namelist() == [
+                '.bgeignore', '.bgeminify', 'lib/a.py', 'lib/ref.bin',
+                'main.py'
+            ]
+            assert zf.read('lib/ref.bin') == big
+            assert zf.read('lib/a.py') == b'A = 1\n'
+            main = zf.read('main.py')
+            assert main != files['main.py']
+            assert 'def main' in main.decode('utf-8')
+            info = zf.getinfo('lib/ref.bin')
+            assert info.external_attr == 0o755 << 16
+            assert info.compress_type == zipfile.ZIP_DEFLATED
+
+
+    def test_ignored_minify(self, tmpdir):
+        """与 .bgeminify 匹配的 .py 文件即使被忽略也会混淆后打包"""
+        home = str(tmpdir)
+        files = {
+            '.bgeignore': b'.bge/*\nsrc/*\n',
+            '.bgeminify': b'src/main.py\n',
+            'src/main.py': b'def main(argument):\n    return argument\n',
+            'src/other.py': b'B = 1\n',
+            'src/data.txt': b'data\n',
+            '.bge/task.py': b'C = 1\n',
+        }
+        write_files(home, files)
+        command = Command.__new__(Command)
+        zip_path = os.path.join(home, 'out.zip')
+        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+            command._zip_codedir(home, zf)
+        with zipfile.ZipFile(zip_path) as zf:
+            assert zf.namelist() == ['.bgeignore', '.bgeminify', 'src/main.py']
+            main = zf.read('src/main.py')
+            assert main != files['src/main.py']
+            assert 'def main' in main.decode('utf-8')
+
+
+class TestBuildCache:
+
+    def package(self, home, name, cache=None, workers=1):
+        command = Command.__new__(Command)
+        zip_path = os.path.join(os.path.dirname(home), name)
+        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+            command._zip_codedir(home, zf, cache=cache, workers=workers)
+        if cache is not None:
+            cache.save()
+        return zip_path
+
+    def new_cache(self, home):
+        return BuildCache(os.path.join(home, '.bge', 'build_cache'))
+
+    def test_incremental(self, tmpdir, monkeypatch):
+        home = str(tmpdir.mkdir('model'))
+        files = {
+            '.bgeignore': b'lib/*.pyc\n',
+            '.bgeminify': b'main.py\nlib/*.py\n',
+            'main.py': b'def main(argument):\n    return argument\n',
+            'lib/a.py': b'A = 1\n',
+            'lib/ref.bin': os.urandom(2 * 1024 * 1024 + 1),
+            'README.md': b'readme\n' * 1000,
+        }
+        write_files(home, files)
+        calls = []
+        minify = model.python_minifier.minify
+        monkeypatch.setattr(
+            model.python_minifier, 'minify',
+            lambda source: calls.append(source) or minify(source))
+        plain = self.package(home, 'plain.zip')
+        calls[:] = []
+        cache = self.new_cache(home)
+        first = self.package(home, 'first.zip', cache)
+        assert (cache.hits, cache.misses) == (0, 6)
+        assert len(calls) == 2
+        cache = self.new_cache(home)
+        second = self.package(home, 'second.zip', cache)
+        assert (cache.hits, cache.misses) == (6, 0)
+        assert len(calls) == 2
+        with open(plain, 'rb') as a, open(second, 'rb') as b:
+            assert a.read() == b.read()
+        # 缓存目录不会被打包
+        with zipfile.ZipFile(first) as zf:
+            assert zf.testzip() is None
+            assert not [n for n in zf.namelist() if n.startswith('.bge/')]
+        write_files(home, {'lib/a.py': b'A = 2\n'})
+        os.utime(os.path.join(home, 'lib/a.py'), ns=(1, 1))
+        cache = self.new_cache(home)
+        third = self.package(home, 'third.zip', cache)
+        assert (cache.hits, cache.misses) == (5, 1)
+        assert len(calls) == 3
+        with zipfile.ZipFile(third) as zf:
+            assert zf.testzip() is None
+            assert zf.read('lib/ref.bin') == files['lib/ref.bin']
+            assert b'2' in zf.read('lib/a.py')
+        objects = os.path.join(home, '.bge', 'build_cache', 'objects')
+        names = [n for _, _, ns in os.walk(objects) for n in ns]
+        assert len(names) == 6
+
+    @pytest.mark.parametrize('raw_copy', [False, True])
+    @pytest.mark.parametrize('workers', [1, 2])
+    def test_matches_zipfile(self, tmpdir, monkeypatch, workers, raw_copy):
+        """缓存写入的压缩包与通过 zipfile 公开接口写入的完全一致"""
+        if raw_copy and not build_cache.raw_copy_supported():
+            pytest.skip('raw copy is not supported by this interpreter')
+        if not raw_copy:
+            monkeypatch.setattr(build_cache, 'RAW_COPY_VERSIONS', ())
+            monkeypatch.setattr(build_cache, 'write_compressed', None)
+        home = str(tmpdir.mkdir('model'))
+        files = {
+            'empty.txt': b'',
+            'main.py': b'def main(argument):\n    return argument\n',
+            'data/random.bin': os.urandom(256 * 1024),
+            'data/text.txt': b'line\n' * 50000,
+        }
+        write_files(home, files)
+
+        def new_zipinfo(name):
+            zipinfo = zipfile.ZipInfo(name)
+            zipinfo.compress_type = zipfile.ZIP_DEFLATED
+            return zipinfo
+
+        names = sorted(files)
+        expected = os.path.join(str(tmpdir), 'expected.zip')
+        with zipfile.ZipFile(expected, 'w', zipfile.ZIP_DEFLATED) as zf:
+            for name in names:
+                data = files[name]
+                if name.endswith('.py'):
+                    data = data.decode('utf-8').upper().encode('utf-8')
+                zf.writestr(new_zipinfo(name), data)
+        for attempt in range(2):
+            cache = self.new_cache(home)
+            actual = os.path.join(str(tmpdir), 'actual.zip')
+            with zipfile.ZipFile(actual, 'w', zipfile.ZIP_DEFLATED) as zf:
+                cache.build(zf, [
+                    (new_zipinfo(name), os.path.join(home, name),
+                     name.endswith('.py'))
+                    for name in names
+                ], minify=str.upper, workers=workers)
+            cache.save()
+            assert cache.hits == (len(names) if attempt else 0)
+            with open(expected, 'rb') as a, open(actual, 'rb') as b:
+                assert a.read() == b.read()
+
+    def test_zip64_rule(self):
+        """是否使用 ZIP64 与 ZipFile.open(..., 'w') 的判断一致"""
+        limit = zipfile.ZIP64_LIMIT
+        assert not build_cache.requires_zip64(int(limit / 1.05))
+        assert build_cache.requires_zip64(int(limit / 1.05) + 1)
+        assert build_cache.requires_zip64(limit - 1)
+
+    def test_raw_copy_versions(self, monkeypatch):
+        """仅在核对过 zipfile 内部实现的版本中直接写入已压缩的数据"""
+        assert not build_cache.raw_copy_supported((3, 6))
+        assert build_cache.raw_copy_supported((3, 7, 0))
+        assert build_cache.raw_copy_supported((3, 13))
+        assert not build_cache.raw_copy_supported((3, 14))
+        zf = zipfile.ZipFile(io.BytesIO(), 'w')
+        assert build_cache.can_write_compressed(zf) == \
+            build_cache.raw_copy_supported()
+        monkeypatch.setattr(build_cache, 'RAW_COPY_VERSIONS', ())
+        assert not build_cache.can_write_compressed(zf)
+        zf.close()
+
+    def test_no_cache(self, tmpdir, monkeypatch):
+        """不使用缓存时不计算摘要,也不写入缓存目录"""
+        home = str(tmpdir.mkdir('model'))
+        files = {
+            '.bgeignore': b'.bge/*\n',
+            '.bgeminify': b'*.py\n',
+            'main.py': b'def main(argument):\n    return argument\n',
+            'data/ref.bin': os.urandom(64 * 1024),
+        }
+        write_files(home, files)
+        cached = self.package(home, 'cached.zip', self.new_cache(home))
+
+        def fail(*args, **kwargs):
+            raise AssertionError('build cache used without --no-cache')
+
+        monkeypatch.setattr(build_cache, 'file_sha256', fail)
+        monkeypatch.setattr(build_cache, 'build_object', fail)
+        for workers in (1, 2):
+            plain = self.package(home, 'plain.zip', workers=workers)
+            with open(plain, 'rb') as a, open(cached, 'rb') as b:
+                assert a.read() == b.read()
+
+    def test_parallel_digest(self, tmpdir, monkeypatch):
+        """多进程打包时在进程池中计算文件摘要"""
+        home = str(tmpdir.mkdir('model'))
+        files = dict(
+            ('data/{}.txt'.format(i), str(i).encode() * 100)
+            for i in range(8))
+        files.update({'.bgeignore': b'', '.bgeminify': b''})
+        write_files(home, files)
+        monkeypatch.setattr(build_cache, 'file_sha256', recording_sha256)
+        HASHED[:] = []
+        self.package(home, 'serial.zip', self.new_cache(home), workers=1)
+        assert len(HASHED) == len(files)
+        shutil.rmtree(os.path.join(home, '.bge'))
+        HASHED[:] = []
+        cache = self.new_cache(home)
+        self.package(home, 'parallel.zip', cache, workers=2)
+        assert HASHED == []
+        assert cache.misses == len(files)
+
+    def test_parallel(self, tmpdir):
+        home = str(tmpdir.mkdir('model'))
+        files = {
+            '.bgeignore': b'',
+            '.bgeminify': b'*.py\n!lib/keep_*.py\n',
+            'data/ref.bin': os.urandom(1024 * 1024),
+            'data/copy.bin': b'same\n' * 100,
+            'data/copy2.bin': b'same\n' * 100,
+        }
+        for i in range(40):
+            source = 'def func_{0}(value):\n    return value * {0}\n'
+            files['lib/mod_{}.py'.format(i)] = source.format(i).encode()
+            files['lib/keep_{}.py'.format(i)] = source.format(i).encode()
+        write_files(home, files)
+        serial = self.package(home, 'serial.zip', workers=1)
+        parallel = self.package(home, 'parallel.zip', workers=4)
+        cache = self.new_cache(home)
+        cached = self.package(home, 'cached.zip', cache, workers=4)
+        assert cache.misses == len(files)
+        with open(serial, 'rb') as fp:
+            expected = fp.read()
+        for path in (parallel, cached):
+            with open(path, 'rb') as fp:
+                assert fp.read() == expected
+        with zipfile.ZipFile(serial) as zf:
+            assert zf.testzip() is None
+            names = zf.namelist()
+        # 普通文件在前,混淆文件在后,各自按路径排序
+        plain = sorted(n for n in names if not n.startswith('lib/mod_'))
+        minified = sorted(n for n in names if n.startswith('lib/mod_'))
+        assert names == plain + minified
+
+
+class TestDeployReuse:
+
+    def deploy(self, monkeypatch, home, archive, results, no_cache=False):
+        """部署模型,返回 (本次上传次数, 部署时使用的对象名列表)"""
+        uploads = []
+        deployed = []
+        uploaded = self.uploaded
+        command = Command.__new__(Command)
+        monkeypatch.setattr(model, 'get_home', lambda: home)
+        monkeypatch.setattr(model, 'get_active_project', lambda: 'default')
+        monkeypatch.setattr(
+            model, 'read_config', lambda project: model.get_config_parser(
+                os.path.join(home, 'missing.ini')))
+        monkeypatch.setattr(model, 'API', lambda *args, **kwargs: None)
+        monkeypatch.setattr(
+            command, 'get_model_config_path',
+            lambda: os.path.join(home, 'model.ini'))
+        monkeypatch.setattr(
+            command, '_package_model', lambda **kwargs: archive)
+
+        def upload(api, path):
+            uploads.append(path)
+            uploaded.append(path)
+            return 'dest/archive-{}.zip'.format(len(uploaded))
+
+        def deploy(api, model_id, object_name, **params):
+            deployed.append(object_name)
+            return results.pop(0)
+
+        monkeypatch.setattr(command, '_upload_model_archive', upload)
+        monkeypatch.setattr(command, '_deploy_model_code', deploy)
+        args = argparse.Namespace(
+            ignore_source=False, with_mirrors=False, no_cache=no_cache,
+            jobs=1)
+        command.deploy_model(args)
+        return len(uploads), deployed
+
+    def test_reuse(self, tmpdir, monkeypatch):
+        self.uploaded = []
+        home = str(tmpdir.mkdir('model'))
+        os.mkdir(os.path.join(home, '.bge'))
+        archive = os.path.join(str(tmpdir), 'model.zip')
+        write_files(str(tmpdir), {'model.zip': b'archive-1'})
+        assert self.deploy(monkeypatch, home, archive, ['SUCCESS']) == \
+            (1, ['dest/archive-1.zip'])
+        # 压缩包未变化,直接使用已上传的对象
+        assert self.deploy(monkeypatch, home, archive, ['SUCCESS']) == \
+            (0, ['dest/archive-1.zip'])
+        assert self.deploy(
+            monkeypatch, home, archive, ['SUCCESS'], no_cache=True) == \
+            (1, ['dest/archive-2.zip'])
+        write_files(str(tmpdir), {'model.zip': b'archive-2'})
+        assert self.deploy(monkeypatch, home, archive, ['FAILURE']) == \
+            (1, ['dest/archive-3.zip'])
+        # 部署失败时不记录,下次仍需上传
+        assert self.deploy(monkeypatch, home, archive, ['SUCCESS']) == \
+            (1, ['dest/archive-4.zip'])
+        # 已上传的对象失效导致部署请求失败时,重新上传后重试
+        assert self.deploy(monkeypatch, home, archive, [None, 'SUCCESS']) == \
+            (1, ['dest/archive-4.zip', 'dest/archive-5.zip'])
+        assert self.deploy(monkeypatch, home, archive, ['SUCCESS']) == \
+            (0, ['dest/archive-5.zip'])
+        # 部署任务失败说明模型本身有误,只部署一次且不重新上传
+        assert self.deploy(monkeypatch, home, archive, ['FAILURE']) == \
+            (0, ['dest/archive-5.zip'])
+        assert self.deploy(monkeypatch, home, archive, ['REVOKED']) == \
+            (0, ['dest/archive-5.zip'])
+        assert self.deploy(monkeypatch, home, archive, ['SUCCESS']) == \
+            (0, ['dest/archive-5.zip'])
+        # 重试仍失败时不保留部署记录
+        assert self.deploy(monkeypatch, home, archive, [None, None]) == \
+            (1, ['dest/archive-5.zip', 'dest/archive-6.zip'])
+        assert not os.path.exists(
+            os.path.join(home, '.bge', model.DEPLOY_RECORD_FILE))
+        assert self.deploy(monkeypatch, home, archive, ['SUCCESS']) == \
+            (1, ['dest/archive-7.zip'])
+
+
+class TestModelLicense:
+
+    def new_license(self, monkeypatch, tmpdir, lines, workers=1, rate=None):
+        """生成许可证,返回 CSV 文件内容与各行参数的请求线程"""
+        threads = {}
+        command = Command.__new__(Command)
+        monkeypatch.setattr(model, 'get_active_project', lambda: 'default')
+        monkeypatch.setattr(
+            model, 'read_config', lambda project: model.get_config_parser(
+                os.path.join(str(tmpdir), 'missing.ini')))
+        monkeypatch.setattr(model, 'API', lambda *args, **kwargs: None)
+
+        def get_license(api, model_id, expires, params):
+            # 先提交的请求后返回
+            time.sleep(0.01 * (len(lines) - params['n']) / len(lines))
+            threads[params['n']] = threading.current_thread().name
+            return {
+                'license_key': 'key-{}'.format(params['n']),
+                'expiration_time': '2026-10-18 00:00:00',
+                'expiration_utc_ts': expires
+            }
+
+        monkeypatch.setattr(command, '_get_model_license', get_license)
+        params_path = os.path.join(str(tmpdir), 'params.txt')
+        with open(params_path, 'w') as fp:
+            fp.write('\n'.join(lines) + '\n')
+        csv_path = os.path.join(str(tmpdir), 'licenses-{}.csv'.format(workers))
+        args = argparse.Namespace(
+            model_id='model', expires=60, args=None, file=params_path,
+            csv=csv_path, workers=workers, rate=rate)
+        command.new_model_license(args)
+        with open(csv_path) as fp:
+            return list(csv.DictReader(fp)), threads
+
+    def test_concurrent(self, tmpdir, monkeypatch):
+        lines = [json.dumps({'n': n}) for n in range(20)]
+        lines[5] = '{invalid'
+        serial, threads = self.new_license(monkeypatch, tmpdir, lines)
+        assert len(set(threads.values())) == 1
+        rows, threads = self.new_license(
+            monkeypatch, tmpdir, lines, workers=4)
+        assert len(set(threads.values())) > 1
+        # 并发请求的结果仍按参数文件的行顺序写入,无法解析的行被跳过
+        assert rows == serial
+        assert [int(row['line_number']) for row in rows] == \
+            [n for n in range(1, 21) if n != 6]
+        assert [row['license_key'] for row in rows] == \
+            ['key-{}'.format(n) for n in range(20) if n != 5]
+
+    def test_rate_limiter(self):
+        now = [0.]
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+
+        limiter = RateLimiter(4, clock=lambda: now[0], sleep=sleep)
+        for _ in range(3):
+            limiter.acquire()
+        assert sleeps == [0.25, 0.5]
+        # 空闲后不累积额度
+        now[0] = 10.
+        limiter.acquire()
+        limiter.acquire()
+        assert sleeps == [0.25, 0.5, 0.25]
@@ -29,3 +29,86 @@ class TestModels:
         s = json.dumps(result, cls=models.ModelEncoder)
         assert isinstance(s, str)
         assert result == json.loads(s)
+
+
+class TestLazyModel:
+
+    def test_zero_copy(self):
+        result = {
+            "name": "Tom",
+            "children": [{"name": "Lili"}, {"name": "Jay"}],
+            "detail": {
+                "age": 32
+            }
+        }
+        r = models.LazyModel(result)
+        assert r.json() is result
+        assert r.name == 'Tom'
+        assert isinstance(r.detail, models.LazyModel)
+        assert r.detail.json() is result['detail']
+        assert isinstance(r['children'], models.LazyListModel)
+        assert r.children[1].name == 'Jay'
+        assert r.children.json() is result['children']
+        assert [c.name for c in r.children] == ['Lili', 'Jay']
+        assert result == json.loads(r.dumps())
+        assert result == json.loads(json.dumps(r, cls=models.ModelEncoder))
+        with pytest.raises(AttributeError):
+            r.unknown
+
+    def test_write_through(self):
+        result = {"detail": {"age": 32}, "children": []}
+        r = models.LazyModel(result)
+        r['detail']['age'] = 33
+        r['extra'] = models.Model({'x': [1]})
+        r.children.append(models.LazyModel({'name': 'Lili'}))
+        assert result == {
+            "detail": {"age": 33},
+            "children": [{"name": "Lili"}],
+            "extra": {"x": [1]}
+        }
+        assert all(
+            type(v) in (dict, list) for v in result.values())
+
+    def test_list_view(self):
+        """LazyListModel 为原始列表的视图,不复制数据"""
+        source = [{'name': 'Lili'}, [1, 2]]
+        r = models.LazyListModel(source)
+        assert r.json() is source
+        r.append(models.Model({'name': 'Jay'}))
+        r.insert(0, models.LazyModel({'name': 'Tom'}))
+        assert source[0] == {'name': 'Tom'} and type(source[0]) is dict
+        assert type(source[-1]) is dict
+        source.append({'name': 'Ann'})
+        assert len(r) == 5
+        assert r[-1].name == 'Ann'
+        assert isinstance(r[2], models.LazyListModel)
+        assert r[2].json() is source[2]
+        r[2].append(3)
+        assert source[2] == [1, 2, 3]
+        assert {'name': 'Jay'} in r
+        assert r.pop().name == 'Ann'
+        del r[0]
+        assert r == [{'name': 'Lili'}, [1, 2, 3], {'name': 'Jay'}]
+        assert r[:1].json() == [{'name': 'Lili'}]
+        r += [{'name': 'Ann'}]
+        assert source[-1] == {'name': 'Ann'}
+        assert json.loads(r.dumps()) == source
+        assert json.loads(json.dumps(r, cls=models.ModelEncoder)) == source
+        assert models.Model({'children': r}).json() == {'children': source}
+
+    def test_api(self, stub_server):
+        from bgesdk.client import API
+        stub_server.add_json('/profile', {'name': 'Tom', 'tags': [{'a': 1}]})
+        stub_server.add_json(
+            '/microbiome/taxon_abundance', [{'taxon_id': 't1'}],
+            pagination={'count': 1, 'page': 1})
+        api = API('demo', endpoint=stub_server.endpoint, lazy=True)
+        user = api.get_user()
+        assert isinstance(user, models.LazyModel)
+        assert user.tags[0].a == 1
+        ret = api.get_taxon_abundance('E-B1')
+        assert isinstance(ret, models.LazyModel)
+        assert ret.result[0].taxon_id == 't1'
+        assert isinstance(
+            API('demo', endpoint=stub_server.endpoint).get_user(),
+            models.Model)
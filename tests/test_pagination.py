@@ -0,0 +1,168 @@
+#-*- coding: utf-8 -*-
+
+from bgesdk.client import API
+from bgesdk.error import APIError
+from bgesdk.pagination import read_ahead
+
+import json
+import pytest
+import threading
+import time
+
+
+def add_sample_pages(stub_server, total, limit, delay=0, always_next=False):
+    """注册按页码返回样品的路由,limit 为服务端每页数量上限"""
+    def route(handler, query, body):
+        page = int(query['page'])
+        size = min(int(query.get('limit', limit)), limit)
+        if delay:
+            time.sleep(delay)
+        start = (page - 1) * size
+        result = [
+            {'biosample_id': i} for i in range(start, min(start + size, total))
+        ]
+        has_next = always_next or start + size < total
+        data = {
+            'count': total,
+            'next_page': page + 1 if has_next else None,
+            'result': result
+        }
+        content = json.dumps({'code': 0, 'msg': 'success', 'data': data})
+        return 200, {'Content-Type': 'application/json'}, content.encode()
+    stub_server.add('/samples', route)
+
+
+class TestIterPages:
+
+    def test_iter_samples(self, stub_server):
+        add_sample_pages(stub_server, 23, 10)
+        api = API('demo', endpoint=stub_server.endpoint)
+        ids = [item['biosample_id'] for item in api.iter_samples(limit=10)]
+        assert ids == list(range(23))
+        pages = [query['page'] for _, _, query in stub_server.requests]
+        assert pages == ['1', '2', '3']
+        assert all(q['limit'] == '10' for _, _, q in stub_server.requests)
+
+    def test_read_ahead(self, stub_server):
+        add_sample_pages(stub_server, 95, 10)
+        api = API('demo', endpoint=stub_server.endpoint)
+        items = list(api.iter_samples(limit=10, read_ahead=3))
+        assert [item['biosample_id'] for item in items] == list(range(95))
+
+    def test_start_page(self, stub_server):
+        add_sample_pages(stub_server, 30, 10)
+        api = API('demo', endpoint=stub_server.endpoint)
+        items = list(api.iter_samples(limit=10, next_page=2))
+        assert items[0]['biosample_id'] == 10
+        assert len(items) == 20
+
+    def test_early_break(self, stub_server):
+        add_sample_pages(stub_server, 1000, 10)
+        api = API('demo', endpoint=stub_server.endpoint)
+        iterator = api.iter_samples(limit=10, read_ahead=2)
+        for item in iterator:
+            if item['biosample_id'] == 5:
+                break
+        iterator.close()
+        # 预读取页数有上限
+        assert len(stub_server.requests) <= 5
+
+    def test_workers(self, stub_server):
+        """页码分页接口并发获取,结果按页码顺序返回"""
+        add_sample_pages(stub_server, 200, 10, delay=0.05)
+        api = API('demo', endpoint=stub_server.endpoint)
+        start = time.time()
+        items = list(api.iter_samples(limit=10, workers=10))
+        elapsed = time.time() - start
+        assert [item['biosample_id'] for item in items] == list(range(200))
+        pages = sorted(int(q['page']) for _, _, q in stub_server.requests)
+        assert pages == list(range(1, 21))
+        # 串行需要 1 秒以上
+        assert elapsed < 0.6
+
+    def test_workers_start_page(self, stub_server):
+        add_sample_pages(stub_server, 45, 10)
+        api = API('demo', endpoint=stub_server.endpoint)
+        items = list(api.iter_samples(limit=10, next_page=3, workers=4))
+        assert [item['biosample_id'] for item in items] == list(range(20, 45))
+
+    def test_workers_short_first_page(self, stub_server):
+        """起始页为最后一页时不再请求后续页面"""
+        add_sample_pages(stub_server, 25, 10, always_next=True)
+        api = API('demo', endpoint=stub_server.endpoint)
+        items = list(api.iter_samples(limit=10, next_page=3, workers=4))
+        assert [item['biosample_id'] for item in items] == list(range(20, 25))
+        assert len(stub_server.requests) == 1
+
+    def test_workers_server_limit(self, stub_server):
+        """服务端限制每页数量时以首页实际数量计算页数"""
+        add_sample_pages(stub_server, 45, 10)
+        api = API('demo', endpoint=stub_server.endpoint)
+        items = list(api.iter_samples(limit=100, workers=4))
+        assert [item['biosample_id'] for item in items] == list(range(45))
+        assert len(stub_server.requests) == 5
+
+    def test_error(self, stub_server):
+        stub_server.add_json('/samples', code=41001, msg='error')
+        api = API('demo', endpoint=stub_server.endpoint)
+        with pytest.raises(APIError):
+            list(api.iter_samples(read_ahead=2))
+
+    def test_iter_taxon_abundance(self, stub_server):
+        def route(handler, query, body):
+            page = int(query['page'])
+            data = [{'taxon_id': page}] if page <= 2 else []
+            content = json.dumps({
+                'code': 0, 'msg': 'success', 'data': data,
+                'pagination': {'count': 2, 'page': page}
+            })
+            return 200, {'Content-Type': 'application/json'}, content.encode()
+        stub_server.add('/microbiome/taxon_abundance', route)
+        api = API('demo', endpoint=stub_server.endpoint)
+        items = list(api.iter_taxon_abundance('e-b1', limit=1))
+        assert items == [{'taxon_id': 1}, {'taxon_id': 2}]
+        assert stub_server.requests[0][2]['biosample_id'] == 'E-B1'
+
+
+class TestReadAhead:
+
+    def test_bounded(self):
+        produced = []
+
+        def source():
+            for i in range(100):
+                produced.append(i)
+                yield i
+
+        iterator = read_ahead(source(), 2)
+        assert next(iterator) == 0
+        iterator.close()
+        assert len(produced) <= 5
+
+    @pytest.mark.parametrize('error', [False, True])
+    def test_close_source(self, error):
+        closed = threading.Event()
+
+        def source():
+            try:
+                for i in range(100):
+                    yield i
+            finally:
+                closed.set()
+
+        # 保留 source 的引用,确保由 read_ahead 负责关闭
+        items = source()
+        iterator = read_ahead(items, 2)
+        if error:
+            with pytest.raises(ValueError):
+                for item in iterator:
+                    raise ValueError(item)
+            del iterator
+        else:
+            for item in iterator:
+                break
+            iterator.close()
+        assert closed.wait(5)
+
+    def test_order(self):
+        assert list(read_ahead(iter(range(50)), 4)) == list(range(50))
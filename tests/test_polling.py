@@ -0,0 +1,138 @@
+#-*- coding: utf-8 -*-
+
+from bgesdk.client import API
+from bgesdk.error import BGEError
+from bgesdk.polling import PollPolicy, parse_retry_after
+
+import json
+import pytest
+import time
+
+
+def task_route(states, headers=None):
+    """按顺序返回 states 中的任务状态,最后一个状态重复返回"""
+    states = list(states)
+    seen = []
+
+    def route(handler, query, body):
+        seen.append(dict(handler.headers))
+        progress = states.pop(0) if len(states) > 1 else states[0]
+        content = json.dumps({
+            'code': 0,
+            'msg': 'success',
+            'data': {'task_id': 'T1', 'progress': progress}
+        }).encode('utf-8')
+        resp_headers = {'Content-Type': 'application/json'}
+        resp_headers.update(headers or {})
+        return 200, resp_headers, content
+    return route, seen
+
+
+class TestPollPolicy:
+
+    def test_backoff(self):
+        policy = PollPolicy(initial=1, max_interval=5, multiplier=2, jitter=0)
+        delays = [policy.delay(n) for n in range(5)]
+        assert delays == [1, 2, 4, 5, 5]
+        assert policy.delay(10000) == 5
+
+    def test_jitter(self):
+        policy = PollPolicy(initial=10, max_interval=10, jitter=0.2)
+        for _ in range(100):
+            assert 8 <= policy.delay(3) <= 12
+
+    def test_retry_after(self):
+        policy = PollPolicy(initial=1, jitter=0)
+        assert policy.delay(0, {'Retry-After': '7'}) == 7
+        policy = PollPolicy(initial=1, jitter=0, retry_after=False)
+        assert policy.delay(0, {'Retry-After': '7'}) == 1
+        assert parse_retry_after('Thu, 01 Jan 1970 00:01:40 GMT', now=40) == 60
+        assert parse_retry_after('soon') is None
+
+    def test_long_poll(self):
+        policy = PollPolicy(initial=1, jitter=0, long_poll=20)
+        assert policy.request_headers() == {'Prefer': 'wait=20'}
+        assert policy.request_timeout(18) == 38
+        assert policy.request_timeout((5, 18)) == (5, 38)
+        assert policy.request_timeout(None) is None
+        assert policy.delay(0, {'Preference-Applied': 'wait=20'}) == 0
+        assert policy.delay(0) == 1
+
+
+class TestWaitTask:
+
+    def test_wait(self, stub_server):
+        route, seen = task_route(['PENDING', 'STARTED', 'STARTED', 'SUCCESS'])
+        stub_server.add('/task/T1', route)
+        api = API('demo', endpoint=stub_server.endpoint)
+        calls = []
+        policy = PollPolicy(initial=0.01, multiplier=1, jitter=0)
+        result = api.wait_task(
+            'T1', poll_policy=policy,
+            callback=lambda result, elapsed: calls.append(result.progress))
+        assert result.progress == 'SUCCESS'
+        assert calls == ['PENDING', 'STARTED', 'STARTED', 'SUCCESS']
+        assert len(seen) == 4
+        # 复用同一个连接
+        assert stub_server.connections == 1
+
+    def test_unknown_state(self, stub_server):
+        route, _ = task_route(['PENDING', 'LOST'])
+        stub_server.add('/task/T1', route)
+        api = API('demo', endpoint=stub_server.endpoint)
+        policy = PollPolicy(initial=0.01, jitter=0)
+        assert api.wait_task('T1', poll_policy=policy).progress == 'LOST'
+
+    def test_retry_after(self, stub_server):
+        route, _ = task_route(
+            ['PENDING', 'PENDING', 'SUCCESS'], headers={'Retry-After': '0'})
+        stub_server.add('/task/T1', route)
+        api = API('demo', endpoint=stub_server.endpoint)
+        start = time.time()
+        policy = PollPolicy(initial=30, jitter=0)
+        assert api.wait_task('T1', poll_policy=policy).progress == 'SUCCESS'
+        assert time.time() - start < 5
+
+    def test_long_poll(self, stub_server):
+        route, seen = task_route(['PENDING', 'SUCCESS'])
+        stub_server.add('/task/T1', route)
+        api = API('demo', endpoint=stub_server.endpoint)
+        policy = PollPolicy(initial=0.01, long_poll=5)
+        api.wait_task('T1', poll_policy=policy)
+        assert seen[0]['Prefer'] == 'wait=5'
+
+    def test_timeout(self, stub_server):
+        route, seen = task_route(['PENDING'])
+        stub_server.add('/task/T1', route)
+        api = API('demo', endpoint=stub_server.endpoint)
+        policy = PollPolicy(initial=0.05, multiplier=1, jitter=0)
+        with pytest.raises(BGEError):
+            api.wait_task('T1', timeout=0.3, poll_policy=policy)
+        assert 2 <= len(seen) <= 10
+
+    def test_throttled(self, stub_server):
+        """429、503 响应按 Retry-After 等待后继续轮询"""
+        route, seen = task_route(['SUCCESS'])
+        statuses = [503, 429]
+
+        def throttle(handler, query, body):
+            if statuses:
+                return statuses.pop(0), {'Retry-After': '0'}, b''
+            return route(handler, query, body)
+        stub_server.add('/task/T1', throttle)
+        api = API('demo', endpoint=stub_server.endpoint)
+        calls = []
+        start = time.time()
+        policy = PollPolicy(initial=30, jitter=0)
+        result = api.wait_task(
+            'T1', poll_policy=policy,
+            callback=lambda result, elapsed: calls.append(result.progress))
+        assert result.progress == 'SUCCESS'
+        assert calls == ['SUCCESS']
+        assert time.time() - start < 5
+
+    def test_server_error(self, stub_server):
+        stub_server.add('/task/T1', lambda handler, query, body: (500, {}, b''))
+        api = API('demo', endpoint=stub_server.endpoint)
+        with pytest.raises(BGEError):
+            api.wait_task('T1', poll_policy=PollPolicy(initial=30))
@@ -0,0 +1,99 @@
+#-*- coding: utf-8 -*-
+
+from bgesdk.client import API
+from bgesdk.error import BGEError
+from bgesdk.progress import (
+    CallbackProgress, RichProgress, SilentProgress, TextProgress,
+    progress_factory)
+
+import io
+import os
+import pytest
+import threading
+
+
+CONTENT = os.urandom(100 * 1024)
+
+
+def add_object(stub_server):
+    url = stub_server.endpoint + '/objects/data.bin'
+    stub_server.add_json('/oss/sign_url', {'url': url})
+    stub_server.add('/objects/data.bin', lambda handler, query, body: (
+        200, {'Content-Type': 'application/octet-stream'}, CONTENT))
+
+
+class TestProgress:
+
+    def test_aggregate_threads(self):
+        calls = []
+        progress = CallbackProgress(
+            lambda *args: calls.append(args), 'data.bin', 8 * 10000,
+            interval=60)
+
+        def report():
+            for _ in range(10000):
+                progress.update(1)
+        threads = [threading.Thread(target=report) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        progress.close()
+        progress.close()
+        assert progress.done == 8 * 10000
+        # 渲染间隔内仅首次更新与关闭时渲染
+        assert calls == [
+            ('data.bin', 1, 80000), ('data.bin', 80000, 80000)]
+
+    def test_set(self):
+        calls = []
+        progress = CallbackProgress(lambda *args: calls.append(args))
+        with progress:
+            progress.set(10, 100)
+            progress.set(50)
+        assert progress.total == 100
+        assert calls[-1] == (None, 50, 100)
+
+    def test_text(self):
+        stream = io.StringIO()
+        progress = TextProgress('data.bin', 200)
+        progress.stream = stream
+        with progress:
+            progress.update(200)
+        assert stream.getvalue().endswith('100.00%% [%s>]\n' % ('=' * 61))
+
+    def test_factory(self):
+        assert progress_factory(None) is SilentProgress
+        assert progress_factory('text') is TextProgress
+        assert isinstance(progress_factory('rich'), RichProgress)
+        callback = progress_factory(lambda *args: None)
+        assert isinstance(callback('data.bin', 10), CallbackProgress)
+        with pytest.raises(BGEError):
+            progress_factory('unknown')
+
+    def test_deprecated_callback(self, capsys):
+        from bgesdk.client import progress_callback
+        with pytest.warns(DeprecationWarning):
+            progress_callback(50, 200)
+        assert ' 25.00%' in capsys.readouterr().out
+
+
+class TestTransferProgress:
+
+    def test_silent_by_default(self, stub_server, tmpdir, capsys):
+        add_object(stub_server)
+        api = API('demo', endpoint=stub_server.endpoint)
+        with open(str(tmpdir.join('data.bin')), 'wb') as fp:
+            api.download('dest/data.bin', fp)
+        out, err = capsys.readouterr()
+        assert out == '' and err == ''
+
+    def test_callback(self, stub_server, tmpdir):
+        add_object(stub_server)
+        calls = []
+        api = API(
+            'demo', endpoint=stub_server.endpoint,
+            progress=lambda *args: calls.append(args))
+        with open(str(tmpdir.join('data.bin')), 'wb') as fp:
+            api.download('dest/data.bin', fp, chunk_size=1024)
+        assert calls[-1] == ('dest/data.bin', len(CONTENT), len(CONTENT))
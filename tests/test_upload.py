@@ -0,0 +1,391 @@
+#-*- coding: utf-8 -*-
+
+from bgesdk.client import API
+from bgesdk.error import BGEError
+from bgesdk.fs import FileItem
+from bgesdk import transfer
+from bgesdk.transfer import Digest
+
+import json
+import os
+import oss2
+import pytest
+import threading
+import time
+
+
+class FakeOSS(object):
+    """在桩服务器上模拟 OSS 的上传接口"""
+
+    bucket = 'bucket'
+    destination = 'dest'
+
+    def __init__(self, stub_server, delay=0):
+        self.stub_server = stub_server
+        self.delay = delay
+        self.objects = {}
+        self.parts = {}
+        self.aborted = []
+        self.server_crc = True
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+        stub_server.add_json('/oauth2/introspect', {
+            'active': True, 'client_id': 'client'
+        })
+        stub_server.add_json('/sts/token', {
+            'bucket': self.bucket,
+            'endpoint': stub_server.endpoint,
+            'destination': self.destination,
+            'region_id': 'oss-cn-shenzhen',
+            'credentials': {
+                'access_key_id': 'id',
+                'access_key_secret': 'secret',
+                'security_token': 'token'
+            }
+        })
+
+    def add_object(self, filename, status=200):
+        path = '/%s/%s/%s' % (self.bucket, self.destination, filename)
+        self.stub_server.add(path, lambda handler, query, body: self._handle(
+            filename, status, handler, query, body))
+
+    def _handle(self, filename, status, handler, query, body):
+        if handler.command == 'POST' and 'uploads' in query:
+            content = (
+                '<?xml version="1.0" encoding="UTF-8"?>'
+                '<InitiateMultipartUploadResult><Bucket>bucket</Bucket>'
+                '<Key>k</Key><UploadId>upload-id</UploadId>'
+                '</InitiateMultipartUploadResult>'
+            ).encode()
+            return 200, {'Content-Type': 'application/xml'}, content
+        if handler.command == 'HEAD':
+            if filename not in self.objects:
+                return 404, {'x-oss-request-id': 'r'}, b''
+            content = self.objects[filename]
+            digest = Digest()
+            digest.update(content)
+            headers = {
+                'ETag': '"%s"' % digest.md5.upper(),
+                'x-oss-request-id': 'r'
+            }
+            if self.server_crc:
+                headers['x-oss-hash-crc64ecma'] = str(digest.crc64)
+            return 200, headers, b''
+        if handler.command == 'DELETE':
+            self.aborted.append(filename)
+            self.parts.pop(filename, None)
+            return 204, {'x-oss-request-id': 'r'}, b''
+        if handler.command == 'GET':
+            content = (
+                '<?xml version="1.0" encoding="UTF-8"?>'
+                '<ListPartsResult><Bucket>bucket</Bucket><Key>k</Key>'
+                '<UploadId>upload-id</UploadId><IsTruncated>false'
+                '</IsTruncated><NextPartNumberMarker>0'
+                '</NextPartNumberMarker></ListPartsResult>'
+            ).encode()
+            return 200, {'Content-Type': 'application/xml'}, content
+        if handler.command == 'POST':
+            parts = self.parts.pop(filename)
+            self.objects[filename] = b''.join(
+                parts[key] for key in sorted(parts))
+            content = (
+                '<?xml version="1.0" encoding="UTF-8"?>'
+                '<CompleteMultipartUploadResult><ETag>"e"</ETag>'
+                '</CompleteMultipartUploadResult>'
+            ).encode()
+            return 200, {'Content-Type': 'application/xml'}, content
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            if self.delay:
+                time.sleep(self.delay)
+        finally:
+            with self.lock:
+                self.active -= 1
+        if status != 200:
+            return status, {'x-oss-request-id': 'r'}, b''
+        if 'partNumber' in query:
+            with self.lock:
+                parts = self.parts.setdefault(filename, {})
+                parts[int(query['partNumber'])] = body
+        else:
+            self.objects[filename] = body
+        return 200, {'ETag': '"etag"', 'x-oss-request-id': 'r'}, b''
+
+
+class TestBatchUpload:
+
+    def test_concurrent(self, stub_server):
+        oss = FakeOSS(stub_server, delay=0.1)
+        files = []
+        for i in range(12):
+            filename = 'f%d.txt' % i
+            oss.add_object(filename)
+            files.append(FileItem(filename, ('data%d' % i).encode()))
+        api = API('demo', endpoint=stub_server.endpoint)
+        start = time.time()
+        results = api.batch_upload(
+            files, workers=6, max_in_flight=3, return_results=True)
+        elapsed = time.time() - start
+        assert [r.filename for r in results] == [f.filename for f in files]
+        assert all(r.error is None for r in results)
+        assert results[0].object_name == 'dest/f0.txt'
+        assert oss.objects['f11.txt'] == b'data11'
+        assert oss.max_active <= 3
+        # 串行需要 1.2 秒
+        assert elapsed < 0.9
+
+    def test_errors_reported(self, stub_server):
+        oss = FakeOSS(stub_server)
+        oss.add_object('ok.txt')
+        oss.add_object('denied.txt', status=403)
+        api = API('demo', endpoint=stub_server.endpoint)
+        results = api.batch_upload([
+            FileItem('denied.txt', b'x'),
+            FileItem('ok.txt', b'y'),
+            'not a file item'
+        ], return_results=True)
+        assert len(results) == 2
+        assert results[0].object_name is None
+        assert 'AccessDenied' in results[0].error or '403' in results[0].error
+        assert results[1].error is None
+        assert oss.objects['ok.txt'] == b'y'
+
+    def test_object_names(self, stub_server):
+        """默认返回对象名列表"""
+        oss = FakeOSS(stub_server)
+        oss.add_object('a.txt')
+        oss.add_object('b.txt')
+        api = API('demo', endpoint=stub_server.endpoint)
+        results = api.batch_upload([
+            FileItem('a.txt', b'x'),
+            FileItem('b.txt', b'y')
+        ])
+        assert results == ['dest/a.txt', 'dest/b.txt']
+
+    def test_errors_raised(self, stub_server):
+        """默认在首个文件上传失败时抛出异常"""
+        oss = FakeOSS(stub_server)
+        oss.add_object('ok.txt')
+        oss.add_object('denied.txt', status=403)
+        api = API('demo', endpoint=stub_server.endpoint)
+        with pytest.raises(Exception) as e:
+            api.batch_upload([
+                FileItem('ok.txt', b'y'),
+                FileItem('denied.txt', b'x')
+            ])
+        assert '403' in str(e.value) or 'AccessDenied' in str(e.value)
+
+    def test_multipart_shares_limit(self, stub_server, tmpdir, monkeypatch):
+        # oss2 断点续传记录保存在用户目录下
+        monkeypatch.setenv('HOME', str(tmpdir))
+        oss = FakeOSS(stub_server, delay=0.05)
+        files = []
+        for i in range(3):
+            filename = 'big%d.bin' % i
+            oss.add_object(filename)
+            path = tmpdir.join(filename)
+            path.write_binary(bytes(bytearray(range(256))) * 1600)
+            files.append(FileItem(filename, str(path)))
+        api = API('demo', endpoint=stub_server.endpoint)
+        results = api.batch_upload(
+            files, part_size=100 * 1024, multipart_threshold=100 * 1024,
+            multipart_num_threads=4, workers=3, max_in_flight=4,
+            return_results=True)
+        assert all(r.error is None for r in results), [r.error for r in results]
+        assert oss.objects['big1.bin'] == bytes(bytearray(range(256))) * 1600
+        assert oss.max_active <= 4
+
+
+class TestUploadCache:
+
+    def test_introspect_cached(self, stub_server):
+        oss = FakeOSS(stub_server)
+        for i in range(5):
+            oss.add_object('f%d.txt' % i)
+        api = API('demo', endpoint=stub_server.endpoint)
+        for i in range(5):
+            api.upload('f%d.txt' % i, b'x')
+        api.batch_upload([FileItem('f0.txt', b'y')])
+        paths = [path for _, path, _ in stub_server.requests]
+        assert paths.count('/oauth2/introspect') == 1
+        assert paths.count('/sts/token') == 6
+        # 相同 STS 凭证复用同一个存储空间对象
+        assert len(api._bucket_cache) == 1
+
+    def test_introspect_expired(self, stub_server):
+        stub_server.add_json('/oauth2/introspect', {
+            'active': True, 'client_id': 'client', 'exp': time.time() - 1
+        })
+        api = API('demo', endpoint=stub_server.endpoint)
+        api._get_client_id()
+        api._get_client_id()
+        assert len(stub_server.requests) == 2
+
+    def test_inactive_token(self, stub_server):
+        stub_server.add_json('/oauth2/introspect', {'active': False})
+        api = API('demo', endpoint=stub_server.endpoint)
+        with pytest.raises(BGEError):
+            api._get_client_id()
+        with pytest.raises(BGEError):
+            api._get_client_id()
+        assert len(stub_server.requests) == 2
+
+
+class TestUploadDir:
+
+    def test_recursive(self, stub_server, tmpdir):
+        oss = FakeOSS(stub_server)
+        for path in ['a.fq', 'run1/b.fq', 'run1/lane/c.fq', 'run1/x.log']:
+            tmpdir.join(path).write(path, ensure=True)
+            oss.add_object(path)
+        api = API('demo', endpoint=stub_server.endpoint)
+        results = api.upload_dir(
+            str(tmpdir), recursive=True, exclude=['*.log'], workers=3)
+        assert results == [
+            'dest/a.fq', 'dest/run1/b.fq', 'dest/run1/lane/c.fq'
+        ]
+        assert oss.objects['run1/lane/c.fq'] == b'run1/lane/c.fq'
+        assert 'run1/x.log' not in oss.objects
+
+    def test_flat(self, stub_server, tmpdir):
+        oss = FakeOSS(stub_server)
+        for path in ['a.fq', 'run1/b.fq']:
+            tmpdir.join(path).write(path, ensure=True)
+            oss.add_object(path)
+        api = API('demo', endpoint=stub_server.endpoint)
+        results = api.upload_dir(str(tmpdir), workers=1)
+        assert results == ['dest/a.fq']
+
+
+class TestStreamUpload:
+
+    def test_generator(self, stub_server):
+        oss = FakeOSS(stub_server, delay=0.02)
+        oss.add_object('stream.bin')
+        state = {'produced': 0, 'outstanding': 0}
+
+        def generate():
+            for i in range(40):
+                uploaded = sum(
+                    len(part) for part in oss.parts.get(
+                        'stream.bin', {}).values())
+                state['outstanding'] = max(
+                    state['outstanding'], state['produced'] - uploaded)
+                state['produced'] += 300
+                yield bytes([i]) * 300
+        api = API('demo', endpoint=stub_server.endpoint)
+        api.upload(
+            'stream.bin', generate(), part_size=1000,
+            multipart_num_threads=3)
+        assert oss.objects['stream.bin'] == b''.join(
+            bytes([i]) * 300 for i in range(40))
+        part_puts = [
+            r for r in stub_server.requests
+            if r[0] == 'PUT' and 'partNumber' in r[2]
+        ]
+        assert len(part_puts) == 12
+        # 内存中最多 3 个上传中的分片与 1 个正在读取的分片
+        assert state['outstanding'] <= 4 * 1000 + 300
+
+    def test_pipe(self, stub_server):
+        oss = FakeOSS(stub_server)
+        oss.add_object('pipe.bin')
+        content = os.urandom(5000)
+        read_fd, write_fd = os.pipe()
+
+        def write():
+            with os.fdopen(write_fd, 'wb') as fp:
+                for i in range(0, len(content), 700):
+                    fp.write(content[i:i + 700])
+                    fp.flush()
+        thread = threading.Thread(target=write)
+        thread.start()
+        api = API('demo', endpoint=stub_server.endpoint)
+        with os.fdopen(read_fd, 'rb') as fp:
+            api.upload('pipe.bin', fp, part_size=1024)
+        thread.join()
+        assert oss.objects['pipe.bin'] == content
+
+    def test_small_stream(self, stub_server):
+        """数据不足两个分片时使用单个请求上传"""
+        oss = FakeOSS(stub_server)
+        oss.add_object('small.bin')
+        api = API('demo', endpoint=stub_server.endpoint)
+        api.upload('small.bin', iter([b'ab', b'cd']), part_size=1024)
+        assert oss.objects['small.bin'] == b'abcd'
+        assert not any(r[0] == 'POST' for r in stub_server.requests
+                       if r[1].endswith('small.bin'))
+
+    def test_abort_on_error(self, stub_server):
+        oss = FakeOSS(stub_server)
+        oss.add_object('fail.bin', status=500)
+        api = API('demo', endpoint=stub_server.endpoint)
+        with pytest.raises(oss2.exceptions.ServerError):
+            api.upload(
+                'fail.bin', (b'x' * 100 for _ in range(50)), part_size=1000)
+        assert oss.aborted == ['fail.bin']
+
+
+class TestSyncUpload:
+
+    def uploads(self, stub_server):
+        return sorted(
+            path.rsplit('/', 1)[1] for command, path, _ in stub_server.requests
+            if command == 'PUT')
+
+    def test_skip_unchanged(self, stub_server, tmpdir):
+        oss = FakeOSS(stub_server)
+        src = tmpdir.mkdir('src')
+        for name in ['a.txt', 'b.txt', 'c.txt']:
+            src.join(name).write(name)
+            oss.add_object(name)
+        manifest = str(tmpdir.join('manifest.json'))
+        api = API('demo', endpoint=stub_server.endpoint)
+        results = api.upload_dir(
+            str(src), sync=True, manifest=manifest, return_results=True)
+        assert [r.skipped for r in results] == [False, False, False]
+        src.join('b.txt').write('changed')
+        del stub_server.requests[:]
+        results = api.upload_dir(
+            str(src), sync=True, manifest=manifest, return_results=True)
+        assert [r.skipped for r in results] == [True, False, True]
+        assert results[0].object_name == 'dest/a.txt'
+        assert self.uploads(stub_server) == ['b.txt']
+        assert oss.objects['b.txt'] == b'changed'
+
+    def test_manifest_cache(self, stub_server, tmpdir, monkeypatch):
+        """文件未变化时不重新计算摘要"""
+        oss = FakeOSS(stub_server)
+        oss.add_object('a.txt')
+        path = tmpdir.join('a.txt')
+        path.write('content')
+        manifest = str(tmpdir.join('manifest.json'))
+        api = API('demo', endpoint=stub_server.endpoint)
+        api.batch_upload(
+            [FileItem('a.txt', str(path))], sync=True, manifest=manifest)
+        with open(manifest) as fp:
+            assert str(path) in json.load(fp)
+
+        def fail(*args, **kwargs):
+            raise AssertionError('file digest recomputed')
+        monkeypatch.setattr(transfer, 'file_digest', fail)
+        results = api.batch_upload(
+            [FileItem('a.txt', str(path))], sync=True, manifest=manifest,
+            return_results=True)
+        assert results[0].skipped
+
+    def test_etag_fallback(self, stub_server):
+        """服务端未返回 CRC64 时比较 ETag"""
+        oss = FakeOSS(stub_server)
+        oss.server_crc = False
+        oss.add_object('a.txt')
+        oss.objects['a.txt'] = b'data'
+        api = API('demo', endpoint=stub_server.endpoint)
+        results = api.batch_upload([
+            FileItem('a.txt', b'data'),
+        ], sync=True, return_results=True)
+        assert results[0].skipped
+        assert self.uploads(stub_server) == []
@@ -0,0 +1,103 @@
+#-*- coding: utf-8 -*-
+
+from bgesdk.aio import AsyncAPI
+from bgesdk.client import API
+from bgesdk.error import APIError
+
+import asyncio
+import json
+import pytest
+
+
+def add_variants(stub_server):
+    """注册按 rs 编号返回变异位点的路由,返回顺序与请求顺序相反"""
+    def route(handler, query, body):
+        rsids = query['rsids'].split(',')
+        if len(rsids) > 100:
+            result = {'code': 41001, 'msg': u'参数错误', 'data': None}
+        else:
+            result = {'code': 0, 'msg': 'success', 'data': [
+                {'rsid': rsid, 'biosample_id': query['biosample_id']}
+                for rsid in reversed(rsids)
+            ]}
+        content = json.dumps(result).encode('utf-8')
+        return 200, {'Content-Type': 'application/json'}, content
+    stub_server.add('/variants', route)
+
+
+class TestVariantsBulk:
+
+    def test_chunks(self, stub_server):
+        add_variants(stub_server)
+        rsids = ['rs%d' % i for i in range(250)]
+        api = API('demo', endpoint=stub_server.endpoint)
+        ret = api.get_variants_bulk('e-b1', rsids + rsids[:10], workers=3)
+        assert [item.rsid for item in ret] == rsids
+        assert all(list(item.variants.keys()) == ['E-B1'] for item in ret)
+        assert [item.variants['E-B1'][0]['rsid'] for item in ret] == rsids
+        assert len(stub_server.requests) == 3
+        sizes = sorted(
+            len(q['rsids'].split(',')) for _, _, q in stub_server.requests)
+        assert sizes == [50, 100, 100]
+        assert stub_server.connections <= 3
+
+    def test_many_biosamples(self, stub_server):
+        add_variants(stub_server)
+        api = API('demo', endpoint=stub_server.endpoint)
+        ret = api.get_variants_bulk('E-B1, E-B2,E-B1', 'rs1,rs2,,rs1')
+        assert [item.rsid for item in ret] == ['rs1', 'rs2']
+        for item in ret:
+            assert list(item.variants.keys()) == ['E-B1', 'E-B2']
+            for biosample_id, variants in item.variants.items():
+                assert [v['rsid'] for v in variants] == [item.rsid]
+                assert variants[0]['biosample_id'] == biosample_id
+
+    def test_chunk_size_limit(self, stub_server):
+        add_variants(stub_server)
+        api = API('demo', endpoint=stub_server.endpoint)
+        rsids = ['rs%d' % i for i in range(150)]
+        ret = api.get_variants_bulk('E-B1', rsids, chunk_size=1000)
+        assert len(ret) == 150
+        assert all(len(item.variants['E-B1']) == 1 for item in ret)
+
+    def test_missing(self, stub_server):
+        """没有数据的位点返回空列表"""
+        def route(handler, query, body):
+            data = [{'rsid': 'rs2'}, {'rsid': 'rs9'}]
+            content = json.dumps(
+                {'code': 0, 'msg': 'success', 'data': data}).encode('utf-8')
+            return 200, {'Content-Type': 'application/json'}, content
+        stub_server.add('/variants', route)
+        api = API('demo', endpoint=stub_server.endpoint)
+        ret = api.get_variants_bulk('E-B1', 'rs1,rs2')
+        assert ret.json() == [
+            {'rsid': 'rs1', 'variants': {'E-B1': []}},
+            {'rsid': 'rs2', 'variants': {'E-B1': [{'rsid': 'rs2'}]}},
+        ]
+
+    def test_error(self, stub_server):
+        stub_server.add_json('/variants', code=41303, msg='error')
+        api = API('demo', endpoint=stub_server.endpoint)
+        with pytest.raises(APIError) as e:
+            api.get_variants_bulk('E-B1', ['rs1', 'rs2'])
+        assert e.value.code == 41303
+
+    def test_async(self, stub_server):
+        pytest.importorskip('aiohttp')
+        add_variants(stub_server)
+        rsids = ['rs%d' % i for i in range(230)]
+
+        async def main():
+            async with AsyncAPI('demo', endpoint=stub_server.endpoint) as api:
+                return await api.get_variants_bulk(['E-B1', 'E-B2'], rsids)
+
+        loop = asyncio.new_event_loop()
+        try:
+            ret = loop.run_until_complete(main())
+        finally:
+            loop.close()
+        assert [item.rsid for item in ret] == rsids
+        assert all(
+            item.variants['E-B2'][0]['biosample_id'] == 'E-B2'
+            for item in ret)
+        assert len(stub_server.requests) == 6